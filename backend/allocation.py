@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+FoodCast Surplus Allocation
+Greedy, priority-ordered assignment of predicted surplus to recipients.
+
+Predictions are served most urgent first (urgency score, then earliest
+expiry, then largest surplus). Each prediction's candidate recipients are its
+nearest neighbours within the distance limit, found for all predictions at
+once with the recipient index from geo.py. A recipient whose preferred
+food category differs from the item costs ``category_penalty`` times its
+distance, so matching recipients are filled first. Units are then poured into
+candidates in cost order until the surplus is gone or every candidate has
+reached its max_daily_quantity for that day.
+
+The work is one bulk k-nearest query plus a single pass over the
+(prediction, candidate) pairs, so runtime grows with
+predictions × max_candidates rather than predictions × recipients. Only a
+prediction that still has units once its max_candidates nearest recipients
+are full, all of them within range, looks further: it is poured into the
+recipients that still have room that day within the distance limit, in cost
+order. No recipient in range is left unused while units remain.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from geo import RecipientIndex, chord_to_km, km_to_chord, unit_vectors
+
+ALLOCATION_COLUMNS = [
+    'prediction_index', 'store_id', 'product_id', 'date', 'recipient_id', 'quantity',
+    'distance_km', 'category_match', 'urgency_score'
+]
+
+
+def priority_order(predictions_df):
+    """
+    Row order in which predictions are served.
+
+    Args:
+        predictions_df (pd.DataFrame): Predictions with urgency_score,
+            expiry_date and predicted_surplus
+
+    Returns:
+        np.ndarray: Row positions, most urgent first
+    """
+    urgency = predictions_df['urgency_score'].to_numpy(dtype=np.float64)
+    surplus = predictions_df['predicted_surplus'].to_numpy(dtype=np.float64)
+    if 'expiry_date' in predictions_df.columns:
+        expiry = pd.to_datetime(predictions_df['expiry_date']).to_numpy(dtype='datetime64[D]').astype(np.float64)
+        expiry[np.isnan(expiry)] = np.inf
+    else:
+        expiry = np.zeros(len(predictions_df))
+    # lexsort: last key is primary
+    return np.lexsort((-surplus, expiry, -urgency))
+
+
+def allocate_surplus(predictions_df, recipients_df, max_distance_km=50.0, max_candidates=20,
+                     category_penalty=2.0, require_category_match=False):
+    """
+    Assign predicted surplus units to recipients.
+
+    Args:
+        predictions_df (pd.DataFrame): Predictions with store_id, product_id, date,
+            category, store_lat, store_lon, predicted_surplus, urgency_score and expiry_date
+        recipients_df (pd.DataFrame): Recipients with recipient_id, latitude, longitude,
+            preferred_food_category and max_daily_quantity
+        max_distance_km (float): Maximum store-to-recipient distance
+        max_candidates (int): Nearest recipients considered first per prediction
+        category_penalty (float): Distance multiplier for recipients preferring another category
+        require_category_match (bool): Only allocate to recipients preferring the item's category
+
+    Returns:
+        tuple: (allocations DataFrame, summary dict)
+    """
+    started = time.perf_counter()
+    index = RecipientIndex(recipients_df)
+    n = len(predictions_df)
+    units = np.floor(np.clip(predictions_df['predicted_surplus'].to_numpy(dtype=np.float64), 0, None))
+    units = np.nan_to_num(units).astype(np.int64)
+
+    allocations = {column: [] for column in ['row', 'slot', 'quantity']}
+    # Allocations beyond the max_candidates nearest recipients
+    widened = {column: [] for column in ['row', 'recipient', 'distance_km', 'category_match', 'quantity']}
+    candidate = np.zeros((0, 1), dtype=np.int64)
+    distance_km = np.zeros((0, 1))
+    match = np.zeros((0, 1), dtype=bool)
+    if n and len(index):
+        k = min(max_candidates, len(index))
+        points = predictions_df[['store_lat', 'store_lon']].to_numpy(dtype=np.float64)
+        valid = ~np.isnan(points).any(axis=1)
+
+        # Nearest candidates within range for every distinct store point in one bulk query
+        unique_points, inverse = np.unique(points[valid], axis=0, return_inverse=True)
+        distance, candidates = index.nearest(unique_points[:, 0], unique_points[:, 1], k, max_distance_km)
+        distance_km = np.full((n, k), np.inf)
+        candidate = np.full((n, k), len(index), dtype=np.int64)
+        distance_km[valid] = distance[inverse.reshape(-1)]
+        candidate[valid] = candidates[inverse.reshape(-1)]
+        point_codes = np.full(n, -1, dtype=np.int64)
+        point_codes[valid] = inverse.reshape(-1)
+        # Recipients beyond the k nearest can be in range only if all k are
+        may_widen = (np.isfinite(distance_km).all(axis=1) & (k < len(index))).tolist()
+        store_vectors = unit_vectors(unique_points[:, 0], unique_points[:, 1])
+        # In range <=> chord <= bound <=> dot product >= 1 - bound² / 2 (same bound as index.nearest)
+        min_dot = 1 - (km_to_chord(max_distance_km) * (1 + 1e-9)) ** 2 / 2
+
+        # Category preference: penalize (or exclude) recipients preferring other categories
+        wanted = index.categories.get_indexer(predictions_df['category'].astype(str).str.lower().to_numpy())
+        # Missing neighbours point one past the last recipient
+        category_codes = np.append(index.category_codes, -2)
+        match = category_codes[candidate] == wanted[:, None]
+        cost = np.where(match, distance_km, distance_km * category_penalty)
+        allowed = distance_km <= max_distance_km
+        if require_category_match:
+            allowed &= match
+        cost[~allowed] = np.inf
+        by_cost = np.argsort(cost, axis=1, kind='stable')
+        candidate = np.take_along_axis(candidate, by_cost, axis=1)
+        distance_km = np.take_along_axis(distance_km, by_cost, axis=1)
+        match = np.take_along_axis(match, by_cost, axis=1)
+        n_allowed = np.isfinite(np.take_along_axis(cost, by_cost, axis=1)).sum(axis=1)
+
+        # Remaining capacity per (recipient, day)
+        day_codes, days = pd.factorize(pd.to_datetime(predictions_df['date']).dt.normalize())
+        capacity = np.repeat(
+            index.recipients['max_daily_quantity'].fillna(0).to_numpy(dtype=np.int64)[:, None],
+            max(len(days), 1), axis=1
+        ).tolist()
+        # Day-major, so one day's row is contiguous for the widening scan
+        has_room = np.array(capacity).T > 0
+
+        # Plain lists: the greedy pass below is scalar code
+        order = priority_order(predictions_df)
+        order = order[(units[order] > 0) & (n_allowed[order] > 0)]
+        candidate_lists = candidate.tolist()
+        n_allowed_list = n_allowed.tolist()
+        units_list = units.tolist()
+        day_list = np.maximum(day_codes, 0).tolist()
+        point_list = point_codes.tolist()
+
+        for row in order.tolist():
+            remaining = units_list[row]
+            day = day_list[row]
+            for slot, recipient in enumerate(candidate_lists[row][:n_allowed_list[row]]):
+                free = capacity[recipient][day]
+                if free <= 0:
+                    continue
+                quantity = min(free, remaining)
+                capacity[recipient][day] = free - quantity
+                if quantity == free:
+                    has_room[day, recipient] = False
+                remaining -= quantity
+                allocations['row'].append(row)
+                allocations['slot'].append(slot)
+                allocations['quantity'].append(quantity)
+                if remaining == 0:
+                    break
+            if remaining == 0 or not may_widen[row]:
+                continue
+
+            # The nearest candidates are full: recipients with room that day, in range and cost order
+            dots = index.tree.data @ store_vectors[point_list[row]]
+            reachable = has_room[day] & (dots >= min_dot)
+            if require_category_match:
+                reachable &= index.category_codes == wanted[row]
+            open_recipients = np.flatnonzero(reachable)
+            if not len(open_recipients):
+                continue
+            open_km = chord_to_km(np.sqrt(np.maximum(2 - 2 * dots[open_recipients], 0)))
+            open_match = index.category_codes[open_recipients] == wanted[row]
+            by_open_cost = np.argsort(np.where(open_match, open_km, open_km * category_penalty), kind='stable')
+            for recipient, distance_to, category_match in zip(open_recipients[by_open_cost].tolist(),
+                                                              open_km[by_open_cost].tolist(),
+                                                              open_match[by_open_cost].tolist()):
+                free = capacity[recipient][day]
+                quantity = min(free, remaining)
+                capacity[recipient][day] = free - quantity
+                if quantity == free:
+                    has_room[day, recipient] = False
+                remaining -= quantity
+                widened['row'].append(row)
+                widened['recipient'].append(recipient)
+                widened['distance_km'].append(distance_to)
+                widened['category_match'].append(category_match)
+                widened['quantity'].append(quantity)
+                if remaining == 0:
+                    break
+
+    rows = np.array(allocations['row'], dtype=np.int64)
+    slots = np.array(allocations['slot'], dtype=np.int64)
+    recipients = np.concatenate([candidate[rows, slots], np.array(widened['recipient'], dtype=np.int64)])
+    distances = np.concatenate([distance_km[rows, slots], np.array(widened['distance_km'], dtype=np.float64)])
+    matches = np.concatenate([match[rows, slots], np.array(widened['category_match'], dtype=bool)])
+    quantities = np.array(allocations['quantity'] + widened['quantity'], dtype=np.int64)
+    rows = np.concatenate([rows, np.array(widened['row'], dtype=np.int64)])
+    allocations_df = pd.DataFrame({
+        'prediction_index': predictions_df.index.to_numpy()[rows],
+        'store_id': predictions_df['store_id'].to_numpy()[rows],
+        'product_id': predictions_df['product_id'].to_numpy()[rows],
+        'date': predictions_df['date'].to_numpy()[rows],
+        'recipient_id': index.recipients['recipient_id'].to_numpy()[recipients],
+        'quantity': quantities,
+        'distance_km': np.round(distances, 3),
+        'category_match': matches,
+        'urgency_score': predictions_df['urgency_score'].to_numpy()[rows]
+    }, columns=ALLOCATION_COLUMNS)
+
+    allocated = int(allocations_df['quantity'].sum())
+    available = int(units.sum())
+    summary = {
+        'predictions': n,
+        'recipients': len(index),
+        'allocations': len(allocations_df),
+        'units_available': available,
+        'units_allocated': allocated,
+        'fill_rate': round(allocated / available, 4) if available else 0.0,
+        'predictions_served': int(allocations_df['prediction_index'].nunique()),
+        'recipients_served': int(allocations_df['recipient_id'].nunique()),
+        'category_match_units': int(allocations_df.loc[allocations_df['category_match'], 'quantity'].sum()),
+        'average_distance_km': (
+            round(float(np.average(allocations_df['distance_km'], weights=allocations_df['quantity'])), 3)
+            if allocated else None
+        ),
+        'seconds': round(time.perf_counter() - started, 3)
+    }
+    return allocations_df, summary
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+FoodCast Allocation Benchmark
+Times allocate_surplus on the bundled data and on scaled-up copies of it.
+
+Predictions are read from predicted_surplus.json (run surplus_model.py first).
+Larger problem sizes are made by replicating predictions and recipients with
+small coordinate jitter, so the spatial density grows with the scale factor.
+
+Usage:
+    python benchmark_allocation.py [--scales 1 2 5] [--radius 50 500]
+"""
+
+import argparse
+import json
+
+import numpy as np
+import pandas as pd
+
+from allocation import allocate_surplus
+from schema import RECIPIENT_SCHEMA, read_table
+
+
+def load_inputs(predictions_path, recipients_path):
+    """Load the prediction and recipient tables used by the benchmark."""
+    with open(predictions_path, 'r') as f:
+        predictions_df = pd.DataFrame(json.load(f))
+    predictions_df['date'] = pd.to_datetime(predictions_df['date'])
+    recipients_df = read_table(recipients_path, RECIPIENT_SCHEMA)
+    return predictions_df, recipients_df
+
+
+def scale_frame(df, factor, lat_column, lon_column, seed, id_column=None):
+    """Replicate a frame ``factor`` times with jittered coordinates."""
+    if factor == 1:
+        return df
+    rng = np.random.default_rng(seed)
+    scaled = pd.concat([df] * factor, ignore_index=True)
+    scaled[lat_column] = np.clip(scaled[lat_column] + rng.normal(0, 0.05, len(scaled)), -90, 90)
+    scaled[lon_column] = (scaled[lon_column] + rng.normal(0, 0.05, len(scaled)) + 180) % 360 - 180
+    if id_column:
+        scaled[id_column] = np.arange(1, len(scaled) + 1)
+    return scaled
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the surplus allocation solver')
+    parser.add_argument('--predictions', default='predicted_surplus.json')
+    parser.add_argument('--recipients', default='../data/mock_recipient_community_data.csv')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 2, 5])
+    parser.add_argument('--radius', type=float, nargs='+', default=[50.0, 500.0])
+    parser.add_argument('--candidates', type=int, default=20)
+    args = parser.parse_args()
+
+    predictions_df, recipients_df = load_inputs(args.predictions, args.recipients)
+    print(f"📊 Base problem: {len(predictions_df):,} predictions × {len(recipients_df):,} recipients")
+    print(f"{'scale':>5} {'predictions':>12} {'recipients':>11} {'radius':>7} {'seconds':>8} "
+          f"{'allocated':>10} {'fill':>6} {'served':>7}")
+
+    for scale in args.scales:
+        predictions = scale_frame(predictions_df, scale, 'store_lat', 'store_lon', seed=scale)
+        recipients = scale_frame(recipients_df, scale, 'latitude', 'longitude', seed=scale + 1000,
+                                 id_column='recipient_id')
+        for radius in args.radius:
+            _, summary = allocate_surplus(predictions, recipients, max_distance_km=radius,
+                                          max_candidates=args.candidates)
+            print(f"{scale:>5} {len(predictions):>12,} {len(recipients):>11,} {radius:>7.0f} "
+                  f"{summary['seconds']:>8.2f} {summary['units_allocated']:>10,} "
+                  f"{summary['fill_rate']:>6.1%} {summary['recipients_served']:>7,}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,468 @@
+#!/usr/bin/env python3
+"""
+FoodCast Out-of-Core Pipeline
+Store-partitioned training for sales histories larger than memory.
+
+FoodSurplusPredictor.run_full_pipeline() holds the raw CSVs, the merged frame
+and the full feature matrix at once. This pipeline holds at most one store's
+rows plus a training sample whose size is set by the memory budget:
+
+1. partition  The surplus and sales CSVs are read in fixed-size chunks and
+              spilled to per-store files.
+2. features   Each store is merged and gets its series features (series
+              never cross stores) and is written back to disk. Whole-dataset
+              statistics (store/product means, price moments, shelf life),
+              a uniform row sample and the model server's per-series
+              history (feature_state.npz) are accumulated along the way.
+3. train      Global features are added to the sample and the model is fit
+              on it. GradientBoostingRegressor cannot learn incrementally,
+              so a bounded sample keeps the model unchanged.
+4. predict    Every partition is scored and streamed to the prediction files.
+
+Wall time and peak resident memory are recorded per stage. On Linux the
+kernel's peak-RSS counter is reset at the start of each stage, so every peak
+belongs to its own stage. Elsewhere the peak is the process high-water mark.
+
+Working directory layout:
+    <workdir>/surplus/store_id=<id>/part-<n>.pkl
+    <workdir>/sales/store_id=<id>/part-<n>.pkl
+    <workdir>/features/store_id=<id>.pkl
+    <workdir>/predictions/store_id=<id>.pkl
+"""
+
+import contextlib
+import glob
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from incremental_features import IncrementalFeatureState
+from prediction_writer import PYARROW_AVAILABLE, write_prediction_frames
+from schema import (SURPLUS_SCHEMA, SALES_SCHEMA, BRAIN_DIET_SCHEMA,
+                    read_table, unify_categories, concat_frames, frame_memory_mb)
+
+KEYS = ['store_id', 'product_id']
+SIGNALS = ['daily_sales_sales', 'stock_level']
+
+# Share of the memory budget given to the training sample; fitting makes
+# several copies of it (feature matrix, fills, feature selection, model input)
+SAMPLE_SHARE = 0.2
+
+
+def _status_kb(field):
+    """A memory field of /proc/self/status in kB, or None where unavailable."""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith(f'{field}:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process (since the last reset) in MB."""
+    peak_kb = _status_kb('VmHWM')
+    if peak_kb is not None:
+        return peak_kb / 1024
+    if resource is None:
+        return float('nan')
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 1024
+
+
+def reset_peak_rss():
+    """Reset the kernel's peak-RSS counter; False where that is unsupported."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+class StageMonitor:
+    """
+    Wall time and peak resident memory of named pipeline stages.
+    """
+
+    def __init__(self):
+        self.stages = []
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Context manager that records one stage."""
+        per_stage = reset_peak_rss()
+        started = time.perf_counter()
+        print(f"🔄 Stage '{name}'...")
+        try:
+            yield
+        finally:
+            record = {
+                'stage': name,
+                'seconds': round(time.perf_counter() - started, 3),
+                'peak_rss_mb': round(peak_rss_mb(), 1),
+                'peak_is_cumulative': not per_stage
+            }
+            self.stages.append(record)
+            print(f"   ⏱️  {name}: {record['seconds']:.2f}s, peak RSS {record['peak_rss_mb']:.0f} MB")
+
+    def report(self):
+        """Print the per-stage table."""
+        print(f"   {'stage':<10} {'seconds':>8} {'peak RSS':>10}")
+        for record in self.stages:
+            marker = '*' if record['peak_is_cumulative'] else ''
+            print(f"   {record['stage']:<10} {record['seconds']:>8.2f} {record['peak_rss_mb']:>7.0f} MB{marker}")
+        if any(record['peak_is_cumulative'] for record in self.stages):
+            print("   * process high-water mark (per-stage reset unsupported here)")
+
+
+class RowSample:
+    """
+    Uniform random sample of a stream of frames within a memory limit.
+
+    Every row gets a random key and the rows with the smallest keys are kept
+    (bottom-k sampling). The row capacity is derived from the bytes per row of
+    the first frame. Kept rows stay in stream order.
+    """
+
+    def __init__(self, max_bytes, seed=42):
+        """
+        Initialize an empty sample.
+
+        Args:
+            max_bytes (int): Memory limit of the sample
+            seed (int): Seed of the row keys
+        """
+        self.max_bytes = max_bytes
+        self.rng = np.random.default_rng(seed)
+        self.capacity = None
+        self.frame = None
+        self.keys = np.zeros(0)
+        self.rows_seen = 0
+
+    def add(self, frame):
+        """Offer the rows of a frame to the sample."""
+        if not len(frame):
+            return
+        if self.capacity is None:
+            row_bytes = frame.memory_usage(deep=True).sum() / len(frame)
+            self.capacity = max(1, int(self.max_bytes / row_bytes))
+
+        self.rows_seen += len(frame)
+        keys = self.rng.random(len(frame))
+        frame = frame.reset_index(drop=True)
+        if self.frame is not None:
+            frame = concat_frames([self.frame, frame])
+            keys = np.concatenate([self.keys, keys])
+
+        if len(frame) > self.capacity:
+            keep = np.sort(np.argpartition(keys, self.capacity - 1)[:self.capacity])
+            frame = frame.iloc[keep].reset_index(drop=True)
+            keys = keys[keep]
+        self.frame, self.keys = frame, keys
+
+
+class GlobalStatsAccumulator:
+    """
+    Streaming FoodSurplusPredictor.global_feature_stats() over partitions.
+    """
+
+    def __init__(self):
+        self.sums = {key: None for key in KEYS}
+        self.counts = {key: None for key in KEYS}
+        # Running price count, mean and sum of squared deviations (Chan et al.)
+        self.price_n = 0
+        self.price_mean = 0.0
+        self.price_m2 = 0.0
+        self.shelf_life_max = -np.inf
+
+    def add(self, df):
+        """Fold one partition of engineer_series_features() output into the totals."""
+        for key in KEYS:
+            grouped = df.groupby(key, observed=True)[SIGNALS]
+            sums, counts = grouped.sum(), grouped.count()
+            sums.index = counts.index = sums.index.astype(object)
+            if self.sums[key] is None:
+                self.sums[key], self.counts[key] = sums, counts
+            else:
+                self.sums[key] = self.sums[key].add(sums, fill_value=0)
+                self.counts[key] = self.counts[key].add(counts, fill_value=0)
+
+        price = df['price'].to_numpy(dtype=np.float64)
+        price = price[~np.isnan(price)]
+        if len(price):
+            n, mean = len(price), price.mean()
+            m2 = ((price - mean) ** 2).sum()
+            total = self.price_n + n
+            delta = mean - self.price_mean
+            self.price_mean += delta * n / total
+            self.price_m2 += m2 + delta ** 2 * self.price_n * n / total
+            self.price_n = total
+
+        if len(df):
+            self.shelf_life_max = max(self.shelf_life_max, float(df['shelf_life_days'].max()))
+
+    def stats(self, lag_medians):
+        """
+        Statistics in global_feature_stats() layout.
+
+        Args:
+            lag_medians (dict): Lag fill values (medians cannot be streamed
+                exactly, so they come from the row sample)
+
+        Returns:
+            dict: Input for FoodSurplusPredictor.add_global_features()
+        """
+        return {
+            'lag_medians': lag_medians,
+            'store_means': self.sums['store_id'] / self.counts['store_id'],
+            'product_means': self.sums['product_id'] / self.counts['product_id'],
+            'price_mean': self.price_mean,
+            'price_std': np.sqrt(self.price_m2 / (self.price_n - 1)) if self.price_n > 1 else np.nan,
+            'shelf_life_max': self.shelf_life_max
+        }
+
+
+@contextlib.contextmanager
+def _quiet():
+    """Silence the per-call progress output of predictor methods."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+class OutOfCorePipeline:
+    """
+    Runs training and prediction one store partition at a time.
+    """
+
+    def __init__(self, predictor, memory_budget_mb=1024, workdir=None, chunk_rows=100000):
+        """
+        Initialize the pipeline.
+
+        Args:
+            predictor (FoodSurplusPredictor): Supplies data paths, feature
+                engineering, training and prediction
+            memory_budget_mb (float): Memory the pipeline should stay within
+            workdir (str): Spill directory (a temporary directory, removed
+                afterwards, when None)
+            chunk_rows (int): CSV rows read at a time
+        """
+        self.predictor = predictor
+        self.memory_budget_mb = memory_budget_mb
+        self.workdir = workdir
+        self.chunk_rows = chunk_rows
+        self.monitor = StageMonitor()
+
+    def _partition_dir(self, kind, store=None):
+        path = os.path.join(self.workdir, kind)
+        return os.path.join(path, f"store_id={quote(str(store), safe='')}") if store is not None else path
+
+    def _spill(self, kind, chunk, chunk_number):
+        """Append one chunk's rows to the per-store partitions."""
+        for store, part in chunk.groupby('store_id', observed=True):
+            directory = self._partition_dir(kind, store)
+            os.makedirs(directory, exist_ok=True)
+            part.reset_index(drop=True).to_pickle(os.path.join(directory, f"part-{chunk_number}.pkl"))
+
+    def _read_partition(self, kind, store):
+        """All parts of one store, or None if the store has none."""
+        paths = sorted(glob.glob(os.path.join(self._partition_dir(kind, store), 'part-*.pkl')))
+        return concat_frames(pd.read_pickle(path) for path in paths) if paths else None
+
+    def partition_inputs(self):
+        """
+        Split the surplus and sales CSVs into per-store files.
+
+        Returns:
+            list: Store ids present in the surplus data
+        """
+        predictor = self.predictor
+        stores = set()
+        surplus_path = f"{predictor.data_path}mock_food_surplus_data.csv"
+        for number, chunk in enumerate(read_table(surplus_path, SURPLUS_SCHEMA, chunksize=self.chunk_rows)):
+            chunk = predictor.clean_surplus_data(chunk)
+            stores.update(chunk['store_id'].dropna().unique())
+            self._spill('surplus', chunk, number)
+
+        sales_path = f"{predictor.data_path}Mock_Historical_Sales_Data_-_10_Stores.csv"
+        for number, chunk in enumerate(read_table(sales_path, SALES_SCHEMA, chunksize=self.chunk_rows)):
+            self._spill('sales', predictor.clean_sales_data(chunk), number)
+
+        stores = sorted(stores)
+        print(f"   📦 {len(stores)} store partitions written to {self.workdir}")
+        return stores
+
+    def build_features(self, stores, brain_diet_df):
+        """
+        Merge and engineer series features store by store.
+
+        Returns:
+            tuple: (stores with features, GlobalStatsAccumulator, RowSample,
+                IncrementalFeatureState)
+        """
+        predictor = self.predictor
+        budget_bytes = self.memory_budget_mb * 2 ** 20
+        accumulator = GlobalStatsAccumulator()
+        sample = RowSample(budget_bytes * SAMPLE_SHARE)
+        state = IncrementalFeatureState()
+        os.makedirs(self._partition_dir('features'), exist_ok=True)
+        merged_rows = 0
+
+        built = []
+        for number, store in enumerate(stores):
+            surplus_df = self._read_partition('surplus', store)
+            sales_df = self._read_partition('sales', store)
+            if surplus_df is None or sales_df is None:
+                continue
+            unify_categories([surplus_df, sales_df], KEYS)
+
+            with _quiet():
+                merged_df = predictor.merge_datasets(surplus_df, sales_df, brain_diet_df, allow_empty=True)
+            merged_rows += len(merged_df)
+            if not len(merged_df):
+                continue
+            state.add_history(merged_df)
+            # A different noise stream per partition
+            features_df = predictor.engineer_series_features(merged_df, seed=42 + number)
+            del surplus_df, sales_df, merged_df
+
+            size_mb = frame_memory_mb(features_df)
+            if size_mb > self.memory_budget_mb / 2:
+                print(f"   ⚠️  Store {store} features take {size_mb:.0f} MB, over half the memory budget")
+
+            accumulator.add(features_df)
+            # Only model inputs and the keys the store/product aggregates are looked up by
+            sample.add(features_df[KEYS + features_df.select_dtypes(include=['number', 'bool']).columns.tolist()])
+            features_df.to_pickle(self._partition_dir('features', store) + '.pkl')
+            built.append(store)
+            print(f"   📦 Store {store}: {len(features_df):,} feature rows ({size_mb:.1f} MB)")
+
+        predictor.merge_stats = {'join_mode': predictor.join_mode, 'merged_rows': merged_rows, 'partitions': len(built)}
+        if not merged_rows:
+            raise ValueError(f"Join '{predictor.join_mode}' matched no surplus rows to sales rows in any store "
+                             "partition; on this data try join_mode 'key' or 'asof' (--join-mode)")
+        return built, accumulator, sample, state
+
+    def train(self, accumulator, sample):
+        """
+        Fit the model on the row sample.
+
+        Returns:
+            tuple: (metrics dict, global feature stats, prediction fill values)
+        """
+        predictor = self.predictor
+        training_df = sample.frame
+        lag_cols = [col for col in training_df.columns if 'lag_' in col]
+        stats = accumulator.stats(training_df[lag_cols].median().to_dict())
+
+        print(f"   🎲 Training sample: {len(training_df):,} of {sample.rows_seen:,} rows "
+              f"({frame_memory_mb(training_df):.1f} MB)")
+        training_df = predictor.add_global_features(training_df, stats)
+        X, y = predictor.prepare_temporal_training_data(training_df)
+        metrics = predictor.train_temporal_model(X, y)
+        metrics['training_rows'] = len(X)
+        metrics['total_rows'] = sample.rows_seen
+        return metrics, stats, X.median()
+
+    def predict(self, stores, stats, fill_values, output_path):
+        """
+        Score every partition and stream the predictions to disk.
+
+        Returns:
+            int: Predictions written
+        """
+        predictor = self.predictor
+        os.makedirs(self._partition_dir('predictions'), exist_ok=True)
+        paths = []
+        for store in stores:
+            features_df = pd.read_pickle(self._partition_dir('features', store) + '.pkl')
+            features_df = predictor.add_global_features(features_df, stats)
+            with _quiet():
+                predictions_df = predictor.generate_predictions(features_df, fill_values)
+            path = self._partition_dir('predictions', store) + '.pkl'
+            predictions_df.to_pickle(path)
+            paths.append(path)
+
+        def frames():
+            for path in paths:
+                yield pd.read_pickle(path)
+
+        count = write_prediction_frames(frames(), output_path)
+        print(f"   💾 {count:,} predictions written to {output_path}")
+        if PYARROW_AVAILABLE:
+            arrow_path = os.path.splitext(output_path)[0] + '.arrow'
+            write_prediction_frames(frames(), arrow_path)
+            print(f"   💾 Memory-mappable copy written to {arrow_path}")
+        return count
+
+    def run(self, output_path="predicted_surplus.json", state_path="feature_state.npz"):
+        """
+        Run all stages.
+
+        Args:
+            output_path (str): Predictions file (an .arrow copy is written next to it)
+            state_path (str): Feature history for the model server
+
+        Returns:
+            dict: metrics, model, predictions_written and the stage report
+        """
+        print(f"🚀 Starting out-of-core pipeline (memory budget {self.memory_budget_mb:.0f} MB)")
+        print("=" * 60)
+
+        temporary = self.workdir is None
+        if temporary:
+            self.workdir = tempfile.mkdtemp(prefix='foodcast-ooc-')
+        else:
+            # Partitions of an earlier run would be picked up again
+            for kind in ('surplus', 'sales', 'features', 'predictions'):
+                shutil.rmtree(self._partition_dir(kind), ignore_errors=True)
+        try:
+            predictor = self.predictor
+            # The brain diet lookup table is small and stays in memory
+            brain_diet_df = read_table(f"{predictor.data_path}brain_diet_foundation_foods_mvp.csv", BRAIN_DIET_SCHEMA)
+
+            with self.monitor.stage('partition'):
+                stores = self.partition_inputs()
+            with self.monitor.stage('features'):
+                stores, accumulator, sample, state = self.build_features(stores, brain_diet_df)
+            if sample.frame is None:
+                raise ValueError("No merged rows: surplus and sales data share no store/product series")
+            with self.monitor.stage('train'):
+                metrics, stats, fill_values = self.train(accumulator, sample)
+                del sample
+            with self.monitor.stage('predict'):
+                count = self.predict(stores, stats, fill_values, output_path)
+            # Missing lags are filled with the sample medians the model was trained with
+            state.fill_values = {col: float(value) for col, value in stats['lag_medians'].items()}
+            state.save(state_path)
+            print(f"   📚 Feature history for {state.n_series} series saved to {state_path}")
+        finally:
+            if temporary:
+                shutil.rmtree(self.workdir, ignore_errors=True)
+                self.workdir = None
+
+        print("=" * 60)
+        print("🎉 Out-of-core pipeline completed successfully!")
+        self.monitor.report()
+
+        return {
+            'metrics': metrics,
+            'model': self.predictor.model,
+            'predictions_written': count,
+            'stages': self.monitor.stages
+        }
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+FoodCast Online Feature Vectorizer
+Zero-DataFrame feature building for the model server.
+
+A FeatureVectorizer is compiled once per model version from its
+feature_columns. It writes request features straight into a preallocated
+float64 matrix in model column order, computing only the features the model
+actually selected. Definitions mirror the training features in
+surplus_model.py. Lag, rolling, trend and aggregate features come from the
+series history in a HistoricalFeatureIndex (feature_index.py) when one is
+given; series without history fall back to deterministic defaults derived
+from the request's daily_sales / stock_level, so equal requests always
+produce equal features.
+"""
+
+from functools import cached_property, lru_cache
+
+import numpy as np
+
+from feature_engine import LAGS, ROLLING_WINDOWS
+
+# Fallback feature set when a model does not list its columns
+BASIC_FEATURES = ['daily_sales_sales', 'stock_level', 'price', 'promotion_encoded', 'brain_diet_encoded']
+
+# Share of today's (stock - sales) assumed as surplus for series without history
+SURPLUS_LAG_FACTORS = {1: 0.3, 2: 0.25, 3: 0.2, 7: 0.15}
+
+
+class InvalidRecordError(ValueError):
+    """Raised when a request record cannot be turned into features."""
+
+    def __init__(self, index, reason):
+        super().__init__(f"Record {index}: {reason}")
+        self.index = index
+        self.reason = reason
+
+
+class _RecordBatch:
+    """
+    Column views over a list of request records, extracted on first use.
+    """
+
+    def __init__(self, records, index=None, history_names=None):
+        self.records = records
+        self.n = len(records)
+        self.index = index
+        self.history_names = history_names
+
+    def field(self, name, default):
+        """Float column of a request field with per-record defaults."""
+        values = [record.get(name) for record in self.records]
+        return np.array([default if value is None else value for value in values], dtype=np.float64)
+
+    def flag(self, name):
+        """0/1 column of a boolean request field."""
+        return np.array([bool(record.get(name) or False) for record in self.records], dtype=np.float64)
+
+    @cached_property
+    def daily_sales(self):
+        return self.field('daily_sales', 50)
+
+    @cached_property
+    def stock_level(self):
+        return self.field('stock_level', 100)
+
+    @cached_property
+    def price(self):
+        return self.field('price', 10)
+
+    @cached_property
+    def shelf_life_days(self):
+        return self.field('shelf_life_days', 7)
+
+    @cached_property
+    def promotion(self):
+        return self.flag('promotion_flag')
+
+    @cached_property
+    def brain_diet(self):
+        return self.flag('brain_diet_flag')
+
+    @cached_property
+    def days(self):
+        """Days since 1970-01-01 for every record's prediction date."""
+        today = np.datetime64('now', 'D')
+        dates = [record.get('date') or today for record in self.records]
+        try:
+            parsed = np.array(dates, dtype='datetime64[D]')
+        except ValueError:
+            # Non-ISO date strings: parse every record on its own with the pandas
+            # parser, so records of one batch may use different formats
+            import pandas as pd
+            parsed = np.empty(len(dates), dtype='datetime64[D]')
+            for i, value in enumerate(dates):
+                try:
+                    timestamp = pd.Timestamp(value)
+                except (TypeError, ValueError):
+                    timestamp = pd.NaT
+                if pd.isna(timestamp):
+                    raise InvalidRecordError(i, f"unparseable date {value!r}")
+                parsed[i] = timestamp.to_datetime64().astype('datetime64[D]')
+        return parsed.astype(np.int64)
+
+    @cached_property
+    def calendar(self):
+        """Year, month, day, weekday and day-of-year columns."""
+        dates = self.days.astype('datetime64[D]')
+        years = dates.astype('datetime64[Y]')
+        months = dates.astype('datetime64[M]')
+        return {
+            'year': years.astype(np.int64) + 1970,
+            'month': (months - years).astype(np.int64) + 1,
+            'day': (dates - months).astype(np.int64) + 1,
+            'dayofweek': (self.days + 3) % 7,  # 1970-01-01 was a Thursday
+            'dayofyear': (dates - years).astype(np.int64) + 1
+        }
+
+    @cached_property
+    def iso_week(self):
+        """ISO-8601 week number, matching pandas ``dt.isocalendar().week``."""
+        cal = self.calendar
+        week = (cal['dayofyear'] - (cal['dayofweek'] + 1) + 10) // 7
+        week = np.where(week > _weeks_in_year(cal['year']), 1, week)
+        return np.where(week < 1, _weeks_in_year(cal['year'] - 1), week)
+
+    @cached_property
+    def history(self):
+        """Historical series features for every record (empty without an index)."""
+        if self.index is None:
+            return {}
+        return self.index.features_for(self.records, self.daily_sales, self.stock_level, self.history_names)
+
+    def historical(self, name, default):
+        """History-backed feature values, falling back to ``default`` where unknown."""
+        values = self.history.get(name)
+        if values is None:
+            return default
+        return np.where(np.isnan(values), default, values)
+
+    @cached_property
+    def sales_variation(self):
+        return self.daily_sales * 0.1  # 10% variation
+
+    @cached_property
+    def stock_variation(self):
+        return self.stock_level * 0.1
+
+    @cached_property
+    def surplus_base(self):
+        return self.stock_level - self.daily_sales
+
+
+def _weeks_in_year(year):
+    """Number of ISO weeks (52 or 53) in each year."""
+    def jan1_weekday(y):
+        days = (np.asarray(y) - 1970).astype('datetime64[Y]').astype('datetime64[D]').astype(np.int64)
+        return (days + 3) % 7
+    leap = ((year % 4 == 0) & (year % 100 != 0)) | (year % 400 == 0)
+    starts_thursday = jan1_weekday(year) == 3
+    return np.where(starts_thursday | (leap & (jan1_weekday(year) == 2)), 53, 52)
+
+
+# Month -> flag lookup tables (index 0 unused)
+_QUARTER_START_MONTH = np.isin(np.arange(13), [1, 4, 7, 10])
+_QUARTER_END_MONTH = np.isin(np.arange(13), [3, 6, 9, 12])
+
+# Features always derived from the request itself
+COMPUTED_FEATURES = {
+    # Temporal features
+    'year': lambda b: b.calendar['year'],
+    'month': lambda b: b.calendar['month'],
+    'day': lambda b: b.calendar['day'],
+    'dayofweek': lambda b: b.calendar['dayofweek'],
+    'dayofyear': lambda b: b.calendar['dayofyear'],
+    'quarter': lambda b: (b.calendar['month'] - 1) // 3 + 1,
+    'week': lambda b: b.iso_week,
+
+    # Cyclical encoding for temporal features
+    'month_sin': lambda b: np.sin(2 * np.pi * b.calendar['month'] / 12),
+    'month_cos': lambda b: np.cos(2 * np.pi * b.calendar['month'] / 12),
+    'dayofweek_sin': lambda b: np.sin(2 * np.pi * b.calendar['dayofweek'] / 7),
+    'dayofweek_cos': lambda b: np.cos(2 * np.pi * b.calendar['dayofweek'] / 7),
+    'dayofyear_sin': lambda b: np.sin(2 * np.pi * b.calendar['dayofyear'] / 365),
+    'dayofyear_cos': lambda b: np.cos(2 * np.pi * b.calendar['dayofyear'] / 365),
+
+    # Business calendar features
+    'is_weekend': lambda b: b.calendar['dayofweek'] >= 5,
+    'is_month_start': lambda b: b.calendar['day'] <= 5,
+    'is_month_end': lambda b: b.calendar['day'] >= 25,
+    'is_quarter_start': lambda b: (b.calendar['day'] == 1) & _QUARTER_START_MONTH[b.calendar['month']],
+    'is_quarter_end': lambda b: (b.calendar['day'] >= 28) & _QUARTER_END_MONTH[b.calendar['month']],
+
+    # Encoded, normalized and interaction features
+    'promotion_encoded': lambda b: b.promotion,
+    'brain_diet_encoded': lambda b: b.brain_diet,
+    'price_normalized': lambda b: (b.price - 10) / 20,  # Normalize around typical price range
+    'shelf_life_normalized': lambda b: b.shelf_life_days / 30,  # Normalize around typical shelf life
+    'promotion_sales_interaction': lambda b: b.promotion * b.daily_sales
+}
+
+
+def _from_history(name, default):
+    """Feature read from the series history, else a default computed from the request."""
+    return lambda b: b.historical(name, default(b))
+
+
+def _surplus_default(factor):
+    return lambda b: np.maximum(0, b.surplus_base * factor)
+
+
+# Features a request may provide directly; otherwise taken from history or these defaults
+DEFAULT_FEATURES = {
+    'daily_sales_sales': lambda b: b.daily_sales,  # Use actual input
+    'stock_level': lambda b: b.stock_level,        # Use actual input
+    'price': lambda b: b.price,                    # Use actual input
+    'sales_volatility_7day': _from_history('sales_volatility_7day',
+                                           # Guarded like training's std / (mean + 1e-8)
+                                           lambda b: np.maximum(0.1, b.sales_variation / (b.daily_sales + 1e-8))),
+    'sales_trend_7day': _from_history('sales_trend_7day', lambda b: 0.0),
+    'stock_trend_7day': _from_history('stock_trend_7day', lambda b: 0.0),
+}
+for _window in ROLLING_WINDOWS:
+    DEFAULT_FEATURES[f'sales_{_window}day_avg'] = _from_history(f'sales_{_window}day_avg', lambda b: b.daily_sales)
+    DEFAULT_FEATURES[f'sales_{_window}day_std'] = _from_history(f'sales_{_window}day_std', lambda b: b.sales_variation)
+    DEFAULT_FEATURES[f'stock_{_window}day_avg'] = _from_history(f'stock_{_window}day_avg', lambda b: b.stock_level)
+for _lag in LAGS:
+    DEFAULT_FEATURES[f'sales_lag_{_lag}'] = _from_history(f'sales_lag_{_lag}', lambda b: b.daily_sales)
+    DEFAULT_FEATURES[f'stock_lag_{_lag}'] = _from_history(f'stock_lag_{_lag}', lambda b: b.stock_level)
+for _lag, _factor in SURPLUS_LAG_FACTORS.items():
+    DEFAULT_FEATURES[f'surplus_lag_{_lag}'] = _from_history(f'surplus_lag_{_lag}', _surplus_default(_factor))
+for _prefix in ('store', 'product'):
+    DEFAULT_FEATURES[f'{_prefix}_avg_sales'] = _from_history(f'{_prefix}_avg_sales', lambda b: b.daily_sales)
+    DEFAULT_FEATURES[f'{_prefix}_avg_stock'] = _from_history(f'{_prefix}_avg_stock', lambda b: b.stock_level)
+
+
+class FeatureVectorizer:
+    """
+    Builds model input rows from request records without pandas.
+    """
+
+    def __init__(self, feature_columns=None):
+        """
+        Compile the feature writers for a model's column order.
+
+        Args:
+            feature_columns (list): Feature order expected by the model
+        """
+        self.feature_columns = list(feature_columns) if feature_columns else list(BASIC_FEATURES)
+        self._computed = []
+        self._overridable = []
+        for i, name in enumerate(self.feature_columns):
+            if name in COMPUTED_FEATURES:
+                self._computed.append((i, COMPUTED_FEATURES[name]))
+            else:
+                self._overridable.append((i, name, DEFAULT_FEATURES.get(name)))
+        # The feature index computes only the history features this model uses
+        self._history_names = frozenset(name for _, name, _ in self._overridable)
+
+    def transform(self, records, index=None, out=None):
+        """
+        Build the feature matrix for a list of request records.
+
+        Args:
+            records (list): Input dicts
+            index (HistoricalFeatureIndex): Series history for lag/rolling/aggregate features
+            out (np.ndarray): Optional preallocated (len(records), n_features) float64 buffer
+
+        Returns:
+            np.ndarray: Feature matrix in feature_columns order
+        """
+        batch = _RecordBatch(records, index, self._history_names)
+        if out is None:
+            out = np.empty((batch.n, len(self.feature_columns)), dtype=np.float64)
+
+        for i, writer in self._computed:
+            out[:, i] = writer(batch)
+
+        provided = set().union(*records) if records else set()
+        for i, name, writer in self._overridable:
+            default = writer(batch) if writer is not None else 0.0
+            if name in provided:
+                # Request-supplied values win; missing ones use the default
+                given = batch.field(name, np.nan)
+                out[:, i] = np.where(np.isnan(given), default, given)
+            else:
+                out[:, i] = default
+
+        # Non-finite request values become NaN: hist models route them as missing,
+        # GradientBoostingRegressor models reject them like sklearn (see tree_inference.py)
+        out[np.isinf(out)] = np.nan
+        return out
+
+    def transform_one(self, record, index=None):
+        """
+        Build the (1, n_features) feature row for a single request record.
+
+        Args:
+            record (dict): Input data
+            index (HistoricalFeatureIndex): Series history for lag/rolling/aggregate features
+
+        Returns:
+            np.ndarray: Feature row
+        """
+        return self.transform([record], index)
+
+
+@lru_cache(maxsize=8)
+def _compiled(feature_columns):
+    return FeatureVectorizer(feature_columns)
+
+
+def get_vectorizer(feature_columns):
+    """
+    Return the (cached) vectorizer for a model's feature columns.
+
+    Args:
+        feature_columns (list): Feature order expected by the model
+
+    Returns:
+        FeatureVectorizer: Compiled vectorizer
+    """
+    return _compiled(tuple(feature_columns or ()))
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+FoodCast Temporal Feature Engine
+Vectorized rolling, lag, trend and volatility features for store/product series.
+
+The training frame is sorted once by (store_id, product_id, date) so that every
+series occupies a contiguous block of rows. The group offsets of those blocks are
+computed once and every feature is then built with whole-column NumPy kernels
+instead of per-group Python callbacks. Results match the pandas
+groupby().rolling() definitions used by the original pipeline.
+"""
+
+import numpy as np
+
+# Version of the feature definitions; bump whenever engineered columns change
+# so cached feature sets (feature_store.py) are rebuilt
+FEATURE_VERSION = '3'
+
+# Window and lag definitions shared by the batch and online feature paths
+ROLLING_WINDOWS = [3, 7, 14]
+LAGS = [1, 2, 3, 7, 14]
+TREND_WINDOW = 7
+TREND_MIN_PERIODS = 3
+
+
+class SeriesLayout:
+    """
+    Row layout of contiguous series in a frame sorted by its group keys.
+
+    Stores, for every row, its series id and its position inside the series,
+    which is all the kernels need to mask values that would cross a series
+    boundary.
+    """
+
+    def __init__(self, group_ids):
+        """
+        Initialize the layout from per-row series ids.
+
+        Args:
+            group_ids (np.ndarray): Non-decreasing series id for every row
+        """
+        self.group_ids = np.asarray(group_ids, dtype=np.int64)
+        n = len(self.group_ids)
+
+        # Offsets of the first row of each series, plus the end sentinel
+        is_start = np.ones(n, dtype=bool)
+        if n > 1:
+            is_start[1:] = self.group_ids[1:] != self.group_ids[:-1]
+        self.starts = np.flatnonzero(is_start)
+        self.offsets = np.append(self.starts, n)
+
+        # Position of every row inside its series
+        series_index = np.cumsum(is_start) - 1
+        self.position = np.arange(n) - self.starts[series_index] if n else np.zeros(0, dtype=np.int64)
+        self.size = n
+
+    @classmethod
+    def from_sorted_frame(cls, df, keys):
+        """
+        Build the layout for a frame already sorted by the given keys.
+
+        Args:
+            df (pd.DataFrame): Frame sorted by ``keys``
+            keys (list): Group key columns
+
+        Returns:
+            SeriesLayout: Layout of the series in ``df``
+        """
+        n = len(df)
+        boundary = np.zeros(n, dtype=bool)
+        if n:
+            boundary[0] = True
+        for key in keys:
+            column = df[key]
+            values = column.cat.codes.to_numpy() if hasattr(column, 'cat') else column.to_numpy()
+            if n > 1:
+                boundary[1:] |= values[1:] != values[:-1]
+        return cls(np.cumsum(boundary) - 1)
+
+    @property
+    def n_series(self):
+        """Number of series in the layout."""
+        return len(self.starts)
+
+    def subset(self, mask):
+        """
+        Return the layout of the rows selected by a boolean mask.
+
+        Args:
+            mask (np.ndarray): Boolean row mask
+
+        Returns:
+            SeriesLayout: Layout of the remaining rows
+        """
+        return SeriesLayout(self.group_ids[np.asarray(mask, dtype=bool)])
+
+    def shift(self, values, periods):
+        """
+        Shift values within each series, like ``groupby().shift(periods)``.
+
+        Args:
+            values (np.ndarray): Column values in layout order
+            periods (int): Positive for lags, negative for leads
+
+        Returns:
+            np.ndarray: Shifted float64 values with NaN across series boundaries
+        """
+        values = np.asarray(values, dtype=np.float64)
+        out = np.full(self.size, np.nan)
+        if periods == 0:
+            out[:] = values
+        elif periods > 0:
+            if periods < self.size:
+                out[periods:] = values[:-periods]
+            out[self.position < periods] = np.nan
+        else:
+            periods = -periods
+            if periods < self.size:
+                out[:-periods] = values[periods:]
+            remaining = self.offsets[self.group_ids + 1] - np.arange(self.size) - 1
+            out[remaining < periods] = np.nan
+        return out
+
+    def _window_sum_count(self, values, window):
+        """Sum and count of non-NaN values over each trailing window."""
+        total = np.zeros(self.size)
+        count = np.zeros(self.size, dtype=np.int64)
+        for k in range(window):
+            shifted = self.shift(values, k)
+            valid = ~np.isnan(shifted)
+            total += np.where(valid, shifted, 0.0)
+            count += valid
+        return total, count
+
+    def rolling_mean(self, values, window, min_periods=1):
+        """
+        Trailing mean per series, like ``rolling(window, min_periods).mean()``.
+
+        Args:
+            values (np.ndarray): Column values in layout order
+            window (int): Window length in rows
+            min_periods (int): Minimum non-NaN observations
+
+        Returns:
+            np.ndarray: Rolling mean
+        """
+        total, count = self._window_sum_count(values, window)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = total / count
+        mean[count < min_periods] = np.nan
+        return mean
+
+    def rolling_std(self, values, window, min_periods=1):
+        """
+        Trailing sample standard deviation per series (ddof=1).
+
+        Args:
+            values (np.ndarray): Column values in layout order
+            window (int): Window length in rows
+            min_periods (int): Minimum non-NaN observations
+
+        Returns:
+            np.ndarray: Rolling standard deviation
+        """
+        total, count = self._window_sum_count(values, window)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = total / count
+
+        # Second pass over the window for a numerically stable variance
+        squares = np.zeros(self.size)
+        for k in range(window):
+            deviation = self.shift(values, k) - mean
+            squares += np.where(np.isnan(deviation), 0.0, deviation * deviation)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.sqrt(squares / (count - 1))
+        std[(count < min_periods) | (count < 2)] = np.nan
+        return std
+
+    def rolling_trend(self, values, window, min_periods=1):
+        """
+        Average per-step change across the trailing window:
+        ``(y[-1] - y[0]) / len(y)``.
+
+        Args:
+            values (np.ndarray): Column values in layout order
+            window (int): Window length in rows
+            min_periods (int): Minimum non-NaN observations
+
+        Returns:
+            np.ndarray: Rolling trend
+        """
+        values = np.asarray(values, dtype=np.float64)
+        _, count = self._window_sum_count(values, window)
+
+        length = np.minimum(self.position + 1, window)
+        first = values[np.arange(self.size) - (length - 1)]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            trend = np.where(length > 1, (values - first) / length, 0.0)
+        trend[count < min_periods] = np.nan
+        return trend
+
+
+def series_feature_names():
+    """Names of the compute_series_features() outputs, in order."""
+    names = []
+    for window in ROLLING_WINDOWS:
+        names += [f'sales_{window}day_avg', f'sales_{window}day_std', f'stock_{window}day_avg']
+    for lag in LAGS:
+        names += [f'sales_lag_{lag}', f'stock_lag_{lag}', f'surplus_lag_{lag}']
+    return names + ['sales_trend_7day', 'stock_trend_7day', 'sales_volatility_7day']
+
+
+def compute_series_features(layout, sales, stock, surplus):
+    """
+    Compute all per-series rolling, lag, trend and volatility features.
+
+    Args:
+        layout (SeriesLayout): Layout of the sorted training frame
+        sales (np.ndarray): Daily sales in layout order
+        stock (np.ndarray): Stock levels in layout order
+        surplus (np.ndarray): Surplus target in layout order
+
+    Returns:
+        dict: Feature name -> float64 array, in the pipeline's column order
+    """
+    sales = np.asarray(sales, dtype=np.float64)
+    stock = np.asarray(stock, dtype=np.float64)
+    surplus = np.asarray(surplus, dtype=np.float64)
+    features = {}
+
+    # Rolling features for temporal patterns
+    for window in ROLLING_WINDOWS:
+        features[f'sales_{window}day_avg'] = layout.rolling_mean(sales, window)
+        features[f'sales_{window}day_std'] = layout.rolling_std(sales, window)
+        features[f'stock_{window}day_avg'] = layout.rolling_mean(stock, window)
+
+    # Lag features for temporal dependencies
+    for lag in LAGS:
+        features[f'sales_lag_{lag}'] = layout.shift(sales, lag)
+        features[f'stock_lag_{lag}'] = layout.shift(stock, lag)
+        features[f'surplus_lag_{lag}'] = layout.shift(surplus, lag)
+
+    # Trend features
+    features['sales_trend_7day'] = layout.rolling_trend(sales, TREND_WINDOW, TREND_MIN_PERIODS)
+    features['stock_trend_7day'] = layout.rolling_trend(stock, TREND_WINDOW, TREND_MIN_PERIODS)
+
+    # Volatility features
+    features['sales_volatility_7day'] = (
+        layout.rolling_std(sales, TREND_WINDOW, TREND_MIN_PERIODS)
+        / (layout.rolling_mean(sales, TREND_WINDOW, TREND_MIN_PERIODS) + 1e-8)
+    )
+
+    return features
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+FoodCast Historical Feature Index
+Per-(store_id, product_id) history lookups for online predictions.
+
+The model server used to fabricate lag, rolling and aggregate features from
+random noise around the request's daily_sales. This index serves them from
+the real history instead: it wraps the incremental ring-buffer state built
+from the historical CSVs, looks each request's series up by key in O(1), and
+treats the request as the newest row of that series. New sales can be pushed
+into the index at runtime, so features follow the data without a restart.
+"""
+
+import os
+import threading
+
+import numpy as np
+
+from incremental_features import HISTORY, SIGNALS, IncrementalFeatureState, feature_names, window_features
+
+AGGREGATE_FEATURES = frozenset(['store_avg_sales', 'store_avg_stock', 'product_avg_sales', 'product_avg_stock'])
+SERIES_FEATURES = frozenset(feature_names())
+
+
+class HistoricalFeatureIndex:
+    """
+    Thread-safe lookup of historical series features for request records.
+    """
+
+    def __init__(self, state=None, source=None):
+        """
+        Initialize the index.
+
+        Args:
+            state (IncrementalFeatureState): Per-series history
+            source (str): Where the state was loaded from
+        """
+        self.state = state or IncrementalFeatureState()
+        self.source = source
+        self.updates = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path="feature_state.npz"):
+        """
+        Load the index from a state file written by the training pipeline.
+
+        Args:
+            path (str): Incremental state archive
+
+        Returns:
+            HistoricalFeatureIndex: Loaded index (empty if the file is missing or stale)
+        """
+        if not os.path.exists(path):
+            return cls(source=None)
+        try:
+            return cls(IncrementalFeatureState.load(path), source=path)
+        except ValueError as e:
+            # Built for other feature definitions; retrain to regenerate it
+            print(f"⚠️  Ignoring feature history: {e}")
+            return cls(source=None)
+
+    @property
+    def n_series(self):
+        """Number of series with history."""
+        return self.state.n_series
+
+    @property
+    def generation(self):
+        """Count of applied sales updates; changes whenever served features may change."""
+        with self._lock:
+            return self.updates
+
+    def features_for(self, records, daily_sales, stock_level, names=None):
+        """
+        Historical features for records treated as each series' newest row.
+
+        Args:
+            records (list): Request dicts with store_id and product_id
+            daily_sales (np.ndarray): Today's sales per record
+            stock_level (np.ndarray): Today's stock per record
+            names (iterable): Features the model uses (None = every series and
+                aggregate feature); only these are computed
+
+        Returns:
+            dict: Feature name -> array per record, NaN where history is missing
+        """
+        if names is None:
+            series_names, aggregate_names = SERIES_FEATURES, AGGREGATE_FEATURES
+        else:
+            series_names = SERIES_FEATURES.intersection(names)
+            aggregate_names = AGGREGATE_FEATURES.intersection(names)
+            if not series_names and not aggregate_names:
+                return {}
+        # Every series feature name starts with the signal it is computed from
+        signals = [signal for signal in SIGNALS if any(name.startswith(signal + '_') for name in series_names)]
+
+        n = len(records)
+        state = self.state
+        with self._lock:
+            series = np.array([
+                state.series_index.get((str(record.get('store_id')), str(record.get('product_id'))), -1)
+                for record in records
+            ], dtype=np.int64)
+            known = series >= 0
+
+            # Previous HISTORY - 1 observations, newest first
+            history = {signal: np.full((n, HISTORY), np.nan) for signal in signals}
+            count = np.ones(n, dtype=np.int64)
+            if known.any() and signals:
+                idx = series[known]
+                for signal in signals:
+                    history[signal][known, 1:] = state._window(idx, SIGNALS.index(signal), HISTORY - 1)
+                count[known] = np.minimum(state.count[idx] + 1, HISTORY)
+
+            aggregates = {}
+            for column, totals, prefix in (('store_id', state.store_totals, 'store'),
+                                           ('product_id', state.product_totals, 'product')):
+                if aggregate_names.isdisjoint([f'{prefix}_avg_sales', f'{prefix}_avg_stock']):
+                    continue
+                sums = [totals.get(str(record.get(column))) for record in records]
+                aggregates[f'{prefix}_avg_sales'] = np.array(
+                    [total[0] / total[2] if total else np.nan for total in sums], dtype=np.float64)
+                aggregates[f'{prefix}_avg_stock'] = np.array(
+                    [total[1] / total[2] if total else np.nan for total in sums], dtype=np.float64)
+
+        # The request is the newest row; its end inventory is the previous row's surplus
+        if 'sales' in history:
+            history['sales'][:, 0] = daily_sales
+        if 'stock' in history:
+            history['stock'][:, 0] = stock_level
+        if 'surplus' in history:
+            end_inventory = np.array([
+                record['end_inventory'] if record.get('end_inventory') is not None else np.nan
+                for record in records
+            ], dtype=np.float64)
+            end_inventory = np.where(np.isnan(end_inventory), np.maximum(0, stock_level - daily_sales),
+                                     end_inventory)
+            history['surplus'][known, 1] = np.where(np.isnan(history['surplus'][known, 1]),
+                                                    end_inventory[known], history['surplus'][known, 1])
+
+        features = window_features(history, count, series_names) if series_names else {}
+        # Known series fill missing lags like training did; unknown ones stay NaN
+        for name, value in state.fill_values.items():
+            if name in features:
+                features[name] = np.where(known & np.isnan(features[name]), value, features[name])
+        features.update(aggregates)
+        return features
+
+    def add_sales(self, rows):
+        """
+        Push newly observed sales rows into the index.
+
+        Rows dated at or before the last update of their series (a retried
+        request or an out-of-order day) are skipped, so they cannot corrupt
+        the lag, rolling and aggregate features.
+
+        Args:
+            rows (pd.DataFrame): Rows with store_id, product_id, date,
+                daily_sales_sales, stock_level and end_inventory
+
+        Returns:
+            dict: Rows applied, rows skipped and number of series updated
+        """
+        with self._lock:
+            features = self.state.update(rows)
+            if len(features):
+                self.updates += 1
+        return {
+            'applied': len(features),
+            'skipped': len(rows) - len(features),
+            'series_updated': features.groupby(['store_id', 'product_id']).ngroups
+        }
+
+    def save(self, path="feature_state.npz"):
+        """Persist the current state."""
+        with self._lock:
+            self.state.save(path)
+
+    def stats(self):
+        """Index status for health endpoints."""
+        return {
+            'series': self.n_series,
+            'stores': len(self.state.store_totals),
+            'products': len(self.state.product_totals),
+            'source': self.source,
+            'updates': self.updates
+        }
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+FoodCast Feature Store
+Persistent, partitioned columnar cache for engineered training features.
+
+Engineered feature frames are written once per unique combination of input
+file contents and feature-definition version, partitioned by store and month
+on local disk. Arrow IPC partitions are memory-mapped on read (zero-copy);
+Parquet partitions trade a decode step for smaller files.
+
+Layout:
+    <root>/<cache_key>/manifest.json
+    <root>/<cache_key>/store_id=<id>/date=<YYYY-MM>/part-0.arrow
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+from feature_engine import FEATURE_VERSION
+
+ROW_COLUMN = '_row'
+FORMAT_EXTENSIONS = {'arrow': 'arrow', 'parquet': 'parquet'}
+
+
+def file_content_hash(path, chunk_size=1 << 20):
+    """
+    Compute the SHA-256 of a file's contents.
+
+    Args:
+        path (str): File path
+        chunk_size (int): Bytes read per chunk
+
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def input_file_hashes(input_paths):
+    """
+    Content hash of every input file, keyed by file name.
+
+    Args:
+        input_paths (list): Input files
+
+    Returns:
+        dict: File name -> hex digest
+    """
+    return {os.path.basename(path): file_content_hash(path) for path in input_paths}
+
+
+def inputs_hash(input_paths):
+    """
+    Combined content hash of a set of input files, independent of their directory.
+
+    Args:
+        input_paths (list): Input files
+
+    Returns:
+        str: Hex digest (24 characters)
+    """
+    hashes = input_file_hashes(input_paths)
+    return hashlib.sha256(json.dumps(hashes, sort_keys=True).encode('utf-8')).hexdigest()[:24]
+
+
+class FeatureStore:
+    """
+    Content-addressed store of engineered feature frames.
+    """
+
+    def __init__(self, root="feature_store/", file_format='arrow'):
+        """
+        Initialize the store.
+
+        Args:
+            root (str): Directory holding cached feature sets
+            file_format (str): 'arrow' (IPC, memory-mapped) or 'parquet'
+        """
+        if file_format not in FORMAT_EXTENSIONS:
+            raise ValueError(f"Unknown feature store format '{file_format}' (expected 'arrow' or 'parquet')")
+        self.root = root
+        self.file_format = file_format
+
+    @staticmethod
+    def available():
+        """Whether the columnar backend (pyarrow) is installed."""
+        return PYARROW_AVAILABLE
+
+    def cache_key(self, input_paths, params=None):
+        """
+        Build the cache key for a set of input files and pipeline parameters.
+
+        Args:
+            input_paths (list): Input files the features are derived from
+            params (dict): Extra parameters that change the features (e.g. join mode)
+
+        Returns:
+            tuple: (cache_key, input_hashes)
+        """
+        input_hashes = input_file_hashes(input_paths)
+        payload = json.dumps({
+            'feature_version': FEATURE_VERSION,
+            'inputs': input_hashes,
+            'params': params or {}
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:24], input_hashes
+
+    def _entry_path(self, key):
+        return os.path.join(self.root, key)
+
+    def manifest(self, key):
+        """
+        Return the manifest of a cached feature set, or None if it is absent.
+
+        Args:
+            key (str): Cache key
+
+        Returns:
+            dict: Manifest contents
+        """
+        manifest_path = os.path.join(self._entry_path(key), 'manifest.json')
+        if not os.path.exists(manifest_path):
+            return None
+        with open(manifest_path, 'r') as f:
+            return json.load(f)
+
+    def has(self, key):
+        """Whether a complete feature set exists for the key."""
+        return self.manifest(key) is not None
+
+    def write(self, key, df, input_hashes=None, store_column='store_id', date_column='date'):
+        """
+        Write a feature frame partitioned by store and month.
+
+        The entry is assembled in a temporary directory and renamed into place,
+        so readers never observe a partially written feature set.
+
+        Args:
+            key (str): Cache key
+            df (pd.DataFrame): Engineered feature frame
+            input_hashes (dict): Input file hashes recorded in the manifest
+            store_column (str): Store partition column
+            date_column (str): Date partition column
+
+        Returns:
+            str: Path of the cached feature set
+        """
+        os.makedirs(self.root, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=f".{key}.", dir=self.root)
+        extension = FORMAT_EXTENSIONS[self.file_format]
+
+        # Keep the original row order and index so reads are drop-in replacements
+        frame = df.copy()
+        frame[ROW_COLUMN] = frame.index.to_numpy()
+        months = frame[date_column].dt.strftime('%Y-%m')
+
+        partitions = []
+        try:
+            for (store, month), part in frame.groupby([frame[store_column].astype(str), months], sort=True):
+                relative = os.path.join(f"{store_column}={store}", f"{date_column}={month}", f"part-0.{extension}")
+                path = os.path.join(staging, relative)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+
+                table = pa.Table.from_pandas(part, preserve_index=False)
+                if self.file_format == 'arrow':
+                    with pa.OSFile(path, 'wb') as sink:
+                        with pa.ipc.new_file(sink, table.schema) as writer:
+                            writer.write_table(table)
+                else:
+                    pq.write_table(table, path)
+                partitions.append(relative)
+
+            manifest = {
+                'key': key,
+                'feature_version': FEATURE_VERSION,
+                'format': self.file_format,
+                'inputs': input_hashes or {},
+                'rows': len(frame),
+                'columns': list(df.columns),
+                'partitions': partitions,
+                'created_at': datetime.now().isoformat()
+            }
+            with open(os.path.join(staging, 'manifest.json'), 'w') as f:
+                json.dump(manifest, f, indent=2)
+
+            target = self._entry_path(key)
+            if os.path.exists(target):
+                shutil.rmtree(target)
+            os.rename(staging, target)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        return self._entry_path(key)
+
+    def read(self, key):
+        """
+        Read a cached feature frame, memory-mapping its partitions.
+
+        Args:
+            key (str): Cache key
+
+        Returns:
+            pd.DataFrame: Feature frame in its original row order, or None on a miss
+        """
+        manifest = self.manifest(key)
+        if manifest is None:
+            return None
+
+        entry = self._entry_path(key)
+        tables = []
+        for relative in manifest['partitions']:
+            path = os.path.join(entry, relative)
+            if manifest['format'] == 'arrow':
+                tables.append(pa.ipc.open_file(pa.memory_map(path, 'r')).read_all())
+            else:
+                tables.append(pq.read_table(path, memory_map=True))
+
+        if not tables:
+            return None
+        table = pa.concat_tables(tables)
+
+        # Restore the row order the frame was written in
+        rows = table.column(ROW_COLUMN).to_numpy()
+        order = np.argsort(rows, kind='stable')
+        if not np.array_equal(order, np.arange(len(order))):
+            table = table.take(pa.array(order))
+
+        df = table.to_pandas()
+        df = df.set_index(ROW_COLUMN)
+        df.index.name = None
+        return df[manifest['columns']]
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+FoodCast Geo Utilities
+Store coordinate parsing and recipient radius search.
+
+Store coordinates arrive as Python repr strings such as
+"(Decimal('33.52'), Decimal('81.46'))". They are parsed with one regex pass
+over the distinct strings rather than row by row. Recipient matching uses a
+KD-tree over recipient positions as 3-D unit vectors. Straight-line (chord)
+distance between unit vectors is monotonic in great-circle distance, so radius
+and nearest-neighbour queries are exact haversine queries. Each distinct store
+point is queried once no matter how many predictions share it, and the cost is
+O(points · log recipients) instead of all pairs.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+EARTH_RADIUS_KM = 6371.0088
+
+# "(Decimal('33.52'), Decimal('81.46'))", "(33.52, 81.46)" or "33.52,81.46"
+_LOCATION_PATTERN = (
+    r"^\s*\(?\s*(?:Decimal\(\s*['\"]?)?([-+]?[\d.]+(?:[eE][-+]?\d+)?)['\"]?\s*\)?\s*,"
+    r"\s*(?:Decimal\(\s*['\"]?)?([-+]?[\d.]+(?:[eE][-+]?\d+)?)"
+)
+
+
+def parse_store_location(values):
+    """
+    Parse store_location strings into latitude/longitude arrays.
+
+    Args:
+        values (pd.Series): store_location strings (unparseable entries become NaN)
+
+    Returns:
+        tuple: (latitude, longitude) as float32 arrays
+    """
+    codes, uniques = pd.factorize(pd.Series(values).astype('string'))
+    parsed = pd.Series(uniques, dtype='string').str.extract(_LOCATION_PATTERN)
+    coordinates = parsed.astype(np.float64).to_numpy(dtype=np.float32, na_value=np.nan)
+    # Append a NaN row for missing values (factorize code -1)
+    coordinates = np.vstack([coordinates, np.full((1, 2), np.nan, dtype=np.float32)])
+    return coordinates[codes, 0], coordinates[codes, 1]
+
+
+def unit_vectors(latitude, longitude):
+    """Positions on the unit sphere for latitude/longitude in degrees."""
+    lat = np.radians(np.asarray(latitude, dtype=np.float64))
+    lon = np.radians(np.asarray(longitude, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)])
+
+
+def km_to_chord(distance_km):
+    """Unit-sphere chord length for a great-circle distance."""
+    angle = np.minimum(np.asarray(distance_km, dtype=np.float64) / EARTH_RADIUS_KM, np.pi)
+    return 2 * np.sin(angle / 2)
+
+
+def chord_to_km(chord):
+    """Great-circle distance for a unit-sphere chord length."""
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chord) / 2, 0, 1))
+
+
+class RecipientIndex:
+    """
+    Great-circle radius and nearest-neighbour search over recipient locations.
+    """
+
+    def __init__(self, recipients_df):
+        """
+        Build the index.
+
+        Args:
+            recipients_df (pd.DataFrame): Recipients with recipient_id, latitude,
+                longitude and preferred_food_category columns
+        """
+        valid = recipients_df[['latitude', 'longitude']].notna().all(axis=1).to_numpy()
+        self.recipients = recipients_df[valid].reset_index(drop=True)
+        self.tree = (
+            cKDTree(unit_vectors(self.recipients['latitude'], self.recipients['longitude']))
+            if len(self.recipients) else None
+        )
+
+        categories = self.recipients.get('preferred_food_category', pd.Series(dtype=str))
+        self.category_codes, self.categories = pd.factorize(categories.astype(str).str.lower())
+
+    def __len__(self):
+        return len(self.recipients)
+
+    def nearest(self, latitude, longitude, k, radius_km=None):
+        """
+        The ``k`` nearest recipients of every point, nearest first.
+
+        Args:
+            latitude (np.ndarray): Point latitudes in degrees (NaN points get no neighbours)
+            longitude (np.ndarray): Point longitudes in degrees
+            k (int): Neighbours per point
+            radius_km (float): Ignore recipients farther than this
+
+        Returns:
+            tuple: (distance_km, recipient positions) arrays of shape (points, k);
+                missing neighbours have distance inf and position len(self)
+        """
+        points = unit_vectors(latitude, longitude)
+        valid = ~np.isnan(points).any(axis=1)
+        distance = np.full((len(points), k), np.inf)
+        positions = np.full((len(points), k), len(self), dtype=np.int64)
+        if self.tree is not None and valid.any():
+            bound = km_to_chord(radius_km) * (1 + 1e-9) if radius_km is not None else np.inf
+            chord, found = self.tree.query(points[valid], k=k, distance_upper_bound=bound, workers=-1)
+            chord = chord.reshape(-1, k)
+            # Neighbours beyond the bound come back with an infinite chord
+            distance[valid] = np.where(np.isinf(chord), np.inf, chord_to_km(chord))
+            positions[valid] = found.reshape(-1, k)
+        return distance, positions
+
+    def match(self, latitude, longitude, radius_km, categories=None):
+        """
+        Recipients within ``radius_km`` of every point, in bulk.
+
+        Identical points are queried once.
+
+        Args:
+            latitude (np.ndarray): Point latitudes in degrees
+            longitude (np.ndarray): Point longitudes in degrees
+            radius_km (float): Search radius in kilometers
+            categories (pd.Series): Optional food category per point, counted
+                against recipients' preferred_food_category
+
+        Returns:
+            pd.DataFrame: Per point nearby_recipients, nearest_recipient_id,
+                nearest_recipient_km and (with categories) category_matches
+        """
+        points = np.column_stack([latitude, longitude]).astype(np.float64)
+        n = len(points)
+        valid = ~np.isnan(points).any(axis=1)
+
+        nearby = np.zeros(n, dtype=np.int64)
+        nearest_id = np.full(n, np.nan)
+        nearest_km = np.full(n, np.nan)
+        category_matches = np.zeros(n, dtype=np.int64)
+
+        if self.tree is not None and valid.any():
+            unique_points, inverse = np.unique(points[valid], axis=0, return_inverse=True)
+            inverse = inverse.reshape(-1)
+            vectors = unit_vectors(unique_points[:, 0], unique_points[:, 1])
+
+            neighbors = self.tree.query_ball_point(vectors, r=km_to_chord(radius_km) * (1 + 1e-9), workers=-1)
+            counts = np.array([len(found) for found in neighbors], dtype=np.int64)
+            distance, closest = self.nearest(unique_points[:, 0], unique_points[:, 1], 1, radius_km)
+
+            within = np.isfinite(distance[:, 0])
+            recipient_ids = np.append(self.recipients['recipient_id'].to_numpy(dtype=np.float64), np.nan)
+            point_nearest_id = np.where(within, recipient_ids[closest[:, 0]], np.nan)
+            point_nearest_km = np.where(within, distance[:, 0], np.nan)
+
+            nearby[valid] = counts[inverse]
+            nearest_id[valid] = point_nearest_id[inverse]
+            nearest_km[valid] = point_nearest_km[inverse]
+
+            if categories is not None and len(self.categories):
+                # (point, preferred category) pair counts over all radius hits
+                n_categories = len(self.categories)
+                point_of_hit = np.repeat(np.arange(len(unique_points)), counts)
+                hits = np.concatenate(neighbors).astype(np.int64) if counts.sum() else np.zeros(0, dtype=np.int64)
+                pair_counts = np.bincount(point_of_hit * n_categories + self.category_codes[hits],
+                                          minlength=len(unique_points) * n_categories)
+
+                wanted = self.categories.get_indexer(
+                    pd.Series(categories).astype(str).str.lower().to_numpy()[valid])
+                has_category = wanted >= 0
+                rows = np.flatnonzero(valid)[has_category]
+                category_matches[rows] = pair_counts[inverse[has_category] * n_categories + wanted[has_category]]
+
+        result = {
+            'nearby_recipients': nearby,
+            'nearest_recipient_id': nearest_id,
+            'nearest_recipient_km': nearest_km
+        }
+        if categories is not None:
+            result['category_matches'] = category_matches
+        return pd.DataFrame(result)
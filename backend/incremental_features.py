@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+FoodCast Incremental Feature State
+Daily feature refresh from a compact per-series ring buffer.
+
+Every rolling window, lag and trend in the temporal feature set only looks at
+the last 15 observations of its (store_id, product_id) series. This module
+keeps exactly that much history per series and applies new rows on top of it,
+so a nightly refresh touches only the series that received data that day
+instead of recomputing features over the full history.
+
+Definitions follow feature_engine.py. The one intentional difference is the
+surplus history: batch training multiplies the target by synthetic noise,
+while the incremental state records the realized surplus (the next row's
+end_inventory).
+"""
+
+import json
+
+import numpy as np
+
+from feature_engine import (
+    LAGS,
+    ROLLING_WINDOWS,
+    TREND_MIN_PERIODS,
+    TREND_WINDOW,
+    FEATURE_VERSION,
+    series_feature_names,
+)
+
+# Current row plus the longest lag
+HISTORY = max(max(LAGS), max(ROLLING_WINDOWS), TREND_WINDOW) + 1
+KEYS = ['store_id', 'product_id']
+SIGNALS = ['sales', 'stock', 'surplus']
+
+
+def _window_stats(window, min_periods):
+    """
+    Mean and sample std over the rows of a (series x window) matrix.
+
+    NaN entries are treated as missing, as in pandas rolling windows.
+    """
+    valid = ~np.isnan(window)
+    count = valid.sum(axis=1)
+    filled = np.where(valid, window, 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = filled.sum(axis=1) / count
+        deviation = np.where(valid, window - mean[:, None], 0.0)
+        std = np.sqrt((deviation * deviation).sum(axis=1) / (count - 1))
+    mean[count < min_periods] = np.nan
+    std[(count < min_periods) | (count < 2)] = np.nan
+    return mean, std, count
+
+
+def window_features(history, count, names=None):
+    """
+    Series features of the newest row from its trailing history.
+
+    Args:
+        history (dict): Signal name -> (series x HISTORY) matrix, newest value first,
+            NaN where the series has no observation
+        count (np.ndarray): Observations available per series, newest row included
+        names (iterable): Features to compute (None = all of feature_names())
+
+    Returns:
+        dict: Feature name -> array, one value per series
+    """
+    wanted = None if names is None else set(names)
+
+    def needed(*candidates):
+        return wanted is None or not wanted.isdisjoint(candidates)
+
+    features = {}
+
+    # Rolling features for temporal patterns
+    for window in ROLLING_WINDOWS:
+        avg, std, stock_avg = f'sales_{window}day_avg', f'sales_{window}day_std', f'stock_{window}day_avg'
+        if needed(avg, std):
+            sales_mean, sales_std, _ = _window_stats(history['sales'][:, :window], 1)
+            if needed(avg):
+                features[avg] = sales_mean
+            if needed(std):
+                features[std] = sales_std
+        if needed(stock_avg):
+            features[stock_avg] = _window_stats(history['stock'][:, :window], 1)[0]
+
+    # Lag features for temporal dependencies
+    for lag in LAGS:
+        for signal in SIGNALS:
+            if needed(f'{signal}_lag_{lag}'):
+                features[f'{signal}_lag_{lag}'] = history[signal][:, lag]
+
+    # Trend features
+    for signal in ['sales', 'stock']:
+        if not needed(f'{signal}_trend_7day'):
+            continue
+        length = np.clip(count, 1, TREND_WINDOW)
+        rows = np.arange(len(length))
+        values = history[signal]
+        _, _, valid = _window_stats(values[:, :TREND_WINDOW], TREND_MIN_PERIODS)
+        first = values[rows, length - 1]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            trend = np.where(length > 1, (values[:, 0] - first) / length, 0.0)
+        trend[valid < TREND_MIN_PERIODS] = np.nan
+        features[f'{signal}_trend_7day'] = trend
+
+    # Volatility features
+    if needed('sales_volatility_7day'):
+        mean, std, _ = _window_stats(history['sales'][:, :TREND_WINDOW], TREND_MIN_PERIODS)
+        features['sales_volatility_7day'] = std / (mean + 1e-8)
+
+    return features
+
+
+class IncrementalFeatureState:
+    """
+    Ring-buffer history of the last HISTORY observations of every series.
+    """
+
+    def __init__(self, fill_values=None):
+        """
+        Initialize an empty state.
+
+        Args:
+            fill_values (dict): Values used for missing lag features
+                (the training medians, so online rows match training rows)
+        """
+        self.fill_values = dict(fill_values or {})
+        self.series_index = {}
+        self.buffers = np.full((0, len(SIGNALS), HISTORY), np.nan)
+        self.head = np.zeros(0, dtype=np.int64)
+        self.count = np.zeros(0, dtype=np.int64)
+        self.last_date = np.zeros(0, dtype='datetime64[ns]')
+
+        # Running sums for store/product level averages: [sales, stock, rows]
+        self.store_totals = {}
+        self.product_totals = {}
+
+    @property
+    def n_series(self):
+        """Number of tracked series."""
+        return len(self.series_index)
+
+    @classmethod
+    def from_history(cls, merged_df, fill_values=None):
+        """
+        Build the state by replaying a merged history frame.
+
+        Only the last HISTORY rows of each series are replayed; the running
+        store/product averages are taken over the whole frame.
+
+        Args:
+            merged_df (pd.DataFrame): Output of FoodSurplusPredictor.merge_datasets
+            fill_values (dict): Values used for missing lag features
+
+        Returns:
+            IncrementalFeatureState: State positioned after the last row of every series
+        """
+        state = cls(fill_values)
+        state.add_history(merged_df)
+        return state
+
+    def add_history(self, merged_df):
+        """
+        Replay the full history of series not yet in the state.
+
+        Lets the state be built one partition at a time when the partitions
+        hold disjoint series (e.g. one store each, see chunked_pipeline.py).
+
+        Args:
+            merged_df (pd.DataFrame): Output of FoodSurplusPredictor.merge_datasets
+        """
+        history = merged_df.sort_values(KEYS + ['date'], kind='stable')
+        self._add_totals(history)
+        # HISTORY + 1 rows so the oldest buffered row also has its surplus
+        self._apply(history.groupby(KEYS, sort=False).tail(HISTORY + 1))
+
+    def _series_ids(self, rows):
+        """Map rows to series ids, allocating buffers for unseen series."""
+        keys = list(zip(rows['store_id'].astype(str), rows['product_id'].astype(str)))
+        new_keys = [key for key in dict.fromkeys(keys) if key not in self.series_index]
+        if new_keys:
+            start = self.n_series
+            for offset, key in enumerate(new_keys):
+                self.series_index[key] = start + offset
+            grow = len(new_keys)
+            self.buffers = np.concatenate([self.buffers, np.full((grow, len(SIGNALS), HISTORY), np.nan)])
+            self.head = np.concatenate([self.head, np.zeros(grow, dtype=np.int64)])
+            self.count = np.concatenate([self.count, np.zeros(grow, dtype=np.int64)])
+            self.last_date = np.concatenate([self.last_date, np.full(grow, np.datetime64('NaT'), dtype='datetime64[ns]')])
+        return np.array([self.series_index[key] for key in keys], dtype=np.int64)
+
+    def _add_totals(self, rows):
+        """Accumulate store/product sales and stock totals."""
+        for column, totals in (('store_id', self.store_totals), ('product_id', self.product_totals)):
+            grouped = rows.groupby(rows[column].astype(str))[['daily_sales_sales', 'stock_level']].agg(['sum', 'count'])
+            for key, values in grouped.iterrows():
+                current = totals.get(key, [0.0, 0.0, 0])
+                totals[key] = [
+                    current[0] + values[('daily_sales_sales', 'sum')],
+                    current[1] + values[('stock_level', 'sum')],
+                    current[2] + int(values[('daily_sales_sales', 'count')])
+                ]
+
+    def _window(self, series, signal, length):
+        """Last ``length`` values (newest first) of a signal for the given series."""
+        slots = (self.head[series, None] - 1 - np.arange(length)) % HISTORY
+        window = self.buffers[series[:, None], signal, slots]
+        window[np.arange(length)[None, :] >= self.count[series, None]] = np.nan
+        return window
+
+    def stale_rows(self, rows):
+        """
+        Flag rows that are not newer than what their series already holds.
+
+        A row is stale when its date is at or before the last date applied to
+        its series by an earlier batch (a replayed or out-of-order day). Rows
+        of one batch may share a date; they are applied in order.
+
+        Args:
+            rows (pd.DataFrame): Rows with store_id, product_id and date
+
+        Returns:
+            np.ndarray: Boolean mask, True for rows that must not be applied
+        """
+        series = np.array([
+            self.series_index.get(key, -1)
+            for key in zip(rows['store_id'].astype(str), rows['product_id'].astype(str))
+        ], dtype=np.int64)
+        last_date = np.full(len(rows), np.datetime64('NaT'), dtype='datetime64[ns]')
+        known = series >= 0
+        last_date[known] = self.last_date[series[known]]
+        dates = rows['date'].to_numpy(dtype='datetime64[ns]')
+        return ~np.isnat(last_date) & (dates <= last_date)
+
+    def _apply(self, rows):
+        """
+        Push rows into the buffers and compute their series features.
+
+        Stale rows (see stale_rows) are dropped before any buffer changes.
+
+        Rows of the same series are applied in order; rows of different series
+        are processed together, one "round" per position within the day.
+        """
+        rows = rows[~self.stale_rows(rows)].sort_values(KEYS + ['date'], kind='stable')
+        series = self._series_ids(rows)
+        rounds = rows.groupby(KEYS, sort=False).cumcount().to_numpy()
+
+        sales = rows['daily_sales_sales'].to_numpy(dtype=np.float64)
+        stock = rows['stock_level'].to_numpy(dtype=np.float64)
+        end_inventory = rows['end_inventory'].to_numpy(dtype=np.float64)
+        dates = rows['date'].to_numpy(dtype='datetime64[ns]')
+
+        names = feature_names()
+        out = np.full((len(rows), len(names)), np.nan)
+        column = {name: i for i, name in enumerate(names)}
+
+        for r in range(int(rounds.max()) + 1 if len(rows) else 0):
+            take = np.flatnonzero(rounds == r)
+            idx = series[take]
+
+            # Today's end inventory is the realized surplus of the previous row
+            has_previous = self.count[idx] > 0
+            previous_slot = (self.head[idx] - 1) % HISTORY
+            self.buffers[idx[has_previous], 2, previous_slot[has_previous]] = end_inventory[take[has_previous]]
+
+            # Write the new observation and advance the ring
+            slot = self.head[idx]
+            self.buffers[idx, 0, slot] = sales[take]
+            self.buffers[idx, 1, slot] = stock[take]
+            self.buffers[idx, 2, slot] = np.nan
+            self.head[idx] = (slot + 1) % HISTORY
+            self.count[idx] = np.minimum(self.count[idx] + 1, HISTORY)
+            self.last_date[idx] = dates[take]
+
+            history = {signal: self._window(idx, i, HISTORY) for i, signal in enumerate(SIGNALS)}
+            for name, values in window_features(history, self.count[idx]).items():
+                out[take, column[name]] = values
+
+        # The model server only loads and reads the state; keep pandas off its import path
+        import pandas as pd
+        features = pd.DataFrame(out, columns=names, index=rows.index)
+        for name, value in self.fill_values.items():
+            if name in features.columns:
+                features[name] = features[name].fillna(value)
+        return rows[KEYS + ['date']].join(features)
+
+    def update(self, day_df):
+        """
+        Apply one batch of new merged rows (typically a single day).
+
+        Args:
+            day_df (pd.DataFrame): New rows with store_id, product_id, date,
+                daily_sales_sales, stock_level and end_inventory
+
+        Returns:
+            pd.DataFrame: Keys, date and updated series features for the new rows only,
+                including running store/product averages. Stale rows (see
+                stale_rows) are skipped and leave the state unchanged; they are
+                absent from the result.
+        """
+        day_df = day_df[~self.stale_rows(day_df)]
+        self._add_totals(day_df)
+        features = self._apply(day_df)
+
+        for column, totals, prefix in (('store_id', self.store_totals, 'store'),
+                                       ('product_id', self.product_totals, 'product')):
+            keys = features[column].astype(str)
+            features[f'{prefix}_avg_sales'] = keys.map(lambda key: totals[key][0] / totals[key][2])
+            features[f'{prefix}_avg_stock'] = keys.map(lambda key: totals[key][1] / totals[key][2])
+        return features
+
+    def latest(self, store_id, product_id):
+        """
+        Return the newest buffered observations of one series.
+
+        Args:
+            store_id (str): Store identifier
+            product_id (str): Product identifier
+
+        Returns:
+            dict: Signal name -> values newest first, or None for unknown series
+        """
+        series = self.series_index.get((str(store_id), str(product_id)))
+        if series is None:
+            return None
+        idx = np.array([series])
+        return {signal: self._window(idx, i, HISTORY)[0] for i, signal in enumerate(SIGNALS)}
+
+    def save(self, path):
+        """
+        Persist the state as a compressed NumPy archive (no pickle).
+
+        Args:
+            path (str): Output .npz path
+        """
+        keys = sorted(self.series_index, key=self.series_index.get)
+        meta = {
+            'feature_version': FEATURE_VERSION,
+            'history': HISTORY,
+            'keys': keys,
+            'fill_values': self.fill_values,
+            'store_totals': self.store_totals,
+            'product_totals': self.product_totals
+        }
+        np.savez_compressed(
+            path,
+            buffers=self.buffers,
+            head=self.head,
+            count=self.count,
+            last_date=self.last_date,
+            meta=np.array(json.dumps(meta, default=float))
+        )
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a state saved with save().
+
+        Args:
+            path (str): .npz path
+
+        Returns:
+            IncrementalFeatureState: Restored state
+        """
+        with np.load(path, allow_pickle=False) as archive:
+            meta = json.loads(str(archive['meta']))
+            if meta['feature_version'] != FEATURE_VERSION or meta['history'] != HISTORY:
+                raise ValueError(f"Incremental state {path} was built for feature version "
+                                 f"{meta['feature_version']}, current is {FEATURE_VERSION}")
+            state = cls(meta['fill_values'])
+            state.buffers = archive['buffers']
+            state.head = archive['head']
+            state.count = archive['count']
+            state.last_date = archive['last_date']
+        state.series_index = {tuple(key): i for i, key in enumerate(meta['keys'])}
+        state.store_totals = meta['store_totals']
+        state.product_totals = meta['product_totals']
+        return state
+
+
+def feature_names():
+    """Names of the series features produced by the incremental state, in pipeline order."""
+    return series_feature_names()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+FoodCast Load Test
+Many concurrent clients against a running model server.
+
+Every client is a thread with its own HTTP connection that sends requests
+back to back until the test ends. Payloads vary per request so they miss the
+prediction cache and exercise the scoring path (use --cacheable to send
+repeated payloads). Reports throughput, the status code mix (503 = rejected
+by backpressure, 504 = timed out) and latency percentiles.
+
+Usage:
+    python model_server.py --production
+    python load_test.py --clients 128 --duration 20
+"""
+
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+import numpy as np
+
+BASE_RECORD = {
+    "store_id": "1",
+    "product_id": "1",
+    "product_name": "Fresh Apples",
+    "daily_sales": 45,
+    "stock_level": 120,
+    "price": 3.99,
+    "promotion_flag": False,
+    "brain_diet_flag": True,
+    "shelf_life_days": 7,
+    "date": "2024-10-04"
+}
+
+
+def make_record(rng, cacheable=False):
+    """One /predict payload; randomized unless ``cacheable``."""
+    if cacheable:
+        return dict(BASE_RECORD)
+    return dict(
+        BASE_RECORD,
+        store_id=str(rng.randint(1, 10)),
+        product_id=str(rng.randint(1, 50)),
+        daily_sales=round(rng.uniform(1, 200), 2),
+        stock_level=rng.randint(20, 300)
+    )
+
+
+def run_client(url, path, deadline, start, batch_size, cacheable, timeout, seed, results):
+    """Send requests until ``deadline``; append (status, latency_ms) to ``results``."""
+    rng = random.Random(seed)
+    connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=timeout)
+    headers = {'Content-Type': 'application/json'}
+    samples = []
+    start.wait()
+    while time.perf_counter() < deadline:
+        if batch_size:
+            body = json.dumps([make_record(rng, cacheable) for _ in range(batch_size)])
+        else:
+            body = json.dumps(make_record(rng, cacheable))
+        sent = time.perf_counter()
+        try:
+            connection.request('POST', path, body, headers)
+            response = connection.getresponse()
+            response.read()
+            status = response.status
+            if response.getheader('Connection', '').lower() == 'close':
+                connection.close()
+        except (OSError, http.client.HTTPException):
+            status = 'error'
+            connection.close()
+        samples.append((status, (time.perf_counter() - sent) * 1000))
+    connection.close()
+    results.extend(samples)
+
+
+def fetch_json(url, path):
+    """GET a JSON document from the server (None if unavailable)."""
+    try:
+        connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=10)
+        connection.request('GET', path)
+        return json.loads(connection.getresponse().read())
+    except (OSError, ValueError, http.client.HTTPException):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the FoodCast model server')
+    parser.add_argument('--url', default='http://localhost:5001', help='Model server base URL')
+    parser.add_argument('--clients', type=int, default=128, help='Concurrent clients')
+    parser.add_argument('--duration', type=float, default=15.0, help='Seconds to run')
+    parser.add_argument('--batch-size', type=int, default=0,
+                        help='Records per request to /predict/batch (0 = single records to /predict)')
+    parser.add_argument('--cacheable', action='store_true', help='Repeat one payload (cache hits)')
+    parser.add_argument('--timeout', type=float, default=30.0, help='Client socket timeout in seconds')
+    args = parser.parse_args()
+
+    url = urlparse(args.url)
+    path = '/predict/batch' if args.batch_size else '/predict'
+    if fetch_json(url, '/health') is None:
+        print(f"❌ No model server reachable at {args.url}")
+        return 1
+
+    print(f"🧪 {args.clients} clients for {args.duration:g} s against {path}"
+          + (f" ({args.batch_size} records per request)" if args.batch_size else ""))
+    results = []
+    start = threading.Event()
+    deadline = time.perf_counter() + args.duration
+    clients = [
+        threading.Thread(target=run_client, daemon=True, args=(
+            url, path, deadline, start, args.batch_size, args.cacheable, args.timeout, seed, results
+        ))
+        for seed in range(args.clients)
+    ]
+    for client in clients:
+        client.start()
+    started = time.perf_counter()
+    start.set()
+    for client in clients:
+        client.join()
+    elapsed = time.perf_counter() - started
+
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    ok = np.array([latency for status, latency in results if status == 200])
+
+    print(f"   Requests:   {len(results)} in {elapsed:.1f} s ({len(results) / elapsed:.1f} req/s)")
+    print(f"   Succeeded:  {len(ok)} ({len(ok) / elapsed:.1f} req/s"
+          + (f", {len(ok) * args.batch_size / elapsed:.0f} records/s)" if args.batch_size else ")"))
+    print("   Status:     " + ", ".join(f"{status}: {count}" for status, count in sorted(statuses.items(), key=str)))
+    if len(ok):
+        p50, p95, p99 = np.percentile(ok, [50, 95, 99])
+        print(f"   Latency ms: p50 {p50:.1f}  p95 {p95:.1f}  p99 {p99:.1f}  max {ok.max():.1f}")
+
+    health = fetch_json(url, '/health')
+    if health and 'scoring' in health:
+        scoring = health['scoring']
+        print(f"   Server:     {scoring['workers']} scoring workers, peak {scoring['peak_in_flight']} in flight, "
+              f"{scoring['rejected']} rejected, {scoring['timed_out']} timed out")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
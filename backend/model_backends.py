@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+FoodCast Model Backends
+Estimators train_temporal_model can fit, selected by name.
+
+Backends:
+    gbr   GradientBoostingRegressor: exact split search, trees built on one
+          core (the original model)
+    hist  HistGradientBoostingRegressor: features are binned into at most
+          255 buckets once, split search is multi-threaded, and boosting
+          stops when the loss on a held-out validation fraction has not
+          improved for n_iter_no_change rounds. Tree cost no longer grows
+          with the number of distinct feature values, which is what keeps
+          millions of rows tractable.
+
+GradientBoostingRegressor reports impurity-based feature importances;
+HistGradientBoostingRegressor has none, so permutation importance on the
+evaluation rows stands in for it, scaled the same way (non-negative, summing
+to 1).
+"""
+
+import numpy as np
+from sklearn.ensemble import GradientBoostingRegressor, HistGradientBoostingRegressor
+from sklearn.inspection import permutation_importance
+
+MODEL_BACKENDS = ['gbr', 'hist']
+
+# Rows scored per permutation repeat (permutation importance is O(rows x features))
+IMPORTANCE_MAX_SAMPLES = 50000
+
+
+def make_estimator(backend='gbr', random_state=42):
+    """
+    Unfitted regressor for a backend name.
+
+    Args:
+        backend (str): One of MODEL_BACKENDS
+        random_state (int): Seed of subsampling / validation splits
+
+    Returns:
+        Unfitted scikit-learn regressor
+    """
+    if backend == 'gbr':
+        # Gradient Boosting with balanced regularization
+        return GradientBoostingRegressor(
+            n_estimators=80,      # Balanced
+            max_depth=5,          # Balanced
+            learning_rate=0.02,   # Balanced learning rate
+            subsample=0.8,        # Moderate subsampling
+            max_features='sqrt',
+            min_samples_split=15, # Moderate regularization
+            min_samples_leaf=8,   # Moderate regularization
+            random_state=random_state
+        )
+    if backend == 'hist':
+        return HistGradientBoostingRegressor(
+            learning_rate=0.1,
+            max_iter=300,              # Upper bound; early stopping picks the count
+            max_depth=5,
+            min_samples_leaf=20,
+            l2_regularization=1.0,
+            early_stopping=True,
+            validation_fraction=0.1,
+            n_iter_no_change=20,
+            random_state=random_state
+        )
+    raise ValueError(f"Unknown model backend {backend!r}, expected one of {MODEL_BACKENDS}")
+
+
+def feature_importance(model, X, y, random_state=42):
+    """
+    Importance of every feature, non-negative and summing to 1.
+
+    Args:
+        model: Fitted regressor
+        X (pd.DataFrame): Evaluation features (used for permutation importance)
+        y (pd.Series): Evaluation target
+        random_state (int): Seed of the permutations and row sample
+
+    Returns:
+        np.ndarray: Importance per column of X
+    """
+    if hasattr(model, 'feature_importances_'):
+        return model.feature_importances_
+
+    result = permutation_importance(
+        model, X, y, n_repeats=5, random_state=random_state,
+        max_samples=min(len(X), IMPORTANCE_MAX_SAMPLES)
+    )
+    importance = np.clip(result.importances_mean, 0, None)
+    total = importance.sum()
+    return importance / total if total > 0 else importance
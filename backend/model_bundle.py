@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+FoodCast Model Bundle
+Single-file, versioned, memory-mappable model artifact.
+
+A bundle holds a flattened tree ensemble (see tree_inference.py) together
+with everything needed to serve it, so no pickle is unpickled at load time:
+
+    offset 0   MAGIC (8 bytes) | format version (uint32) | reserved (uint32)
+    offset 16  header length (uint64)
+    offset 24  header: UTF-8 JSON (model version, feature columns, metrics,
+               training data hash, feature version, ensemble parameters,
+               array table, SHA-256 of the array section)
+    aligned    node arrays, each starting on an ALIGNMENT byte boundary
+
+Loading parses the JSON header and maps the file read-only; the node arrays
+are views into the mapping. Every server process that opens the same bundle
+shares one copy of the arrays in the page cache, and load time does not grow
+with the number of trees.
+"""
+
+import hashlib
+import json
+import struct
+from datetime import datetime
+
+import numpy as np
+
+from tree_inference import ARRAY_FIELDS, CompiledEnsemble
+
+MAGIC = b'FCBUNDLE'
+FORMAT_VERSION = 1
+BUNDLE_EXTENSION = '.fcm'
+
+# Byte alignment of every array in the file
+ALIGNMENT = 64
+
+_PREAMBLE = struct.Struct('<8sIIQ')
+
+
+class BundleFormatError(ValueError):
+    """Raised when a file is not a readable model bundle."""
+
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+class ModelBundle:
+    """
+    A loaded bundle: metadata plus the memory-mapped ensemble.
+    """
+
+    def __init__(self, header, ensemble, path=None):
+        self.header = header
+        self.ensemble = ensemble
+        self.path = path
+
+    @property
+    def version(self):
+        return self.header['version']
+
+    @property
+    def feature_columns(self):
+        return self.header['feature_columns']
+
+    @property
+    def metrics(self):
+        return self.header.get('metrics', {})
+
+    @property
+    def model_type(self):
+        return self.header.get('model_type', 'CompiledEnsemble')
+
+    @property
+    def data_hash(self):
+        return self.header.get('data_hash')
+
+    @property
+    def feature_version(self):
+        return self.header.get('feature_version')
+
+
+def encode_bundle(ensemble, feature_columns, version, metrics=None, model_type=None,
+                  data_hash=None, feature_version=None):
+    """
+    Serialize a compiled ensemble and its metadata into bundle bytes.
+
+    Args:
+        ensemble (CompiledEnsemble): Flattened model
+        feature_columns (list): Feature order expected by the model
+        version (str): Model version
+        metrics (dict): Training metrics
+        model_type (str): Name of the estimator the ensemble was compiled from
+        data_hash (str): Hash of the training inputs
+        feature_version (str): Feature-engineering version the model was trained on
+
+    Returns:
+        bytes: Bundle file contents
+    """
+    if len(feature_columns) != ensemble.n_features:
+        raise ValueError(f"Ensemble expects {ensemble.n_features} features "
+                         f"but {len(feature_columns)} columns were given")
+
+    # Lay out the arrays relative to the start of the array section
+    arrays = ensemble.arrays()
+    table = {}
+    offset = 0
+    for name in ARRAY_FIELDS:
+        array = np.ascontiguousarray(arrays[name])
+        offset = _aligned(offset)
+        table[name] = {
+            'dtype': array.dtype.str,
+            'shape': list(array.shape),
+            'offset': offset,
+            'nbytes': array.nbytes
+        }
+        offset += array.nbytes
+    data = bytearray(offset)
+    for name in ARRAY_FIELDS:
+        entry = table[name]
+        data[entry['offset']:entry['offset'] + entry['nbytes']] = np.ascontiguousarray(arrays[name]).tobytes()
+
+    header = {
+        'version': version,
+        'created_at': datetime.now().isoformat(),
+        'model_type': model_type or 'CompiledEnsemble',
+        'feature_columns': list(feature_columns),
+        'metrics': metrics or {},
+        'data_hash': data_hash,
+        'feature_version': feature_version,
+        'ensemble': ensemble.metadata(),
+        'arrays': table,
+        'checksum': hashlib.sha256(data).hexdigest()
+    }
+    header_bytes = json.dumps(header, sort_keys=True, default=float).encode('utf-8')
+    data_start = _aligned(_PREAMBLE.size + len(header_bytes))
+
+    padding = b'\0' * (data_start - _PREAMBLE.size - len(header_bytes))
+    return b''.join([_PREAMBLE.pack(MAGIC, FORMAT_VERSION, 0, len(header_bytes)),
+                     header_bytes, padding, bytes(data)])
+
+
+def read_header(path):
+    """
+    Read a bundle's JSON header without mapping its arrays.
+
+    Args:
+        path (str): Bundle file
+
+    Returns:
+        tuple: (header dict, byte offset of the array section)
+    """
+    with open(path, 'rb') as f:
+        preamble = f.read(_PREAMBLE.size)
+        if len(preamble) < _PREAMBLE.size:
+            raise BundleFormatError(f"{path} is too short to be a model bundle")
+        magic, format_version, _, header_length = _PREAMBLE.unpack(preamble)
+        if magic != MAGIC:
+            raise BundleFormatError(f"{path} is not a model bundle")
+        if format_version != FORMAT_VERSION:
+            raise BundleFormatError(f"{path} has bundle format {format_version}, "
+                                    f"this reader supports {FORMAT_VERSION}")
+        header = json.loads(f.read(header_length).decode('utf-8'))
+    return header, _aligned(_PREAMBLE.size + header_length)
+
+
+def read_bundle(path, verify=True):
+    """
+    Memory-map a bundle and rebuild its ensemble as views into the mapping.
+
+    Args:
+        path (str): Bundle file
+        verify (bool): Check the SHA-256 of the array section
+
+    Returns:
+        ModelBundle: Loaded bundle
+    """
+    header, data_start = read_header(path)
+    mapped = np.memmap(path, dtype=np.uint8, mode='r')
+    data = mapped[data_start:]
+    if verify and hashlib.sha256(data).hexdigest() != header['checksum']:
+        raise BundleFormatError(f"{path} failed its checksum; the file is corrupt or truncated")
+
+    arrays = {}
+    for name in ARRAY_FIELDS:
+        entry = header['arrays'][name]
+        raw = data[entry['offset']:entry['offset'] + entry['nbytes']]
+        arrays[name] = raw.view(np.dtype(entry['dtype'])).reshape(entry['shape'])
+
+    meta = header['ensemble']
+    # Bundles written before allow_missing was recorded: only GBR ensembles use float32 inputs
+    ensemble = CompiledEnsemble(arrays, meta['baseline'], meta['max_depth'], meta['n_features'],
+                                meta['float32_inputs'], meta.get('allow_missing', not meta['float32_inputs']))
+    return ModelBundle(header, ensemble, path)
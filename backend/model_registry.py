@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+FoodCast Model Registry
+Versioned model artifacts with atomic hot reload for the model server.
+
+Training writes immutable, versioned artifacts into a model directory and
+then atomically repoints a LATEST file at the new version:
+
+    models/model-20241004T120000123456.fcm
+    models/LATEST            -> "model-20241004T120000123456.fcm"
+
+Tree ensembles are published as model bundles (model_bundle.py): flattened
+node arrays plus feature columns, metrics, training data hash and feature
+version in one memory-mapped file, loaded without unpickling. Other
+estimators are still written as pickled ``model-<version>.pkl`` artifacts.
+
+The registry loads the artifact LATEST points to and swaps it in as a single
+reference assignment. Request handlers take one snapshot of ``registry.current``
+at the start of a request and use it throughout, so a reload never changes the
+model underneath an in-flight prediction. The legacy trained_model.pkl /
+feature_columns.pkl pair is still accepted when no model directory exists.
+
+LoadedModel.predict() evaluates flattened node arrays instead of calling the
+sklearn estimator. Bundles contain only those arrays, so they are always
+served by compiled inference. Pickled tree ensembles are flattened with
+tree_inference.compile_model() at load time unless ``compile_trees`` is off;
+pickled estimators that cannot be flattened fall back to model.predict().
+"""
+
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from feature_engine import FEATURE_VERSION
+from model_bundle import BUNDLE_EXTENSION, encode_bundle, read_bundle, read_header
+from tree_inference import UnsupportedModelError, compile_model
+
+LATEST_FILE = 'LATEST'
+
+
+class ModelNotFoundError(FileNotFoundError):
+    """Raised when no trained model artifact is available to load."""
+
+
+class LoadedModel:
+    """
+    Immutable snapshot of one loaded model version.
+    """
+
+    __slots__ = ('model', 'feature_columns', 'version', 'source', 'metrics',
+                 'loaded_at', 'load_seconds', 'compiled', 'model_type', 'data_hash')
+
+    def __init__(self, model, feature_columns, version, source, metrics=None, load_seconds=0.0,
+                 compiled=None, model_type=None, data_hash=None):
+        self.model = model
+        self.compiled = compiled
+        self.model_type = model_type or type(model).__name__
+        self.data_hash = data_hash
+        self.feature_columns = list(feature_columns)
+        self.version = version
+        self.source = source
+        self.metrics = metrics or {}
+        self.loaded_at = datetime.now().isoformat()
+        self.load_seconds = load_seconds
+
+    def info(self):
+        """Summary of the snapshot for status endpoints."""
+        return {
+            'version': self.version,
+            'source': self.source,
+            'loaded_at': self.loaded_at,
+            'load_seconds': round(self.load_seconds, 4),
+            'features_count': len(self.feature_columns),
+            'model_type': self.model_type,
+            'compiled_inference': self.compiled is not None,
+            'data_hash': self.data_hash
+        }
+
+    def predict(self, X):
+        """
+        Predict with the flattened ensemble when available.
+
+        Args:
+            X (np.ndarray): Feature matrix in feature_columns order
+
+        Returns:
+            np.ndarray: Predictions per row
+        """
+        if self.compiled is not None:
+            return self.compiled.predict(X)
+        return self.model.predict(X)
+
+
+def _write_atomic(path, data):
+    """Write bytes to a temporary file next to ``path`` and rename it into place."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def save_model_artifact(model, feature_columns, model_dir="models/", metrics=None, version=None,
+                        data_hash=None):
+    """
+    Write a new versioned model artifact and make it the latest version.
+
+    Tree ensembles are written as a model bundle, anything else as a pickle.
+
+    Args:
+        model: Trained estimator
+        feature_columns (list): Feature order expected by the model
+        model_dir (str): Directory holding versioned artifacts
+        metrics (dict): Training metrics stored with the artifact
+        version (str): Explicit version name (defaults to a microsecond
+            timestamp, suffixed with a counter if that version exists)
+        data_hash (str): Hash of the training inputs
+
+    Returns:
+        str: The new version
+    """
+    os.makedirs(model_dir, exist_ok=True)
+    if not version:
+        version = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+        base, counter = version, 1
+        while any(os.path.exists(os.path.join(model_dir, f"model-{version}{extension}"))
+                  for extension in (BUNDLE_EXTENSION, '.pkl')):
+            version = f"{base}-{counter}"
+            counter += 1
+
+    try:
+        ensemble = compile_model(model)
+    except UnsupportedModelError:
+        ensemble = None
+
+    if ensemble is not None:
+        filename = f"model-{version}{BUNDLE_EXTENSION}"
+        payload = encode_bundle(ensemble, feature_columns, version, metrics,
+                                model_type=type(model).__name__, data_hash=data_hash,
+                                feature_version=FEATURE_VERSION)
+    else:
+        filename = f"model-{version}.pkl"
+        payload = pickle.dumps({
+            'version': version,
+            'model': model,
+            'feature_columns': list(feature_columns),
+            'metrics': metrics or {},
+            'data_hash': data_hash,
+            'feature_version': FEATURE_VERSION,
+            'created_at': datetime.now().isoformat()
+        })
+    _write_atomic(os.path.join(model_dir, filename), payload)
+    _write_atomic(os.path.join(model_dir, LATEST_FILE), filename.encode('utf-8'))
+    return version
+
+
+class ModelRegistry:
+    """
+    Holds the active model version and swaps in new versions atomically.
+    """
+
+    def __init__(self, model_dir="models/", legacy_model_path='trained_model.pkl',
+                 legacy_features_path='feature_columns.pkl', compile_trees=True):
+        """
+        Initialize the registry.
+
+        Args:
+            model_dir (str): Directory of versioned artifacts
+            legacy_model_path (str): Fallback pickled model
+            legacy_features_path (str): Fallback pickled feature column list
+            compile_trees (bool): Flatten pickled tree ensembles for inference.
+                Bundles hold no estimator and always use compiled inference;
+                loading one with compile_trees=False prints a warning
+        """
+        self.model_dir = model_dir
+        self.compile_trees = compile_trees
+        self.legacy_model_path = legacy_model_path
+        self.legacy_features_path = legacy_features_path
+
+        self.current = None
+        self.reload_count = 0
+        self.last_error = None
+        self._signature = None
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._stop = threading.Event()
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """
+        Register a callback invoked with the new LoadedModel after every swap.
+
+        Args:
+            callback (callable): Function taking a LoadedModel
+        """
+        self._listeners.append(callback)
+
+    def _latest_path(self):
+        return os.path.join(self.model_dir, LATEST_FILE)
+
+    def _resolve(self, version=None):
+        """Return (artifact path, is_legacy) for the requested or latest version."""
+        if version:
+            for extension in (BUNDLE_EXTENSION, '.pkl'):
+                path = os.path.join(self.model_dir, f"model-{version}{extension}")
+                if os.path.exists(path):
+                    return path, False
+            raise ModelNotFoundError(f"Model version {version} not found in {self.model_dir}")
+
+        latest = self._latest_path()
+        if os.path.exists(latest):
+            with open(latest, 'r') as f:
+                return os.path.join(self.model_dir, f.read().strip()), False
+
+        if os.path.exists(self.legacy_model_path) and os.path.exists(self.legacy_features_path):
+            return self.legacy_model_path, True
+
+        raise ModelNotFoundError(
+            f"No trained model found in {self.model_dir} or {self.legacy_model_path}. "
+            "Train one offline with: python surplus_model.py"
+        )
+
+    def _signature_of(self):
+        """File state that changes whenever a new version is published."""
+        paths = [self._latest_path(), self.legacy_model_path, self.legacy_features_path]
+        return tuple(
+            (os.path.getmtime(path), os.path.getsize(path)) if os.path.exists(path) else None
+            for path in paths
+        )
+
+    def _read(self, path, legacy):
+        """Load an artifact from disk into a LoadedModel."""
+        started = time.perf_counter()
+        if path.endswith(BUNDLE_EXTENSION):
+            bundle = read_bundle(path)
+            self._check_feature_version(bundle.feature_version, path)
+            if not self.compile_trees:
+                print(f"⚠️  {os.path.basename(path)} is a model bundle; it has no estimator and "
+                      "is served with compiled inference regardless of compile_trees")
+            return LoadedModel(None, bundle.feature_columns, bundle.version, path, bundle.metrics,
+                               load_seconds=time.perf_counter() - started, compiled=bundle.ensemble,
+                               model_type=bundle.model_type, data_hash=bundle.data_hash)
+
+        data_hash = None
+        if legacy:
+            with open(path, 'rb') as f:
+                model_bytes = f.read()
+            model = pickle.loads(model_bytes)
+            with open(self.legacy_features_path, 'rb') as f:
+                feature_columns = pickle.load(f)
+            version = f"legacy-{hashlib.sha256(model_bytes).hexdigest()[:12]}"
+            metrics = {}
+        else:
+            with open(path, 'rb') as f:
+                artifact = pickle.load(f)
+            model = artifact['model']
+            feature_columns = artifact['feature_columns']
+            version = artifact['version']
+            metrics = artifact.get('metrics', {})
+            data_hash = artifact.get('data_hash')
+            self._check_feature_version(artifact.get('feature_version'), path)
+
+        n_features = getattr(model, 'n_features_in_', len(feature_columns))
+        if n_features != len(feature_columns):
+            raise ValueError(f"Model expects {n_features} features but artifact lists {len(feature_columns)}")
+
+        compiled = None
+        if self.compile_trees:
+            try:
+                compiled = compile_model(model)
+            except UnsupportedModelError as e:
+                print(f"⚠️  Serving with {type(model).__name__}.predict(): {e}")
+
+        return LoadedModel(model, feature_columns, version, path, metrics,
+                           load_seconds=time.perf_counter() - started, compiled=compiled,
+                           data_hash=data_hash)
+
+    @staticmethod
+    def _check_feature_version(feature_version, path):
+        """Refuse models trained on a different feature definition (unrecorded passes)."""
+        if feature_version is not None and feature_version != FEATURE_VERSION:
+            raise ValueError(f"{path} was trained with feature version {feature_version}, "
+                             f"the server computes version {FEATURE_VERSION}")
+
+    def read_metrics(self, version=None):
+        """
+        Training metrics of the latest (or a specific) version, without loading the model.
+
+        Args:
+            version (str): Specific version to read
+
+        Returns:
+            dict: Metrics stored with the artifact ({} for the legacy pickle)
+        """
+        path, legacy = self._resolve(version)
+        if path.endswith(BUNDLE_EXTENSION):
+            header, _ = read_header(path)
+            return header.get('metrics', {})
+        if legacy:
+            return {}
+        with open(path, 'rb') as f:
+            return pickle.load(f).get('metrics', {})
+
+    def load(self, version=None):
+        """
+        Load the latest (or a specific) version and make it current.
+
+        The new version is fully loaded and validated before the swap; on any
+        error the previously loaded version stays active.
+
+        Args:
+            version (str): Specific version to activate
+
+        Returns:
+            LoadedModel: The active snapshot
+        """
+        with self._lock:
+            signature = self._signature_of()
+            try:
+                path, legacy = self._resolve(version)
+                loaded = self._read(path, legacy)
+            except Exception as e:
+                self.last_error = str(e)
+                raise
+
+            previous = self.current
+            self.current = loaded
+            self._signature = signature
+            self.last_error = None
+            if previous is not None:
+                self.reload_count += 1
+
+        for callback in self._listeners:
+            callback(loaded)
+        return loaded
+
+    def reload_if_changed(self):
+        """
+        Reload when the published artifacts changed on disk.
+
+        Returns:
+            bool: True if a new version was swapped in
+        """
+        if self._signature_of() == self._signature:
+            return False
+        try:
+            previous = self.current
+            loaded = self.load()
+            if previous is None or loaded.version != previous.version:
+                print(f"🔁 Model hot-swapped to version {loaded.version}")
+            return True
+        except Exception as e:
+            # Keep serving the current version; retry on the next change
+            self._signature = self._signature_of()
+            print(f"⚠️  Model reload failed, keeping current version: {e}")
+            return False
+
+    def start_watcher(self, interval=5.0):
+        """
+        Poll the artifacts in a daemon thread and hot-swap new versions.
+
+        Args:
+            interval (float): Seconds between checks
+        """
+        if self._watcher is not None:
+            return
+        # Left set by an earlier stop_watcher()
+        self._stop.clear()
+
+        def watch():
+            while not self._stop.wait(interval):
+                self.reload_if_changed()
+
+        self._watcher = threading.Thread(target=watch, name='model-registry-watcher', daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self):
+        """Stop the background watcher."""
+        self._stop.set()
+        self._watcher = None
+
+    def stats(self):
+        """Registry status for health and admin endpoints."""
+        stats = {
+            'loaded': self.current is not None,
+            'reload_count': self.reload_count,
+            'last_error': self.last_error,
+            'watching': self._watcher is not None
+        }
+        if self.current is not None:
+            stats.update(self.current.info())
+        return stats
@@ -5,15 +5,27 @@ Provides a simple HTTP API for the trained surplus prediction model.
 This server can be called from the Next.js backend via HTTP requests.
 """
 
-import json
-import pandas as pd
-import numpy as np
-from flask import Flask, request, jsonify
-from flask_cors import CORS
-import pickle
 import os
-from datetime import datetime, timedelta
-import warnings
+import time
+from startup_profile import StartupProfile
+
+# Cold-start timings (imports, model and feature history load), printed at
+# startup and served by /model. Serving imports only what inference needs:
+# no pandas, scikit-learn or plotting libraries are loaded here.
+startup = StartupProfile()
+with startup.track_imports():
+    import hmac
+    import json
+    import numpy as np
+    from flask import Flask, Response, request, jsonify, stream_with_context
+    from flask_cors import CORS
+    from datetime import datetime, timedelta
+    import warnings
+    from model_registry import ModelRegistry, ModelNotFoundError
+    from fast_features import InvalidRecordError, get_vectorizer
+    from feature_index import HistoricalFeatureIndex
+    from prediction_cache import PredictionCache, payload_key
+    from serving import ScoringPool, ServingError, serve
 
 # Suppress warnings for cleaner output
 warnings.filterwarnings('ignore')
@@ -21,192 +33,118 @@ warnings.filterwarnings('ignore')
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend integration
 
-# Global variables to store the model and feature columns
-model = None
-feature_columns = None
-model_loaded = False
+# Fields every prediction record must provide
+REQUIRED_FIELDS = ['store_id', 'product_id', 'daily_sales', 'stock_level']
+
+# Upper bound on records per /predict/batch request
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', 10000))
+
+# Records per streamed chunk of /predict/batch output
+STREAM_CHUNK_SIZE = 256
+
+# Versioned model registry; request handlers read one snapshot of registry.current.
+# Model bundles are always served from flattened tree arrays; COMPILED_INFERENCE=0
+# makes pickled models use the estimator's predict() instead
+registry = ModelRegistry(compile_trees=os.environ.get('COMPILED_INFERENCE', '1') != '0')
+
+# Per-series history for lag, rolling and aggregate features (written by surplus_model.py)
+FEATURE_STATE_PATH = os.environ.get('FEATURE_STATE_PATH', 'feature_state.npz')
+with startup.stage('feature history load'):
+    feature_index = HistoricalFeatureIndex.load(FEATURE_STATE_PATH)
+
+# Repeated /predict payloads are answered from a bounded LRU + TTL cache
+prediction_cache = PredictionCache(
+    max_entries=int(os.environ.get('PREDICTION_CACHE_SIZE', 10000)),
+    ttl_seconds=float(os.environ.get('PREDICTION_CACHE_TTL', 300))
+)
+registry.add_listener(lambda loaded: prediction_cache.clear(f"model version {loaded.version}"))
+
+# Feature building and tree evaluation run on a bounded pool: when workers and
+# queue are busy, requests get 503 + Retry-After instead of piling up
+scoring_pool = ScoringPool(
+    workers=int(os.environ.get('SCORING_WORKERS', 0)) or None,
+    max_queue=int(os.environ.get('SCORING_QUEUE_LIMIT', 256)),
+    timeout=float(os.environ.get('SCORING_TIMEOUT', 10))
+)
+
+# Fields every sales record pushed to /sales must provide
+SALES_FIELDS = ['store_id', 'product_id', 'date', 'daily_sales', 'stock_level']
 
 def load_model():
     """
-    Load the trained model and feature columns.
-    This function will be called once at server startup.
+    Load the latest trained model version.
+    This function will be called once at server startup. Training never runs
+    on the serving path; a missing model is reported instead.
     """
-    global model, feature_columns, model_loaded
-    
     try:
-        # Check if we have a saved model file
-        model_path = 'trained_model.pkl'
-        features_path = 'feature_columns.pkl'
-        
-        if os.path.exists(model_path) and os.path.exists(features_path):
-            # Load pre-trained model
-            with open(model_path, 'rb') as f:
-                model = pickle.load(f)
-            
-            with open(features_path, 'rb') as f:
-                feature_columns = pickle.load(f)
-            
-            print(f"✅ Loaded pre-trained model with {len(feature_columns)} features")
-        else:
-            # Train a new model if no saved model exists
-            print("🔄 No pre-trained model found. Training new model...")
-            from surplus_model import FoodSurplusPredictor
-            
-            predictor = FoodSurplusPredictor()
-            
-            # Run the full pipeline to train the model
-            results = predictor.run_full_pipeline()
-            
-            # Extract model and features
-            model = results['model']
-            feature_columns = predictor.feature_columns
-            
-            # Save the model for future use
-            with open(model_path, 'wb') as f:
-                pickle.dump(model, f)
-            
-            with open(features_path, 'wb') as f:
-                pickle.dump(feature_columns, f)
-            
-            print(f"✅ Trained and saved new model with {len(feature_columns)} features")
-        
-        model_loaded = True
+        with startup.stage('model load'):
+            loaded = registry.load()
+        print(f"✅ Loaded model version {loaded.version} with {len(loaded.feature_columns)} features "
+              f"in {loaded.load_seconds * 1000:.1f} ms")
         return True
         
+    except ModelNotFoundError as e:
+        print(f"❌ {e}")
+        return False
     except Exception as e:
         print(f"❌ Error loading model: {e}")
-        model_loaded = False
         return False
 
-def prepare_prediction_data(input_data):
+def prepare_prediction_matrix(records, feature_columns=None):
     """
-    Prepare input data for prediction by engineering features.
+    Prepare a batch of input records for prediction in one vectorized pass.
+    Features are written straight into a float64 matrix in model column
+    order; only the features the model uses are computed. Lag, rolling and
+    aggregate features are looked up in the historical feature index.
     
     Args:
-        input_data (dict): Input data from the API request
+        records (list): Input dicts from the API request
+        feature_columns (list): Feature order of the model version being used
         
     Returns:
-        pd.DataFrame: Prepared feature matrix
+        np.ndarray: Prepared feature matrix, one row per record
     """
     try:
-        # Create a DataFrame with the input data
-        df = pd.DataFrame([input_data])
-        
-        # Parse the date
-        if 'date' in input_data:
-            df['date'] = pd.to_datetime(input_data['date'])
-        else:
-            df['date'] = pd.Timestamp.now()
-        
-        # Engineer temporal features
-        df['year'] = df['date'].dt.year
-        df['month'] = df['date'].dt.month
-        df['day'] = df['date'].dt.day
-        df['dayofweek'] = df['date'].dt.dayofweek
-        df['dayofyear'] = df['date'].dt.dayofyear
-        df['quarter'] = df['date'].dt.quarter
-        df['week'] = df['date'].dt.isocalendar().week
-        
-        # Cyclical encoding for temporal features
-        df['month_sin'] = np.sin(2 * np.pi * df['month'] / 12)
-        df['month_cos'] = np.cos(2 * np.pi * df['month'] / 12)
-        df['dayofweek_sin'] = np.sin(2 * np.pi * df['dayofweek'] / 7)
-        df['dayofweek_cos'] = np.cos(2 * np.pi * df['dayofweek'] / 7)
-        df['dayofyear_sin'] = np.sin(2 * np.pi * df['dayofyear'] / 365)
-        df['dayofyear_cos'] = np.cos(2 * np.pi * df['dayofyear'] / 365)
-        
-        # Business calendar features
-        df['is_weekend'] = (df['dayofweek'] >= 5).astype(int)
-        df['is_month_start'] = (df['day'] <= 5).astype(int)
-        df['is_month_end'] = (df['day'] >= 25).astype(int)
-        df['is_quarter_start'] = df['day'].isin([1]) & df['month'].isin([1, 4, 7, 10])
-        df['is_quarter_end'] = df['day'].isin([31, 30, 29, 28]) & df['month'].isin([3, 6, 9, 12])
-        
-        # Encode boolean features
-        df['promotion_encoded'] = df.get('promotion_flag', False).astype(int)
-        df['brain_diet_encoded'] = df.get('brain_diet_flag', False).astype(int)
-        
-        # Normalize price and shelf life
-        df['price_normalized'] = (df.get('price', 10) - 10) / 20  # Normalize around typical price range
-        df['shelf_life_normalized'] = df.get('shelf_life_days', 7) / 30  # Normalize around typical shelf life
-        
-        # Create interaction features
-        df['promotion_sales_interaction'] = df['promotion_encoded'] * df.get('daily_sales', 50)
-        
-        # Use actual input data for key features, with realistic variations for missing features
-        daily_sales = input_data.get('daily_sales', 50)
-        stock_level = input_data.get('stock_level', 100)
-        price = input_data.get('price', 10)
-        
-        # Calculate realistic variations based on actual input
-        sales_variation = daily_sales * 0.1  # 10% variation
-        stock_variation = stock_level * 0.1
-        
-        default_values = {
-            'daily_sales_sales': daily_sales,  # Use actual input
-            'stock_level': stock_level,        # Use actual input
-            'price': price,                    # Use actual input
-            'sales_3day_avg': daily_sales + np.random.normal(0, sales_variation),
-            'sales_7day_avg': daily_sales + np.random.normal(0, sales_variation),
-            'sales_14day_avg': daily_sales + np.random.normal(0, sales_variation),
-            'sales_3day_std': sales_variation,
-            'sales_7day_std': sales_variation,
-            'sales_14day_std': sales_variation,
-            'stock_3day_avg': stock_level + np.random.normal(0, stock_variation),
-            'stock_7day_avg': stock_level + np.random.normal(0, stock_variation),
-            'stock_14day_avg': stock_level + np.random.normal(0, stock_variation),
-            'sales_lag_1': daily_sales + np.random.normal(0, sales_variation),
-            'sales_lag_2': daily_sales + np.random.normal(0, sales_variation),
-            'sales_lag_3': daily_sales + np.random.normal(0, sales_variation),
-            'sales_lag_7': daily_sales + np.random.normal(0, sales_variation),
-            'sales_lag_14': daily_sales + np.random.normal(0, sales_variation),
-            'stock_lag_1': stock_level + np.random.normal(0, stock_variation),
-            'stock_lag_2': stock_level + np.random.normal(0, stock_variation),
-            'stock_lag_3': stock_level + np.random.normal(0, stock_variation),
-            'stock_lag_7': stock_level + np.random.normal(0, stock_variation),
-            'stock_lag_14': stock_level + np.random.normal(0, stock_variation),
-            'surplus_lag_1': max(0, (stock_level - daily_sales) * 0.3 + np.random.normal(0, 5)),
-            'surplus_lag_2': max(0, (stock_level - daily_sales) * 0.25 + np.random.normal(0, 5)),
-            'surplus_lag_3': max(0, (stock_level - daily_sales) * 0.2 + np.random.normal(0, 5)),
-            'surplus_lag_7': max(0, (stock_level - daily_sales) * 0.15 + np.random.normal(0, 5)),
-            'sales_trend_7day': np.random.normal(0, 0.1),
-            'stock_trend_7day': np.random.normal(0, 0.1),
-            'sales_volatility_7day': max(0.1, sales_variation / daily_sales),
-            'store_avg_sales': daily_sales + np.random.normal(0, sales_variation),
-            'product_avg_sales': daily_sales + np.random.normal(0, sales_variation),
-            'store_avg_stock': stock_level + np.random.normal(0, stock_variation),
-            'product_avg_stock': stock_level + np.random.normal(0, stock_variation)
-        }
-        
-        # Fill missing features with defaults
-        for feature, default_value in default_values.items():
-            if feature not in df.columns:
-                df[feature] = default_value
-        
-        # Select only the features used by the model
-        if feature_columns:
-            # Ensure all required features are present
-            for feature in feature_columns:
-                if feature not in df.columns:
-                    df[feature] = default_values.get(feature, 0)
-            
-            X = df[feature_columns].copy()
-        else:
-            # Fallback to basic features if feature_columns is not loaded
-            basic_features = ['daily_sales_sales', 'stock_level', 'price', 'promotion_encoded', 'brain_diet_encoded']
-            X = df[basic_features].copy()
-        
-        # Handle any remaining missing values
-        X = X.fillna(X.median())
-        X = X.replace([np.inf, -np.inf], np.nan)
-        X = X.fillna(X.median())
-        
-        return X
+        return get_vectorizer(feature_columns).transform(records, feature_index)
         
     except Exception as e:
         print(f"❌ Error preparing prediction data: {e}")
         raise e
 
+def score_records(records, snapshot):
+    """
+    Build the feature matrix for records and predict with a model snapshot.
+    Runs on a scoring pool thread.
+    
+    Args:
+        records (list): Validated input dicts
+        snapshot (LoadedModel): Model version used for the whole request
+        
+    Returns:
+        tuple: (predictions array, {'features_ms', 'predict_ms'})
+    """
+    stage = time.perf_counter()
+    X = prepare_prediction_matrix(records, snapshot.feature_columns)
+    features_ms = (time.perf_counter() - stage) * 1000
+    
+    stage = time.perf_counter()
+    predictions = snapshot.predict(X)
+    predict_ms = (time.perf_counter() - stage) * 1000
+    return predictions, {'features_ms': features_ms, 'predict_ms': predict_ms}
+
+def prepare_prediction_data(input_data, feature_columns=None):
+    """
+    Prepare input data for prediction by engineering features.
+    
+    Args:
+        input_data (dict): Input data from the API request
+        feature_columns (list): Feature order of the model version being used
+        
+    Returns:
+        np.ndarray: Prepared (1, n_features) feature row
+    """
+    return prepare_prediction_matrix([input_data], feature_columns)
+
 def calculate_urgency_score(input_data, predicted_surplus):
     """
     Calculate urgency score (1-20) based on various factors.
@@ -288,6 +226,54 @@ def get_impact_score(predicted_surplus, nutritional_value):
     """Calculate social impact score."""
     return round((predicted_surplus * 0.1) + (nutritional_value * 2), 1)
 
+def get_accuracy_label(metrics):
+    """Held-out R² of a model version, as shown in model_info."""
+    r2 = metrics.get('r2_score')
+    if r2 is None:
+        return 'not recorded'
+    return f"{r2:.1%} (R² = {r2:.4f})"
+
+def build_prediction_result(input_data, prediction):
+    """
+    Build the prediction payload (surplus plus MVP enrichments) for one record.
+    
+    Args:
+        input_data (dict): Input record
+        prediction (float): Raw model output
+        
+    Returns:
+        dict: Prediction payload
+    """
+    # Ensure prediction is non-negative
+    prediction = max(0, prediction)
+    
+    # Calculate enhanced MVP features
+    urgency_score = calculate_urgency_score(input_data, prediction)
+    nutritional_value = calculate_nutritional_value(input_data)
+    estimated_meals = int(prediction * 2)  # Rough estimate: 2 meals per unit
+    expiry_date = calculate_expiry_date(input_data)
+    priority_level = get_priority_level(urgency_score)
+    impact_score = get_impact_score(prediction, nutritional_value)
+    
+    return {
+        'predicted_surplus': round(float(prediction), 2),
+        'store_id': input_data['store_id'],
+        'product_id': input_data['product_id'],
+        'product_name': input_data.get('product_name', 'Unknown'),
+        'date': input_data.get('date', datetime.now().strftime('%Y-%m-%d')),
+        'confidence': 'moderate',
+        # Enhanced MVP features
+        'urgency_score': urgency_score,
+        'nutritional_value': nutritional_value,
+        'estimated_meals': estimated_meals,
+        'expiry_date': expiry_date,
+        'priority_level': priority_level,
+        'impact_score': impact_score,
+        'shelf_life_days': input_data.get('shelf_life_days', 7),
+        'brain_diet_flag': input_data.get('brain_diet_flag', False),
+        'promotion_flag': input_data.get('promotion_flag', False)
+    }
+
 @app.route('/predict', methods=['POST'])
 def predict():
     """
@@ -295,7 +281,9 @@ def predict():
     Accepts input data and returns predicted surplus.
     """
     try:
-        if not model_loaded:
+        # One snapshot per request: a concurrent hot swap cannot change it midway
+        snapshot = registry.current
+        if snapshot is None:
             return jsonify({
                 'success': False,
                 'error': 'Model not loaded'
@@ -311,8 +299,7 @@ def predict():
             }), 400
         
         # Validate required fields
-        required_fields = ['store_id', 'product_id', 'daily_sales', 'stock_level']
-        missing_fields = [field for field in required_fields if field not in input_data]
+        missing_fields = [field for field in REQUIRED_FIELDS if field not in input_data]
         
         if missing_fields:
             return jsonify({
@@ -320,50 +307,46 @@ def predict():
                 'error': f'Missing required fields: {", ".join(missing_fields)}'
             }), 400
         
-        # Prepare data for prediction
-        X = prepare_prediction_data(input_data)
+        # Identical payloads for the same model version and sales history are served
+        # from the cache. The generation is read before scoring: a result computed
+        # while /sales updates the history is stored under the old generation and
+        # never served after the update
+        cache_key = (payload_key(input_data, snapshot.version, feature_index.generation)
+                     if prediction_cache.enabled else None)
+        cached = prediction_cache.get(cache_key) if cache_key else None
+        if cached is not None:
+            response = jsonify(cached)
+            response.headers['X-Cache'] = 'HIT'
+            return response
         
-        # Make prediction
-        prediction = model.predict(X)[0]
+        # Prepare features and predict on the scoring pool
+        predictions, _ = scoring_pool.run(score_records, [input_data], snapshot)
+        prediction = predictions[0]
         
-        # Ensure prediction is non-negative
-        prediction = max(0, prediction)
-        
-        # Calculate enhanced MVP features
-        urgency_score = calculate_urgency_score(input_data, prediction)
-        nutritional_value = calculate_nutritional_value(input_data)
-        estimated_meals = int(prediction * 2)  # Rough estimate: 2 meals per unit
-        expiry_date = calculate_expiry_date(input_data)
-        priority_level = get_priority_level(urgency_score)
-        impact_score = get_impact_score(prediction, nutritional_value)
-        
-        return jsonify({
+        result = {
             'success': True,
-            'prediction': {
-                'predicted_surplus': round(float(prediction), 2),
-                'store_id': input_data['store_id'],
-                'product_id': input_data['product_id'],
-                'product_name': input_data.get('product_name', 'Unknown'),
-                'date': input_data.get('date', datetime.now().strftime('%Y-%m-%d')),
-                'confidence': 'moderate',
-                # Enhanced MVP features
-                'urgency_score': urgency_score,
-                'nutritional_value': nutritional_value,
-                'estimated_meals': estimated_meals,
-                'expiry_date': expiry_date,
-                'priority_level': priority_level,
-                'impact_score': impact_score,
-                'shelf_life_days': input_data.get('shelf_life_days', 7),
-                'brain_diet_flag': input_data.get('brain_diet_flag', False),
-                'promotion_flag': input_data.get('promotion_flag', False)
-            },
+            'prediction': build_prediction_result(input_data, prediction),
             'model_info': {
-                'features_used': len(feature_columns) if feature_columns else 0,
-                'model_type': 'GradientBoostingRegressor',
-                'accuracy': '59.4% (R² = 0.5937)'
+                'features_used': len(snapshot.feature_columns),
+                'model_type': snapshot.model_type,
+                'model_version': snapshot.version,
+                'accuracy': get_accuracy_label(snapshot.metrics)
             }
-        })
+        }
+        if cache_key:
+            prediction_cache.put(cache_key, result)
+        
+        response = jsonify(result)
+        response.headers['X-Cache'] = 'MISS'
+        return response
         
+    except ServingError:
+        raise
+    except InvalidRecordError as e:
+        return jsonify({
+            'success': False,
+            'error': f'Invalid input: {e.reason}'
+        }), 400
     except Exception as e:
         print(f"❌ Prediction error: {e}")
         return jsonify({
@@ -371,15 +354,174 @@ def predict():
             'error': f'Prediction failed: {str(e)}'
         }), 500
 
+def parse_batch_records():
+    """
+    Read batch records from the request body.
+    Accepts a JSON array, an object with a "records" array, or NDJSON
+    (one JSON object per line).
+    
+    Returns:
+        list: Input records
+    """
+    body = request.get_data(as_text=True)
+    if not body.strip():
+        return []
+    
+    def ndjson():
+        return [json.loads(line) for line in body.splitlines() if line.strip()]
+    
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        return ndjson()
+    
+    try:
+        payload = json.loads(body)
+    except json.JSONDecodeError:
+        # Several JSON objects on separate lines without the NDJSON content type
+        return ndjson()
+    
+    if isinstance(payload, dict):
+        payload = payload.get('records', [payload])
+    return payload
+
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    """
+    Batch prediction endpoint.
+    Scores every record with one feature-matrix build and one predict call,
+    and streams one NDJSON line per record followed by a summary line with
+    the per-stage latency breakdown.
+    """
+    timings = {}
+    started = time.perf_counter()
+    
+    snapshot = registry.current
+    if snapshot is None:
+        return jsonify({
+            'success': False,
+            'error': 'Model not loaded'
+        }), 500
+    
+    try:
+        records = parse_batch_records()
+    except (json.JSONDecodeError, ValueError) as e:
+        return jsonify({
+            'success': False,
+            'error': f'Invalid batch payload: {str(e)}'
+        }), 400
+    
+    if not isinstance(records, list) or not records:
+        return jsonify({
+            'success': False,
+            'error': 'No input records provided'
+        }), 400
+    
+    if len(records) > MAX_BATCH_SIZE:
+        return jsonify({
+            'success': False,
+            'error': f'Batch of {len(records)} records exceeds the limit of {MAX_BATCH_SIZE}'
+        }), 413
+    
+    # Validate required fields per record; invalid records are reported, not fatal
+    errors = {}
+    valid_index = []
+    for i, record in enumerate(records):
+        if not isinstance(record, dict):
+            errors[i] = 'Record is not a JSON object'
+            continue
+        missing_fields = [field for field in REQUIRED_FIELDS if field not in record]
+        if missing_fields:
+            errors[i] = f'Missing required fields: {", ".join(missing_fields)}'
+        else:
+            valid_index.append(i)
+    timings['parse_ms'] = (time.perf_counter() - started) * 1000
+    
+    try:
+        predictions = np.zeros(0)
+        if valid_index:
+            # One feature-matrix build and one predict call on the scoring pool
+            stage = time.perf_counter()
+            predictions, scoring = scoring_pool.run(score_records, [records[i] for i in valid_index], snapshot)
+            timings.update(scoring)
+            timings['queue_ms'] = max(0.0, (time.perf_counter() - stage) * 1000 - sum(scoring.values()))
+    except ServingError:
+        raise
+    except InvalidRecordError as e:
+        # Name the record by its position in the request
+        return jsonify({
+            'success': False,
+            'error': f'Record {valid_index[e.index]}: {e.reason}'
+        }), 400
+    except Exception as e:
+        print(f"❌ Batch prediction error: {e}")
+        return jsonify({
+            'success': False,
+            'error': f'Batch prediction failed: {str(e)}'
+        }), 500
+    
+    def generate():
+        stage = time.perf_counter()
+        results = dict(zip(valid_index, predictions))
+        chunk = []
+        for i, record in enumerate(records):
+            if i in errors:
+                line = {'index': i, 'success': False, 'error': errors[i]}
+            else:
+                line = {'index': i, 'success': True, 'prediction': build_prediction_result(record, results[i])}
+            chunk.append(json.dumps(line))
+            
+            # Flush in chunks rather than one socket write per record
+            if len(chunk) == STREAM_CHUNK_SIZE:
+                yield '\n'.join(chunk) + '\n'
+                chunk = []
+        if chunk:
+            yield '\n'.join(chunk) + '\n'
+        
+        timings['serialize_ms'] = (time.perf_counter() - stage) * 1000
+        timings['total_ms'] = (time.perf_counter() - started) * 1000
+        yield json.dumps({
+            'summary': {
+                'count': len(records),
+                'succeeded': len(valid_index),
+                'failed': len(errors),
+                'model_version': snapshot.version,
+                'latency_ms': {name: round(value, 3) for name, value in timings.items()}
+            }
+        }) + '\n'
+    
+    # Stages completed before streaming are also reported up front
+    server_timing = ', '.join(
+        f"{name[:-3]};dur={value:.3f}" for name, value in timings.items()
+    )
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                    headers={'Server-Timing': server_timing})
+
+@app.errorhandler(ServingError)
+def serving_error(e):
+    """
+    Overload (503 + Retry-After) and timeout (504) responses from the scoring pool.
+    """
+    response = jsonify({
+        'success': False,
+        'error': str(e)
+    })
+    response.status_code = e.status
+    if e.retry_after:
+        response.headers['Retry-After'] = str(e.retry_after)
+    return response
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """
     Health check endpoint to verify model status.
     """
+    snapshot = registry.current
     return jsonify({
         'status': 'healthy',
-        'model_loaded': model_loaded,
-        'features_count': len(feature_columns) if feature_columns else 0,
+        'model_loaded': snapshot is not None,
+        'model_version': snapshot.version if snapshot else None,
+        'features_count': len(snapshot.feature_columns) if snapshot else 0,
+        'history_series': feature_index.n_series,
+        'scoring': scoring_pool.stats(),
         'timestamp': datetime.now().isoformat()
     })
 
@@ -388,22 +530,189 @@ def get_features():
     """
     Get the list of features used by the model.
     """
+    snapshot = registry.current
+    feature_columns = snapshot.feature_columns if snapshot else []
+    return jsonify({
+        'success': True,
+        'features': feature_columns,
+        'count': len(feature_columns)
+    })
+
+@app.route('/model', methods=['GET'])
+def get_model_info():
+    """
+    Get the active model version and registry metrics (load time, reloads).
+    """
     return jsonify({
         'success': True,
-        'features': feature_columns if feature_columns else [],
-        'count': len(feature_columns) if feature_columns else 0
+        'model': registry.stats(),
+        'feature_index': feature_index.stats(),
+        'startup': startup.report()
+    })
+
+@app.route('/sales', methods=['POST'])
+def ingest_sales():
+    """
+    Push newly observed daily sales into the historical feature index so
+    later predictions use them for lag and rolling features.
+    Accepts the same payload shapes as /predict/batch.
+    """
+    try:
+        records = parse_batch_records()
+    except (json.JSONDecodeError, ValueError) as e:
+        return jsonify({
+            'success': False,
+            'error': f'Invalid sales payload: {str(e)}'
+        }), 400
+    
+    if not isinstance(records, list) or not records:
+        return jsonify({
+            'success': False,
+            'error': 'No sales records provided'
+        }), 400
+    
+    for i, record in enumerate(records):
+        missing_fields = [field for field in SALES_FIELDS if not isinstance(record, dict) or field not in record]
+        if missing_fields:
+            return jsonify({
+                'success': False,
+                'error': f'Record {i} is missing required fields: {", ".join(missing_fields)}'
+            }), 400
+    
+    try:
+        import pandas as pd
+        rows = pd.DataFrame({
+            'store_id': [str(record['store_id']) for record in records],
+            'product_id': [str(record['product_id']) for record in records],
+            'date': pd.to_datetime([record['date'] for record in records]),
+            'daily_sales_sales': [float(record['daily_sales']) for record in records],
+            'stock_level': [float(record['stock_level']) for record in records],
+            'end_inventory': [float(record['end_inventory']) if record.get('end_inventory') is not None
+                              else np.nan for record in records]
+        })
+    except (TypeError, ValueError) as e:
+        return jsonify({
+            'success': False,
+            'error': f'Invalid sales records: {str(e)}'
+        }), 400
+    
+    try:
+        result = feature_index.add_sales(rows)
+        if result['applied']:
+            # Cached predictions were computed from the previous history
+            prediction_cache.clear("new sales history")
+    except Exception as e:
+        print(f"❌ Sales ingestion error: {e}")
+        return jsonify({
+            'success': False,
+            'error': f'Sales ingestion failed: {str(e)}'
+        }), 500
+    
+    if result['skipped']:
+        print(f"⚠️  Skipped {result['skipped']} sales rows dated at or before their series' last update")
+    
+    body = {
+        'success': True,
+        'records': len(records),
+        'applied': result['applied'],
+        'skipped': result['skipped'],
+        'series_updated': result['series_updated'],
+        'feature_index': feature_index.stats()
+    }
+    if not result['applied']:
+        # Nothing new, e.g. a retried request: report the conflict instead of success
+        body.update({'success': False, 'error': 'All sales records are dated at or before their series\' last update'})
+        return jsonify(body), 409
+    return jsonify(body)
+
+@app.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """
+    Get prediction cache counters (hits, misses, evictions, expirations).
+    """
+    return jsonify({
+        'success': True,
+        'cache': prediction_cache.stats()
+    })
+
+@app.route('/admin/reload', methods=['POST'])
+def reload_model():
+    """
+    Hot-swap to the latest (or a requested) model version without a restart.
+    In-flight requests finish on the version they started with. Requires the
+    X-Admin-Token header to match MODEL_ADMIN_TOKEN; disabled when it is unset.
+    """
+    admin_token = os.environ.get('MODEL_ADMIN_TOKEN')
+    if not admin_token:
+        return jsonify({
+            'success': False,
+            'error': 'Reload endpoint disabled; set MODEL_ADMIN_TOKEN to enable it'
+        }), 403
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), admin_token):
+        return jsonify({
+            'success': False,
+            'error': 'Unauthorized'
+        }), 401
+    
+    version = (request.get_json(silent=True) or {}).get('version')
+    previous = registry.current.version if registry.current else None
+    
+    try:
+        loaded = registry.load(version)
+    except ModelNotFoundError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 404
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Reload failed, keeping version {previous}: {str(e)}'
+        }), 500
+    
+    print(f"🔁 Model reloaded: {previous} -> {loaded.version}")
+    return jsonify({
+        'success': True,
+        'previous_version': previous,
+        'model': loaded.info()
     })
 
 if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='FoodCast AI Model Server')
+    parser.add_argument('--production', action='store_true',
+                        default=os.environ.get('SERVER_MODE') == 'production',
+                        help='Serve with the multi-threaded production server (see serving.py) '
+                             'instead of the Flask development server')
+    parser.add_argument('--host', default='0.0.0.0', help='Bind address')
+    parser.add_argument('--port', type=int, default=5001, help='Bind port')
+    parser.add_argument('--threads', type=int, default=32,
+                        help='Connection-handling threads per process in production mode')
+    parser.add_argument('--processes', type=int, default=int(os.environ.get('SERVER_PROCESSES', 1)),
+                        help='Worker processes in production mode (each keeps its own cache and '
+                             'feature index, so /sales updates reach one worker only)')
+    args = parser.parse_args()
+    
     print("🚀 Starting FoodCast AI Model Server...")
     
     # Load the model at startup
     if load_model():
         print("✅ Model loaded successfully!")
+        startup.mark_ready()
+        print(startup.summary())
         print("🌐 API Endpoints:")
         print("  POST /predict - Make surplus predictions")
+        print("  POST /predict/batch - Score a JSON array or NDJSON batch (streams NDJSON)")
         print("  GET /health - Health check")
         print("  GET /features - Get model features")
+        print("  GET /model - Active model version and load metrics")
+        print("  POST /admin/reload - Hot-swap to the latest model version (needs MODEL_ADMIN_TOKEN)")
+        print("  POST /sales - Add observed sales to the historical feature index")
+        print("  GET /cache/stats - Prediction cache hit/miss/eviction counters")
+        if feature_index.source:
+            print(f"📚 Historical features for {feature_index.n_series} series from {feature_index.source}")
+        else:
+            print(f"⚠️  No feature history at {FEATURE_STATE_PATH}; lag features use request-based defaults")
         print("\n🔗 Example prediction request:")
         print("""
         {
@@ -420,7 +729,22 @@ if __name__ == '__main__':
         }
         """)
         
-        app.run(debug=True, host='0.0.0.0', port=5001)
+        # Pick up newly published model versions without a restart
+        def start_watcher():
+            registry.start_watcher(interval=float(os.environ.get('MODEL_RELOAD_INTERVAL', 5)))
+        
+        if args.production:
+            # Started per worker process: threads do not survive fork
+            try:
+                serve(app, host=args.host, port=args.port, threads=args.threads,
+                      processes=args.processes, on_start=start_watcher)
+            except RuntimeError as e:
+                print(f"❌ {e}")
+                exit(1)
+        else:
+            start_watcher()
+            # The reloader would start a second process with its own registry
+            app.run(debug=True, use_reloader=False, host=args.host, port=args.port, threaded=True)
     else:
         print("❌ Failed to load model. Exiting.")
         exit(1)
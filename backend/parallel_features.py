@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+FoodCast Parallel Feature Engine
+Per-store sharding of the series feature kernels across a process pool.
+
+Rolling, lag, trend and volatility features never look across a
+(store_id, product_id) series, and the training frame is sorted by store, so
+every store is a contiguous block of rows. The blocks are grouped into shards
+of similar size and each shard runs compute_series_features() in a worker
+process.
+
+Arrays are not pickled to the workers. The input columns and series ids are
+copied once into shared memory, and every worker writes its features into
+its own row range of a shared output block. Reassembly is therefore
+deterministic and the result is identical to the single-process computation.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from feature_engine import SeriesLayout, compute_series_features, series_feature_names
+
+# Below this many rows per shard the pool costs more than it saves
+MIN_SHARD_ROWS = 50000
+
+
+def resolve_workers(workers):
+    """Worker count for a setting where None or 0 means one per CPU."""
+    if not workers:
+        return os.cpu_count() or 1
+    return max(1, int(workers))
+
+
+def plan_shards(boundaries, n_shards):
+    """
+    Group consecutive blocks into at most ``n_shards`` row ranges of similar size.
+
+    Args:
+        boundaries (np.ndarray): Block start offsets followed by the end offset
+        n_shards (int): Desired number of shards
+
+    Returns:
+        list: (start, end) row ranges covering every block in order
+    """
+    boundaries = np.asarray(boundaries, dtype=np.int64)
+    total = boundaries[-1]
+    # Cut at the block boundary nearest to each equal-size target
+    targets = np.arange(1, n_shards) * total / n_shards
+    cuts = boundaries[np.clip(np.searchsorted(boundaries, targets), 0, len(boundaries) - 1)]
+    edges = np.unique(np.concatenate([[0], cuts, [total]]))
+    return [(int(start), int(end)) for start, end in zip(edges[:-1], edges[1:]) if end > start]
+
+
+def _shard_worker(task):
+    """Compute the series features of one row range into the shared output block."""
+    inputs_name, ids_name, output_name, n_rows, n_features, start, end = task
+    inputs_shm = shared_memory.SharedMemory(name=inputs_name)
+    ids_shm = shared_memory.SharedMemory(name=ids_name)
+    output_shm = shared_memory.SharedMemory(name=output_name)
+    try:
+        inputs = np.ndarray((3, n_rows), dtype=np.float64, buffer=inputs_shm.buf)
+        group_ids = np.ndarray(n_rows, dtype=np.int64, buffer=ids_shm.buf)
+        output = np.ndarray((n_features, n_rows), dtype=np.float64, buffer=output_shm.buf)
+
+        layout = SeriesLayout(group_ids[start:end])
+        features = compute_series_features(
+            layout, inputs[0, start:end], inputs[1, start:end], inputs[2, start:end]
+        )
+        for row, name in enumerate(series_feature_names()):
+            output[row, start:end] = features[name]
+        del inputs, group_ids, output, features
+    finally:
+        inputs_shm.close()
+        ids_shm.close()
+        output_shm.close()
+    return end - start
+
+
+def parallel_series_features(layout, sales, stock, surplus, shard_offsets, workers=None):
+    """
+    compute_series_features() sharded across a process pool.
+
+    Args:
+        layout (SeriesLayout): Layout of the sorted training frame
+        sales (np.ndarray): Daily sales in layout order
+        stock (np.ndarray): Stock levels in layout order
+        surplus (np.ndarray): Surplus target in layout order
+        shard_offsets (np.ndarray): Row offsets where shards may be cut (the
+            start of every store, followed by the row count)
+        workers (int): Worker processes (None or 0 = one per CPU, 1 = no pool)
+
+    Returns:
+        dict: Feature name -> float64 array, as compute_series_features()
+    """
+    n_rows = layout.size
+    workers = resolve_workers(workers)
+    n_shards = min(workers, n_rows // MIN_SHARD_ROWS)
+    shards = plan_shards(shard_offsets, n_shards) if n_shards > 1 else []
+    if len(shards) < 2:
+        return compute_series_features(layout, sales, stock, surplus)
+
+    names = series_feature_names()
+    blocks = []
+    try:
+        inputs_shm = shared_memory.SharedMemory(create=True, size=3 * n_rows * 8)
+        blocks.append(inputs_shm)
+        ids_shm = shared_memory.SharedMemory(create=True, size=n_rows * 8)
+        blocks.append(ids_shm)
+        output_shm = shared_memory.SharedMemory(create=True, size=len(names) * n_rows * 8)
+        blocks.append(output_shm)
+
+        inputs = np.ndarray((3, n_rows), dtype=np.float64, buffer=inputs_shm.buf)
+        inputs[0], inputs[1], inputs[2] = sales, stock, surplus
+        np.ndarray(n_rows, dtype=np.int64, buffer=ids_shm.buf)[:] = layout.group_ids
+        del inputs
+
+        tasks = [
+            (inputs_shm.name, ids_shm.name, output_shm.name, n_rows, len(names), start, end)
+            for start, end in shards
+        ]
+        with ProcessPoolExecutor(max_workers=min(workers, len(shards))) as pool:
+            list(pool.map(_shard_worker, tasks))
+
+        # Copy out before the shared block is released
+        output = np.ndarray((len(names), n_rows), dtype=np.float64, buffer=output_shm.buf).copy()
+        return {name: output[row] for row, name in enumerate(names)}
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
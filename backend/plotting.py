@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+FoodCast Plotting
+Analysis charts for a prediction run.
+
+Kept out of surplus_model.py so that matplotlib is only imported when a
+pipeline actually draws its charts.
+"""
+
+try:
+    import matplotlib.pyplot as plt
+    MATPLOTLIB_AVAILABLE = True
+except ImportError:
+    MATPLOTLIB_AVAILABLE = False
+
+
+def plot_predictions(predictions_df, sample_size=100, output_path='surplus_predictions_analysis.png'):
+    """
+    Create sample plots of predicted surplus.
+
+    Args:
+        predictions_df (pd.DataFrame): Predictions dataframe
+        sample_size (int): Number of samples to plot
+        output_path (str): Image file written
+    """
+    # Sample data for plotting
+    sample_df = predictions_df.head(sample_size)
+
+    # Create plots
+    plt.figure(figsize=(15, 10))
+
+    # Plot 1: Predicted surplus distribution
+    plt.subplot(2, 2, 1)
+    plt.hist(sample_df['predicted_surplus'], bins=20, alpha=0.7, color='skyblue')
+    plt.title('Distribution of Predicted Surplus')
+    plt.xlabel('Predicted Surplus')
+    plt.ylabel('Frequency')
+
+    # Plot 2: Brain diet vs regular items
+    plt.subplot(2, 2, 2)
+    brain_diet_surplus = sample_df[sample_df['brain_diet_flag_merged'] == True]['predicted_surplus']
+    regular_surplus = sample_df[sample_df['brain_diet_flag_merged'] == False]['predicted_surplus']
+
+    plt.hist([brain_diet_surplus, regular_surplus], bins=15, alpha=0.7,
+             label=['Brain Diet', 'Regular'], color=['green', 'orange'])
+    plt.title('Surplus by Item Type')
+    plt.xlabel('Predicted Surplus')
+    plt.ylabel('Frequency')
+    plt.legend()
+
+    # Plot 3: Top stores by predicted surplus
+    plt.subplot(2, 2, 3)
+    store_surplus = sample_df.groupby('store_id')['predicted_surplus'].sum().head(10)
+    store_surplus.plot(kind='bar', color='lightcoral')
+    plt.title('Top 10 Stores by Predicted Surplus')
+    plt.xlabel('Store ID')
+    plt.ylabel('Total Predicted Surplus')
+    plt.xticks(rotation=45)
+
+    # Plot 4: Surplus by category
+    plt.subplot(2, 2, 4)
+    # Note: This would need category information from the original data
+    plt.text(0.5, 0.5, 'Category analysis\nwould go here',
+             ha='center', va='center', transform=plt.gca().transAxes)
+    plt.title('Surplus by Category')
+
+    plt.tight_layout()
+    plt.savefig(output_path, dpi=300, bbox_inches='tight')
+    plt.show()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+FoodCast Prediction Cache
+Bounded LRU + TTL cache of /predict results.
+
+Dashboards and the prediction form send the same payloads over and over. The
+cache is keyed by a hash of the canonical request payload together with the
+model version, so a hit skips feature preparation and model.predict entirely.
+Entries expire after a TTL, the least recently used entry is evicted when the
+cache is full, and the whole cache is dropped when the model version or the
+feature history changes.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+
+def payload_key(payload, model_version, history_generation=0):
+    """
+    Content-addressed cache key for a prediction request.
+
+    Args:
+        payload (dict): Request record
+        model_version (str): Version of the model that scores it
+        history_generation (int): Sales-history generation the features are read
+            from, so a result scored before a history update is never served after it
+
+    Returns:
+        str: Hex digest identifying the (payload, model version, history) triple
+    """
+    canonical = dict(payload)
+    # Requests without a date are scored for today
+    if not canonical.get('date'):
+        canonical['date'] = datetime.now().strftime('%Y-%m-%d')
+    body = json.dumps(canonical, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(f"{model_version}\0{history_generation}\0{body}".encode('utf-8')).hexdigest()
+
+
+class PredictionCache:
+    """
+    Thread-safe LRU cache with per-entry expiry.
+    """
+
+    def __init__(self, max_entries=10000, ttl_seconds=300.0):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries (int): Maximum number of cached results (0 disables caching)
+            ttl_seconds (float): Lifetime of an entry in seconds (0 or less: no expiry)
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def get(self, key):
+        """
+        Return the cached value for ``key``, or None on a miss.
+
+        Args:
+            key (str): Cache key from payload_key()
+
+        Returns:
+            object: Cached value or None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """
+        Store a value, evicting the least recently used entries if full.
+
+        Args:
+            key (str): Cache key from payload_key()
+            value (object): Result to cache (must not be mutated afterwards)
+        """
+        if not self.enabled:
+            return
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds > 0 else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self, reason=None):
+        """
+        Drop every entry (model hot swap, new feature history).
+
+        Args:
+            reason (str): Why the cache was invalidated, for the log
+        """
+        with self._lock:
+            dropped = len(self._entries)
+            self._entries.clear()
+            self.invalidations += 1
+        if reason and dropped:
+            print(f"🧹 Prediction cache cleared ({dropped} entries): {reason}")
+
+    def stats(self):
+        """Cache counters for the stats endpoint."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+FoodCast Prediction Index
+Query engine over the predictions frame for predictions_api.
+
+Built once when predictions are loaded. Rows are ranked by predicted_surplus
+(highest first) and every index stores its row ids in that rank order:
+
+- a hash index per key column (store_id, product_id, category) mapping each
+  value to its rows,
+- the brain diet rows,
+- the surplus ranking itself, so ``predicted_surplus >= x`` is a prefix of
+  the ranking found with a binary search.
+
+A query walks the smallest matching row list in rank order, checks the other
+filters on the fly and stops after ``limit`` hits. Only the returned rows are
+materialized; the frame itself is never copied or re-sorted per request.
+"""
+
+import numpy as np
+import pandas as pd
+
+KEY_COLUMNS = ['store_id', 'product_id', 'category']
+
+# Rows checked per step when a query has to filter its driving row list
+SCAN_CHUNK = 4096
+
+
+class PredictionIndex:
+    """
+    Read-only indexes over a predictions DataFrame.
+    """
+
+    def __init__(self, df, table=None):
+        """
+        Build the indexes.
+
+        Args:
+            df (pd.DataFrame): Predictions with store_id, product_id,
+                brain_diet_flag and predicted_surplus columns
+            table (pyarrow.Table): Arrow table backing ``df``, used to materialize rows
+        """
+        self.df = df
+        self.table = table
+        self.size = len(df)
+
+        surplus = df['predicted_surplus'].to_numpy(dtype=np.float64, na_value=np.nan) if self.size else np.zeros(0)
+        # Highest surplus first; NaN predictions rank last as in sort_values
+        self.order = np.argsort(-surplus, kind='stable')
+        self.rank = np.empty(self.size, dtype=np.int64)
+        self.rank[self.order] = np.arange(self.size)
+        self.ranked_surplus = surplus[self.order]
+        self.surplus = surplus
+
+        self.codes = {}
+        self.keys = {}
+        self.postings = {}
+        for column in KEY_COLUMNS:
+            if column in df.columns:
+                missing = df[column].isna().to_numpy()
+                values = np.where(missing, None, df[column].astype(str).to_numpy(dtype=object))
+            else:
+                values = np.full(self.size, None, dtype=object)
+            # Missing keys get their own code so every row has one
+            codes, uniques = pd.factorize(values, use_na_sentinel=False)
+            self.codes[column] = codes
+            self.keys[column] = uniques
+            self.postings[column] = self._postings(codes, uniques)
+
+        if 'brain_diet_flag' in df.columns:
+            self.brain_diet = df['brain_diet_flag'].fillna(False).astype(bool).to_numpy()
+        else:
+            self.brain_diet = np.zeros(self.size, dtype=bool)
+        self.brain_diet_rows = self.order[self.brain_diet[self.order]]
+
+    def _postings(self, codes, uniques):
+        """Map each key to its row ids in surplus rank order."""
+        ranked_codes = codes[self.order]
+        by_code = np.argsort(ranked_codes, kind='stable')
+        bounds = np.searchsorted(ranked_codes[by_code], np.arange(len(uniques) + 1))
+        rows = self.order[by_code]
+        return {
+            key: rows[bounds[code]:bounds[code + 1]]
+            for code, key in enumerate(uniques)
+        }
+
+    def rows_for(self, column, value):
+        """Row ids with ``column == value``, highest surplus first."""
+        return self.postings[column].get(str(value), np.zeros(0, dtype=np.int64))
+
+    def surplus_cutoff(self, min_surplus):
+        """Number of top-ranked rows with predicted_surplus >= min_surplus."""
+        return int(np.searchsorted(-self.ranked_surplus, -min_surplus, side='right'))
+
+    def query(self, store_id=None, product_id=None, brain_diet_only=False, min_surplus=None, limit=None):
+        """
+        Row ids matching all filters, highest predicted surplus first.
+
+        Args:
+            store_id (str): Keep only this store
+            product_id (str): Keep only this product
+            brain_diet_only (bool): Keep only brain diet items
+            min_surplus (float): Keep rows with predicted_surplus >= min_surplus
+            limit (int): Maximum number of rows (None or 0 for all)
+
+        Returns:
+            np.ndarray: Matching row positions in the frame
+        """
+        cutoff = self.surplus_cutoff(min_surplus) if min_surplus is not None else self.size
+
+        # (candidate rows in rank order, per-row check) for every active filter
+        surplus_check = (lambda chunk: self.rank[chunk] < cutoff) if cutoff < self.size else None
+        filters = [(self.order[:cutoff], surplus_check)]
+        for column, value in (('store_id', store_id), ('product_id', product_id)):
+            if value is not None:
+                rows = self.rows_for(column, value)
+                code = self.codes[column][rows[0]] if len(rows) else -1
+                filters.append((rows, lambda chunk, codes=self.codes[column], code=code: codes[chunk] == code))
+        if brain_diet_only:
+            filters.append((self.brain_diet_rows, lambda chunk: self.brain_diet[chunk]))
+
+        # Walk the most selective list and check the remaining filters
+        driver = min(range(len(filters)), key=lambda i: len(filters[i][0]))
+        checks = [check for i, (_, check) in enumerate(filters) if i != driver and check is not None]
+        rows = filters[driver][0]
+        if not checks:
+            return rows[:limit] if limit else rows
+
+        matched = []
+        found = 0
+        for start in range(0, len(rows), SCAN_CHUNK):
+            chunk = rows[start:start + SCAN_CHUNK]
+            keep = np.ones(len(chunk), dtype=bool)
+            for check in checks:
+                keep &= check(chunk)
+            matched.append(chunk[keep])
+            found += int(keep.sum())
+            if limit and found >= limit:
+                break
+        rows = np.concatenate(matched) if matched else np.zeros(0, dtype=np.int64)
+        return rows[:limit] if limit else rows
+
+    def records(self, rows):
+        """Materialize rows as a list of dicts."""
+        if self.table is not None:
+            return self.table.take(rows).to_pylist()
+        return self.df.iloc[rows].to_dict('records')
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+FoodCast Prediction Rollups
+Aggregates and top-K lists materialized once per predictions snapshot.
+
+Built right after the PredictionIndex when predictions are loaded: global
+statistics plus per-store, per-category and per-brain-diet summaries with
+their highest-surplus predictions. The stats and summary endpoints look these
+tables up instead of scanning the frame on every call.
+"""
+
+import numpy as np
+
+TOP_K = 10
+
+
+class PredictionRollups:
+    """
+    Precomputed aggregate tables over one predictions snapshot.
+    """
+
+    def __init__(self, index, top_k=TOP_K):
+        """
+        Build the rollups.
+
+        Args:
+            index (PredictionIndex): Index over the predictions
+            top_k (int): Predictions kept per group
+        """
+        self.top_k = top_k
+        surplus = index.surplus
+        valid = ~np.isnan(surplus)
+
+        self.global_stats = {
+            'total_predictions': index.size,
+            'total_stores': len(index.postings['store_id']),
+            'total_products': len(index.postings['product_id']),
+            'total_categories': len(index.postings['category']),
+            'brain_diet_items': int(index.brain_diet.sum()),
+            'average_surplus': float(surplus[valid].mean()) if valid.any() else None,
+            'median_surplus': float(np.median(surplus[valid])) if valid.any() else None,
+            'max_surplus': float(surplus[valid].max()) if valid.any() else None,
+            'min_surplus': float(surplus[valid].min()) if valid.any() else None,
+            'total_surplus': float(surplus[valid].sum())
+        }
+
+        self.stores = self._group(index, 'store_id')
+        self.categories = self._group(index, 'category')
+
+        # Brain diet vs. other items, keyed like the query parameter
+        self.brain_diet = {}
+        for key, flag in (('true', True), ('false', False)):
+            rows = index.order[index.brain_diet[index.order] == flag]
+            n_valid = int(valid[rows].sum())
+            total = float(surplus[rows][valid[rows]].sum())
+            self.brain_diet[key] = self._summary(index, rows, n_valid, total, len(rows) if flag else 0)
+
+    def _group(self, index, column):
+        """Summaries for every value of a key column."""
+        codes = index.codes[column]
+        n_keys = len(index.keys[column])
+        surplus = index.surplus
+        valid = ~np.isnan(surplus)
+
+        # One pass per statistic over all groups
+        n_valid = np.bincount(codes, weights=valid, minlength=n_keys).astype(np.int64)
+        totals = np.bincount(codes, weights=np.where(valid, surplus, 0.0), minlength=n_keys)
+        brain_diet = np.bincount(codes, weights=index.brain_diet, minlength=n_keys).astype(np.int64)
+
+        groups = {}
+        for code, (key, rows) in enumerate(index.postings[column].items()):
+            # Missing keys cannot be requested by id
+            if not isinstance(key, str):
+                continue
+            groups[key] = self._summary(index, rows, int(n_valid[code]), float(totals[code]), int(brain_diet[code]))
+        return groups
+
+    def _summary(self, index, rows, n_valid, total, brain_diet_items):
+        """Summary of one group; ``rows`` are ranked highest surplus first."""
+        surplus = index.surplus
+        return {
+            'total_predictions': int(len(rows)),
+            'average_surplus': total / n_valid if n_valid else None,
+            'total_surplus': total,
+            # Ranked rows: NaN predictions come last
+            'max_surplus': float(surplus[rows[0]]) if n_valid else None,
+            'min_surplus': float(surplus[rows[n_valid - 1]]) if n_valid else None,
+            'brain_diet_items': brain_diet_items,
+            'top_predictions': index.records(rows[:self.top_k])
+        }
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+FoodCast Prediction Store
+Memory-mapped, hot-reloading predictions snapshot for predictions_api.
+
+The training pipeline writes predictions as an uncompressed Arrow IPC file
+(predicted_surplus.arrow) and atomically renames it into place. The store
+memory-maps that file and wraps it in a DataFrame backed directly by the Arrow
+buffers, so rows are held once, in the OS page cache, and every worker process
+serving the same file shares those pages.
+
+A watcher polls the file and, when it has been replaced, builds the next
+snapshot (frame + PredictionIndex + PredictionRollups) next to the current one and swaps it in with
+a single reference assignment. Requests hold on to the snapshot they started
+with; an old snapshot's mapping is released once its last request finishes.
+The JSON file is still accepted when no Arrow file exists.
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from prediction_index import PredictionIndex
+from prediction_rollups import PredictionRollups
+
+try:
+    import pyarrow as pa
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+
+class PredictionSnapshot:
+    """
+    One loaded predictions file with its query indexes and rollups.
+    """
+
+    def __init__(self, df, source, load_seconds=0.0, table=None):
+        self.df = df
+        self.index = PredictionIndex(df, table)
+        self.rollups = PredictionRollups(self.index)
+        self.source = source
+        self.loaded_at = datetime.now().isoformat()
+        self.load_seconds = load_seconds
+
+    def __len__(self):
+        return len(self.df)
+
+    def info(self):
+        """Summary of the snapshot for status endpoints."""
+        return {
+            'source': self.source,
+            'loaded_at': self.loaded_at,
+            'load_seconds': round(self.load_seconds, 4),
+            'total_predictions': len(self.df)
+        }
+
+
+def read_arrow_predictions(path):
+    """
+    Memory-map an Arrow IPC predictions file.
+
+    Args:
+        path (str): .arrow file written by prediction_writer
+
+    Returns:
+        tuple: (DataFrame whose columns reference the mapped Arrow buffers, the Arrow table)
+    """
+    with pa.memory_map(path, 'r') as source:
+        table = pa.ipc.open_file(source).read_all()
+    # ArrowDtype columns wrap the mapped buffers instead of copying them
+    return table.to_pandas(types_mapper=pd.ArrowDtype), table
+
+
+def read_json_predictions(path):
+    """
+    Load a JSON array predictions file.
+
+    Args:
+        path (str): predicted_surplus.json
+
+    Returns:
+        tuple: (Predictions frame, None)
+    """
+    with open(path, 'r') as f:
+        return pd.DataFrame(json.load(f)), None
+
+
+class PredictionStore:
+    """
+    Holds the active predictions snapshot and swaps in replaced files.
+    """
+
+    def __init__(self, path='predicted_surplus.arrow', fallback_path='predicted_surplus.json'):
+        """
+        Initialize the store.
+
+        Args:
+            path (str): Arrow IPC predictions file
+            fallback_path (str): JSON predictions file used when the Arrow file is missing
+        """
+        self.path = path
+        self.fallback_path = fallback_path
+
+        self.current = PredictionSnapshot(pd.DataFrame(), None)
+        self.reload_count = 0
+        self.last_error = None
+        self._signature = None
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._stop = threading.Event()
+
+    def _resolve(self):
+        """Return (path, reader) for the file to serve, or (None, None)."""
+        if PYARROW_AVAILABLE and os.path.exists(self.path):
+            return self.path, read_arrow_predictions
+        if self.fallback_path and os.path.exists(self.fallback_path):
+            return self.fallback_path, read_json_predictions
+        return None, None
+
+    def _signature_of(self):
+        """File identity that changes whenever a file is replaced."""
+        signature = []
+        for path in (self.path, self.fallback_path):
+            if path and os.path.exists(path):
+                stat = os.stat(path)
+                signature.append((stat.st_ino, stat.st_mtime_ns, stat.st_size))
+            else:
+                signature.append(None)
+        return tuple(signature)
+
+    def load(self):
+        """
+        Load the current predictions file and make it the active snapshot.
+
+        The next snapshot is fully built before the swap; on any error the
+        previous snapshot stays active.
+
+        Returns:
+            PredictionSnapshot: The active snapshot
+        """
+        with self._lock:
+            signature = self._signature_of()
+            path, reader = self._resolve()
+            started = time.perf_counter()
+            try:
+                df, table = reader(path) if path else (pd.DataFrame(), None)
+                snapshot = PredictionSnapshot(df, path, time.perf_counter() - started, table)
+            except Exception as e:
+                self.last_error = str(e)
+                raise
+
+            if self._signature is not None:
+                self.reload_count += 1
+            self.current = snapshot
+            self._signature = signature
+            self.last_error = None
+        return snapshot
+
+    def reload_if_changed(self):
+        """
+        Reload when a predictions file was replaced on disk.
+
+        Returns:
+            bool: True if a new snapshot was swapped in
+        """
+        if self._signature_of() == self._signature:
+            return False
+        try:
+            snapshot = self.load()
+            print(f"🔁 Predictions reloaded from {snapshot.source}: {len(snapshot)} rows")
+            return True
+        except Exception as e:
+            # Keep serving the current snapshot; retry on the next change
+            self._signature = self._signature_of()
+            print(f"⚠️  Predictions reload failed, keeping current snapshot: {e}")
+            return False
+
+    def start_watcher(self, interval=5.0):
+        """
+        Poll the predictions files in a daemon thread and hot-swap new ones.
+
+        Args:
+            interval (float): Seconds between checks
+        """
+        if self._watcher is not None:
+            return
+
+        def watch():
+            while not self._stop.wait(interval):
+                self.reload_if_changed()
+
+        self._watcher = threading.Thread(target=watch, name='prediction-store-watcher', daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self):
+        """Stop the background watcher."""
+        self._stop.set()
+        self._watcher = None
+
+    def stats(self):
+        """Store status for health endpoints."""
+        stats = self.current.info()
+        stats.update({
+            'reload_count': self.reload_count,
+            'last_error': self.last_error,
+            'watching': self._watcher is not None
+        })
+        return stats
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+FoodCast Prediction Writer
+Vectorized, chunked serialization of the predictions frame.
+
+Each chunk of predictions is converted to the dashboard record layout with
+column operations (priority level and impact score included), serialized with
+pandas' C JSON encoder or pyarrow, and appended to a temporary file that is
+renamed into place when complete. Memory use is bounded by the chunk size, and
+readers never see a half-written file.
+
+Formats:
+    json     compact JSON array
+    ndjson   one JSON object per line
+    parquet  compressed columnar file (requires pyarrow)
+    arrow    uncompressed Arrow IPC file that predictions_api memory-maps
+             (requires pyarrow)
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+OUTPUT_FORMATS = ['json', 'ndjson', 'parquet', 'arrow']
+
+# Output record layout, in order
+OUTPUT_COLUMNS = [
+    'store_id', 'product_id', 'product_name', 'category', 'predicted_surplus',
+    'estimated_meals', 'urgency_score', 'nutritional_value', 'confidence',
+    'shelf_life_days', 'expiry_date', 'price', 'brain_diet_flag', 'store_lat',
+    'store_lon', 'date', 'priority_level', 'impact_score'
+]
+
+
+def priority_levels(urgency_score):
+    """Vectorized FoodSurplusPredictor.get_priority_level."""
+    urgency_score = np.asarray(urgency_score)
+    return np.select(
+        [urgency_score >= 15, urgency_score >= 10, urgency_score >= 7],
+        ['Critical', 'High', 'Medium'],
+        default='Low'
+    )
+
+
+def impact_scores(surplus, nutritional_value):
+    """Vectorized FoodSurplusPredictor.get_impact_score."""
+    # Higher surplus + higher nutrition = greater impact
+    impact = np.asarray(surplus, dtype=np.float64) * 0.1 + np.asarray(nutritional_value, dtype=np.float64) * 2
+    return np.round(impact, 1)
+
+
+def _date_text(series):
+    """YYYY-MM-DD strings with missing dates as None."""
+    series = pd.to_datetime(series)
+    return series.dt.strftime('%Y-%m-%d').astype(object).where(series.notna(), None)
+
+
+def format_predictions(chunk):
+    """
+    Convert a chunk of generate_predictions() output to the record layout.
+
+    Args:
+        chunk (pd.DataFrame): Predictions rows
+
+    Returns:
+        pd.DataFrame: Output columns in OUTPUT_COLUMNS order
+    """
+    return pd.DataFrame({
+        'store_id': chunk['store_id'].astype(str),
+        'product_id': chunk['product_id'].astype(str),
+        'product_name': chunk['product_name'].astype(object),
+        'category': chunk['category'].astype(object),
+        'predicted_surplus': chunk['predicted_surplus'].astype(np.float64).round(2),
+        'estimated_meals': chunk['estimated_meals'].astype(np.int64),
+        'urgency_score': chunk['urgency_score'].astype(np.int64),
+        'nutritional_value': chunk['nutritional_value'].astype(np.int64),
+        'confidence': chunk['confidence'],
+        'shelf_life_days': chunk['shelf_life_days'].astype(np.int64),
+        'expiry_date': _date_text(chunk['expiry_date']),
+        'price': chunk['price'].astype(np.float64).round(2),
+        'brain_diet_flag': chunk['brain_diet_flag_merged'].fillna(False).astype(bool),
+        # float32 coordinates, written at ~1 m resolution
+        'store_lat': chunk['store_lat'].astype(np.float64).round(5),
+        'store_lon': chunk['store_lon'].astype(np.float64).round(5),
+        'date': _date_text(chunk['date']),
+        'priority_level': priority_levels(chunk['urgency_score']),
+        'impact_score': impact_scores(chunk['predicted_surplus'], chunk['nutritional_value'])
+    }, index=chunk.index)[OUTPUT_COLUMNS]
+
+
+def infer_format(filename):
+    """Pick the output format from a file extension (defaults to json)."""
+    extension = os.path.splitext(filename)[1].lower()
+    if extension in ('.ndjson', '.jsonl'):
+        return 'ndjson'
+    if extension == '.parquet':
+        return 'parquet'
+    if extension in ('.arrow', '.feather'):
+        return 'arrow'
+    return 'json'
+
+
+def _arrow_schema():
+    text = pa.string()
+    return pa.schema([
+        ('store_id', text), ('product_id', text), ('product_name', text), ('category', text),
+        ('predicted_surplus', pa.float64()), ('estimated_meals', pa.int64()),
+        ('urgency_score', pa.int64()), ('nutritional_value', pa.int64()), ('confidence', text),
+        ('shelf_life_days', pa.int64()), ('expiry_date', text), ('price', pa.float64()),
+        ('brain_diet_flag', pa.bool_()), ('store_lat', pa.float64()), ('store_lon', pa.float64()), ('date', text),
+        ('priority_level', text), ('impact_score', pa.float64())
+    ])
+
+
+def write_predictions(predictions_df, filename, output_format=None, chunk_size=50000):
+    """
+    Stream predictions to disk chunk by chunk.
+
+    Args:
+        predictions_df (pd.DataFrame): Output of generate_predictions()
+        filename (str): Destination file
+        output_format (str): 'json', 'ndjson', 'parquet' or 'arrow' (inferred from filename if None)
+        chunk_size (int): Rows serialized at a time
+
+    Returns:
+        int: Number of records written
+    """
+    frames = (
+        predictions_df.iloc[start:start + chunk_size]
+        for start in range(0, len(predictions_df), chunk_size)
+    )
+    return write_prediction_frames(frames, filename, output_format)
+
+
+def write_prediction_frames(frames, filename, output_format=None):
+    """
+    Write a stream of prediction frames to one file without holding them all.
+
+    Args:
+        frames (iterable): DataFrames in generate_predictions() layout
+        filename (str): Destination file
+        output_format (str): 'json', 'ndjson', 'parquet' or 'arrow' (inferred from filename if None)
+
+    Returns:
+        int: Number of records written
+    """
+    output_format = output_format or infer_format(filename)
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format {output_format!r}, expected one of {OUTPUT_FORMATS}")
+    if output_format in ('parquet', 'arrow') and not PYARROW_AVAILABLE:
+        raise ImportError(f"{output_format} output requires pyarrow: pip install pyarrow")
+
+    tmp_path = f"{filename}.tmp-{os.getpid()}"
+    count = 0
+
+    def formatted():
+        nonlocal count
+        for frame in frames:
+            count += len(frame)
+            yield format_predictions(frame)
+
+    chunks = formatted()
+
+    try:
+        if output_format == 'parquet':
+            schema = _arrow_schema()
+            with pq.ParquetWriter(tmp_path, schema) as writer:
+                for chunk in chunks:
+                    writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+        elif output_format == 'arrow':
+            schema = _arrow_schema()
+            # Uncompressed IPC file format so readers can memory-map it
+            with pa.OSFile(tmp_path, 'wb') as sink, pa.ipc.new_file(sink, schema) as writer:
+                for chunk in chunks:
+                    writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+        else:
+            with open(tmp_path, 'w') as f:
+                if output_format == 'json':
+                    f.write('[')
+                first = True
+                for chunk in chunks:
+                    if output_format == 'ndjson':
+                        # Each line ends with a newline, so chunks concatenate as is
+                        f.write(chunk.to_json(orient='records', lines=True))
+                    else:
+                        body = chunk.to_json(orient='records')[1:-1]
+                        if body:
+                            f.write(body if first else ',' + body)
+                            first = False
+                if output_format == 'json':
+                    f.write(']')
+        os.replace(tmp_path, filename)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return count
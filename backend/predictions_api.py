@@ -4,26 +4,43 @@ Simple API server to serve food surplus predictions to the frontend.
 This can be integrated with your Express.js backend or run as a standalone service.
 """
 
-import json
-import pandas as pd
 from flask import Flask, jsonify, request
 from flask_cors import CORS
 import os
+from model_registry import ModelRegistry, ModelNotFoundError
+from prediction_store import PredictionStore
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend integration
 
-# Load predictions data
-def load_predictions():
-    """Load predictions from the JSON file."""
-    try:
-        with open('predicted_surplus.json', 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return []
+# Memory-mapped predictions snapshot with query indexes; replaced files are
+# swapped in by a watcher, and each request works on the snapshot it started with
+store = PredictionStore(
+    path=os.environ.get('PREDICTIONS_PATH', 'predicted_surplus.arrow'),
+    fallback_path=os.environ.get('PREDICTIONS_JSON_PATH', 'predicted_surplus.json')
+)
+store.load()
+
+# Accuracy is reported from the metrics stored with the latest model version
+registry = ModelRegistry()
 
-predictions_data = load_predictions()
-df = pd.DataFrame(predictions_data)
+def get_model_accuracy():
+    """Held-out and cross-validated accuracy of the latest model version (None if unavailable)."""
+    try:
+        metrics = registry.read_metrics()
+    except ModelNotFoundError:
+        return None
+    
+    def rounded(name, digits):
+        value = metrics.get(name)
+        return None if value is None else round(float(value), digits)
+    
+    return {
+        'r2_score': rounded('r2_score', 4),
+        'mae': rounded('mae', 2),
+        'cv_r2_mean': rounded('cv_mean', 4),
+        'cv_r2_std': rounded('cv_std', 4)
+    }
 
 @app.route('/api/predictions', methods=['GET'])
 def get_predictions():
@@ -35,31 +52,19 @@ def get_predictions():
         brain_diet_only = request.args.get('brain_diet_only', 'false').lower() == 'true'
         min_surplus = request.args.get('min_surplus', type=float)
         limit = request.args.get('limit', type=int, default=100)
+        index = store.current.index
         
-        # Filter data
-        filtered_df = df.copy()
-        
-        if store_id:
-            filtered_df = filtered_df[filtered_df['store_id'] == store_id]
-        
-        if product_id:
-            filtered_df = filtered_df[filtered_df['product_id'] == product_id]
-        
-        if brain_diet_only:
-            filtered_df = filtered_df[filtered_df['brain_diet_flag'] == True]
-        
-        if min_surplus:
-            filtered_df = filtered_df[filtered_df['predicted_surplus'] >= min_surplus]
-        
-        # Sort by predicted surplus (highest first)
-        filtered_df = filtered_df.sort_values('predicted_surplus', ascending=False)
-        
-        # Limit results
-        if limit:
-            filtered_df = filtered_df.head(limit)
+        # Filter through the indexes, highest predicted surplus first, up to limit rows
+        rows = index.query(
+            store_id=store_id or None,
+            product_id=product_id or None,
+            brain_diet_only=brain_diet_only,
+            min_surplus=min_surplus or None,
+            limit=limit
+        )
         
         # Convert to list of dictionaries
-        results = filtered_df.to_dict('records')
+        results = index.records(rows)
         
         return jsonify({
             'success': True,
@@ -84,21 +89,13 @@ def get_predictions():
 def get_prediction_stats():
     """Get statistics about the predictions."""
     try:
+        # Global aggregates are precomputed when the snapshot is loaded
+        rollups = store.current.rollups
         stats = {
-            'total_predictions': len(df),
-            'total_stores': df['store_id'].nunique(),
-            'total_products': df['product_id'].nunique(),
-            'brain_diet_items': df['brain_diet_flag'].sum(),
-            'average_surplus': float(df['predicted_surplus'].mean()),
-            'median_surplus': float(df['predicted_surplus'].median()),
-            'max_surplus': float(df['predicted_surplus'].max()),
-            'min_surplus': float(df['predicted_surplus'].min()),
-            'model_accuracy': {
-                'r2_score': 0.5937,
-                'mae': 33.78,
-                'cv_r2_mean': 0.5980,
-                'cv_r2_std': 0.0074
-            }
+            **rollups.global_stats,
+            'brain_diet': {key: {name: value for name, value in summary.items() if name != 'top_predictions'}
+                           for key, summary in rollups.brain_diet.items()},
+            'model_accuracy': get_model_accuracy()
         }
         
         return jsonify({
@@ -116,26 +113,23 @@ def get_prediction_stats():
 def get_store_predictions(store_id):
     """Get predictions for a specific store."""
     try:
-        store_df = df[df['store_id'] == store_id]
+        summary = store.current.rollups.stores.get(str(store_id))
         
-        if store_df.empty:
+        if summary is None:
             return jsonify({
                 'success': False,
                 'error': f'Store {store_id} not found'
             }), 404
         
-        # Get top predictions for this store
-        top_predictions = store_df.nlargest(10, 'predicted_surplus')
-        
         return jsonify({
             'success': True,
             'store_id': store_id,
-            'total_predictions': len(store_df),
-            'top_predictions': top_predictions.to_dict('records'),
+            'total_predictions': summary['total_predictions'],
+            'top_predictions': summary['top_predictions'],
             'store_stats': {
-                'average_surplus': float(store_df['predicted_surplus'].mean()),
-                'total_surplus': float(store_df['predicted_surplus'].sum()),
-                'brain_diet_items': int(store_df['brain_diet_flag'].sum())
+                'average_surplus': summary['average_surplus'],
+                'total_surplus': summary['total_surplus'],
+                'brain_diet_items': summary['brain_diet_items']
             }
         })
     
@@ -145,6 +139,33 @@ def get_store_predictions(store_id):
             'error': str(e)
         }), 500
 
+@app.route('/api/predictions/categories', methods=['GET'])
+def get_category_predictions():
+    """Get per-category surplus summaries with their top predictions."""
+    try:
+        categories = store.current.rollups.categories
+        category = request.args.get('category')
+        
+        if category is not None:
+            if category not in categories:
+                return jsonify({
+                    'success': False,
+                    'error': f'Category {category} not found'
+                }), 404
+            categories = {category: categories[category]}
+        
+        return jsonify({
+            'success': True,
+            'count': len(categories),
+            'categories': categories
+        })
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @app.route('/api/predictions/recipients', methods=['GET'])
 def get_recipient_predictions():
     """Get predictions suitable for recipients (high surplus, brain diet items)."""
@@ -153,21 +174,14 @@ def get_recipient_predictions():
         min_surplus = request.args.get('min_surplus', type=float, default=50.0)
         brain_diet_only = request.args.get('brain_diet_only', 'false').lower() == 'true'
         
-        filtered_df = df[df['predicted_surplus'] >= min_surplus]
-        
-        if brain_diet_only:
-            filtered_df = filtered_df[filtered_df['brain_diet_flag'] == True]
-        
-        # Sort by predicted surplus
-        filtered_df = filtered_df.sort_values('predicted_surplus', ascending=False)
-        
-        # Limit to top 50
-        filtered_df = filtered_df.head(50)
+        # Top 50 by predicted surplus
+        index = store.current.index
+        rows = index.query(brain_diet_only=brain_diet_only, min_surplus=min_surplus, limit=50)
         
         return jsonify({
             'success': True,
-            'count': len(filtered_df),
-            'predictions': filtered_df.to_dict('records'),
+            'count': len(rows),
+            'predictions': index.records(rows),
             'filters': {
                 'min_surplus': min_surplus,
                 'brain_diet_only': brain_diet_only
@@ -183,19 +197,22 @@ def get_recipient_predictions():
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint."""
+    snapshot = store.current
     return jsonify({
         'status': 'healthy',
-        'predictions_loaded': len(predictions_data) > 0,
-        'total_predictions': len(predictions_data)
+        'predictions_loaded': len(snapshot) > 0,
+        'total_predictions': len(snapshot),
+        'predictions_store': store.stats()
     })
 
 if __name__ == '__main__':
     print("🚀 Starting FoodCast Predictions API Server...")
-    print(f"📊 Loaded {len(predictions_data)} predictions")
+    print(f"📊 Loaded {len(store.current)} predictions from {store.current.source}")
     print("🌐 API Endpoints:")
     print("  GET /api/predictions - Get all predictions with filtering")
     print("  GET /api/predictions/stats - Get prediction statistics")
     print("  GET /api/predictions/stores/<store_id> - Get store-specific predictions")
+    print("  GET /api/predictions/categories - Get per-category summaries")
     print("  GET /api/predictions/recipients - Get recipient-suitable predictions")
     print("  GET /health - Health check")
     print("\n🔗 Example URLs:")
@@ -203,4 +220,8 @@ if __name__ == '__main__':
     print("  http://localhost:5000/api/predictions/recipients?min_surplus=100")
     print("  http://localhost:5000/api/predictions/stats")
     
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    # Pick up new nightly prediction files without a restart
+    store.start_watcher(interval=float(os.environ.get('PREDICTIONS_RELOAD_INTERVAL', 5)))
+    
+    # The reloader would start a second process with its own store
+    app.run(debug=True, use_reloader=False, host='0.0.0.0', port=5000)
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+FoodCast Data Schema
+Explicit, compact column types for the input CSVs.
+
+Every input file is read with a fixed dtype per column: repeated text
+(identifiers, names, categories) becomes pandas categoricals, counts become
+int16/int32, prices and percentages become float32 and flags become bools.
+Categorical key columns shared by two frames are given the same sorted
+category list before merging. Merges and groupbys then compare integer codes
+instead of hashing strings, and sorting by the codes matches sorting by the
+text.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Marker for columns parsed as datetime64
+DATE = 'date'
+
+SURPLUS_SCHEMA = {
+    'store_id': 'category',
+    'product_id': 'category',
+    'product_name': 'category',
+    'category': 'category',
+    'brain_diet_flag': 'bool',
+    'shelf_life_days': 'int16',
+    'daily_sales': 'int32',
+    'starting_inventory': 'int32',
+    'end_inventory': 'int32',
+    'wasted_units': 'int32',
+    'waste_percentage': 'float32',
+    'date': DATE,
+    'store_location': 'category'
+}
+
+SALES_SCHEMA = {
+    'store_id': 'category',
+    'product_id': 'category',
+    'day': 'int16',
+    'daily_sales': 'int32',
+    'stock_level': 'int32',
+    'price': 'float32',
+    'promotion_flag': 'bool'
+}
+
+BRAIN_DIET_SCHEMA = {
+    'clean_name': 'str',
+    'fdc_id': 'str',
+    'food_description': 'str',
+    'category_description': 'category',
+    'category_simple': 'category',
+    'brain_diet_flag': 'bool',
+    'default_weight_unit': 'category',
+    'shelf_life_days': 'int16',
+    'publication_date': DATE
+}
+
+RECIPIENT_SCHEMA = {
+    'recipient_id': 'int32',
+    'name': 'str',
+    'type': 'category',
+    'preferred_food_category': 'category',
+    'max_daily_quantity': 'int32',
+    'zip_code': 'int32',
+    'latitude': 'float64',
+    'longitude': 'float64'
+}
+
+
+def read_table(path, schema, chunksize=None):
+    """
+    Read a CSV with the column types of a schema.
+
+    Args:
+        path (str): CSV file
+        schema (dict): Column name -> dtype (or DATE)
+        chunksize (int): Rows per chunk; returns an iterator of frames when set
+
+    Returns:
+        pd.DataFrame: Typed frame (or an iterator of typed chunks)
+    """
+    dates = [column for column, dtype in schema.items() if dtype == DATE]
+    dtypes = {column: dtype for column, dtype in schema.items() if dtype != DATE}
+    return pd.read_csv(path, dtype=dtypes, parse_dates=dates or False, chunksize=chunksize)
+
+
+def strip_prefix(series, prefix):
+    """
+    Remove a prefix from every category of a categorical column.
+
+    Only the category labels are rewritten, not the rows.
+
+    Args:
+        series (pd.Series): Categorical column
+        prefix (str): Prefix such as 'store_'
+
+    Returns:
+        pd.Series: Categorical column with renamed categories
+    """
+    return series.cat.rename_categories(lambda label: label.removeprefix(prefix))
+
+
+def unify_categories(frames, columns):
+    """
+    Give categorical columns the same sorted categories in every frame.
+
+    Merging on columns with identical categories joins on the integer codes.
+
+    Args:
+        frames (list): DataFrames holding the columns (modified in place)
+        columns (list): Categorical column names
+    """
+    for column in columns:
+        labels = set()
+        for frame in frames:
+            labels.update(frame[column].cat.categories)
+        dtype = pd.CategoricalDtype(sorted(labels))
+        for frame in frames:
+            frame[column] = frame[column].cat.set_categories(dtype.categories)
+
+
+def map_categories(series, mapping, default):
+    """
+    Look up a categorical column in a dict once per category instead of per row.
+
+    Args:
+        series (pd.Series): Categorical column
+        mapping (dict): Category label -> value
+        default: Value for missing rows and labels absent from ``mapping``
+
+    Returns:
+        np.ndarray: Mapped value per row
+    """
+    lookup = [mapping.get(label, default) for label in series.cat.categories]
+    # Missing rows have code -1, which picks the trailing default
+    values = np.array(lookup + [default], dtype=object)
+    return values[series.cat.codes.to_numpy()]
+
+
+def frame_memory_mb(df):
+    """Deep memory usage of a frame in megabytes."""
+    return df.memory_usage(deep=True).sum() / 2 ** 20
+
+
+def concat_frames(frames):
+    """
+    Concatenate frames, keeping categorical columns categorical.
+
+    pd.concat falls back to object columns when the categories differ, so the
+    categories are unified first.
+
+    Args:
+        frames (list): DataFrames with the same columns (modified in place)
+
+    Returns:
+        pd.DataFrame: Concatenated frame with a fresh index
+    """
+    frames = list(frames)
+    categorical = [column for column in frames[0].columns
+                   if isinstance(frames[0][column].dtype, pd.CategoricalDtype)]
+    if len(frames) > 1:
+        unify_categories(frames, categorical)
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+FoodCast Serving Runtime
+Bounded scoring pool and the production WSGI server for model_server.py.
+
+HTTP connections are handled by waitress, a multi-threaded WSGI server
+(listed in requirements.txt; serve() refuses to start without it rather
+than quietly falling back to a development server). CPU work for a prediction
+(feature building and tree evaluation) does not run on the connection
+thread directly but in a ScoringPool:
+
+    - a fixed number of scoring threads bounds CPU concurrency
+    - at most ``max_queue`` further requests wait for a thread; beyond that
+      requests are rejected at once with 503 and Retry-After (backpressure)
+      instead of queueing without limit
+    - a request that waits and runs longer than ``timeout`` seconds is
+      answered with 504
+
+serve() can also fork several worker processes onto one listening socket to
+use more than one core. Each maps the same model bundle (model_bundle.py),
+so the node arrays are in memory once.
+"""
+
+import os
+import signal
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+try:
+    import waitress
+    WAITRESS_AVAILABLE = True
+except ImportError:
+    WAITRESS_AVAILABLE = False
+
+
+class ServingError(Exception):
+    """A request the server declines to score; carries the HTTP status."""
+
+    status = 503
+    retry_after = None
+
+
+class Overloaded(ServingError):
+    """The scoring queue is full."""
+
+    status = 503
+    retry_after = 1
+
+
+class ScoringTimeout(ServingError):
+    """Scoring did not finish within the request timeout."""
+
+    status = 504
+
+
+class ScoringPool:
+    """
+    Fixed-size thread pool with a bounded queue and per-call timeouts.
+    """
+
+    def __init__(self, workers=None, max_queue=256, timeout=10.0):
+        """
+        Initialize the pool.
+
+        Args:
+            workers (int): Scoring threads (None = one per CPU, at most 8)
+            max_queue (int): Requests allowed to wait for a scoring thread
+            timeout (float): Seconds a request may wait and run in total
+        """
+        self.workers = workers or min(8, os.cpu_count() or 1)
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='scoring')
+        self._slots = threading.BoundedSemaphore(self.workers + max_queue)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def _release(self, future):
+        with self._lock:
+            self.in_flight -= 1
+            if not future.cancelled():
+                self.completed += 1
+        self._slots.release()
+
+    def run(self, fn, *args, timeout=None):
+        """
+        Run ``fn(*args)`` on a scoring thread and wait for its result.
+
+        Args:
+            fn (callable): CPU-bound scoring function
+            *args: Its arguments
+            timeout (float): Override of the pool's timeout
+
+        Returns:
+            The function's return value
+
+        Raises:
+            Overloaded: When ``workers + max_queue`` calls are already in flight
+            ScoringTimeout: When the result is not ready in time
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise Overloaded(f"Scoring queue full ({self.workers} workers, {self.max_queue} queued)")
+
+        with self._lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            with self._lock:
+                self.in_flight -= 1
+            self._slots.release()
+            raise
+        future.add_done_callback(self._release)
+
+        try:
+            return future.result(timeout=self.timeout if timeout is None else timeout)
+        except FutureTimeout:
+            # Drop it if it never started; a running call finishes in the background
+            future.cancel()
+            with self._lock:
+                self.timed_out += 1
+            raise ScoringTimeout(f"Scoring exceeded {self.timeout if timeout is None else timeout:g} s")
+
+    def stats(self):
+        """Pool counters for status endpoints."""
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'timeout_seconds': self.timeout,
+                'in_flight': self.in_flight,
+                'peak_in_flight': self.peak_in_flight,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out
+            }
+
+    def shutdown(self):
+        """Stop accepting work and wait for running calls."""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _serve_socket(app, sock, threads, connection_limit):
+    """Serve ``app`` on an already listening socket until interrupted."""
+    waitress.serve(app, sockets=[sock], threads=threads,
+                   connection_limit=connection_limit, ident='FoodCast')
+
+
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def serve(app, host='0.0.0.0', port=5001, threads=32, processes=1, connection_limit=1000,
+          backlog=1024, on_start=None):
+    """
+    Run ``app`` on a production WSGI server until interrupted.
+
+    With ``processes`` > 1 the listening socket is opened once and that many
+    worker processes are forked to accept on it (POSIX only). Each worker has
+    its own scoring pool, prediction cache and feature index; model bundles
+    are memory-mapped, so the trees are shared.
+
+    Args:
+        app: WSGI application
+        host (str): Bind address
+        port (int): Bind port
+        threads (int): Connection-handling threads per process (waitress)
+        processes (int): Worker processes
+        connection_limit (int): Open connections accepted at once per process (waitress)
+        backlog (int): Listen backlog for connections not yet accepted
+        on_start (callable): Run in every worker before it serves (start
+            background threads here; threads do not survive fork)
+
+    Raises:
+        RuntimeError: If waitress is not installed
+    """
+    if not WAITRESS_AVAILABLE:
+        raise RuntimeError("Production serving needs waitress; install it with "
+                           "pip install -r requirements.txt (or pip install waitress)")
+    if processes > 1 and not hasattr(os, 'fork'):
+        print("⚠️  Multiple worker processes need fork(); serving from one process")
+        processes = 1
+
+    sock = socket.create_server((host, port), backlog=backlog)
+    print(f"🚦 Serving with waitress on {host}:{port} "
+          f"({processes} process{'es' if processes > 1 else ''}, {threads} threads each)")
+
+    signal.signal(signal.SIGTERM, _interrupt)
+    if processes == 1:
+        if on_start:
+            on_start()
+        try:
+            _serve_socket(app, sock, threads, connection_limit)
+        finally:
+            sock.close()
+        return
+
+    children = []
+    for _ in range(processes):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                if on_start:
+                    on_start()
+                _serve_socket(app, sock, threads, connection_limit)
+            except KeyboardInterrupt:
+                pass
+            finally:
+                os._exit(0)
+        children.append(pid)
+
+    try:
+        for pid in children:
+            os.waitpid(pid, 0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        sock.close()
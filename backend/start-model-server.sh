@@ -33,6 +33,17 @@ if [ -f "requirements.txt" ]; then
     fi
 fi
 
+# Train and publish a model version offline if none exists yet
+# (the server never trains on the request path)
+if [ ! -f "models/LATEST" ]; then
+    echo "🔄 No published model found. Training one now..."
+    python3 surplus_model.py
+    if [ $? -ne 0 ]; then
+        echo "❌ Model training failed."
+        exit 1
+    fi
+fi
+
 # Start the model server
 echo "🤖 Starting AI model server on port 5001..."
 python3 model_server.py
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+FoodCast Startup Profile
+Import and initialization timings for a cold server start.
+
+While track_imports() is active, every first-time import is timed and charged
+to the top-level package that was asked for. Imports nested inside it count
+toward the outer one, so the report reads as "what importing X cost this
+process". Initialization steps such as loading the model are timed with
+stage(). For a full per-module tree use ``python -X importtime``.
+"""
+
+import builtins
+import sys
+import time
+from contextlib import contextmanager
+
+
+class StartupProfile:
+    """
+    Wall-clock cost of each import and startup stage, in milliseconds.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.ready = None
+        self.imports = {}
+        self.stages = {}
+        self._depth = 0
+        self._original_import = None
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        # Relative, nested and already-loaded imports are not timed separately
+        if self._depth or level or name in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+        self._depth += 1
+        started = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            self._depth -= 1
+            root = name.partition('.')[0]
+            self.imports[root] = self.imports.get(root, 0.0) + (time.perf_counter() - started) * 1000
+
+    @contextmanager
+    def track_imports(self):
+        """Time the imports executed inside the block."""
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._import
+        try:
+            yield self
+        finally:
+            builtins.__import__ = self._original_import
+
+    @contextmanager
+    def stage(self, name):
+        """Time a named initialization step."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + (time.perf_counter() - started) * 1000
+
+    def mark_ready(self):
+        """Stop the startup clock (the process is ready to serve)."""
+        self.ready = time.perf_counter()
+
+    def report(self):
+        """
+        Timings collected so far.
+
+        Returns:
+            dict: imports_ms and stages_ms (slowest first) and the total until
+            mark_ready() (or until now)
+        """
+        def ranked(timings):
+            return {name: round(ms, 2) for name, ms in sorted(timings.items(), key=lambda item: -item[1])}
+
+        return {
+            'imports_ms': ranked(self.imports),
+            'stages_ms': ranked(self.stages),
+            'total_ms': round(((self.ready or time.perf_counter()) - self.started) * 1000, 2)
+        }
+
+    def summary(self, top=8):
+        """
+        Printable startup report.
+
+        Args:
+            top (int): Number of slowest imports listed
+
+        Returns:
+            str: Multi-line report
+        """
+        report = self.report()
+        lines = [f"⏱️  Startup took {report['total_ms']:.0f} ms "
+                 f"(imports {sum(self.imports.values()):.0f} ms)"]
+        for name, ms in list(report['imports_ms'].items())[:top]:
+            lines.append(f"   import {name:<22} {ms:8.1f} ms")
+        for name, ms in report['stages_ms'].items():
+            lines.append(f"   {name:<29} {ms:8.1f} ms")
+        return "\n".join(lines)
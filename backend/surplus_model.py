@@ -14,25 +14,15 @@ Date: 2024
 try:
     import pandas as pd
     import numpy as np
+    import argparse
     import json
+    import os
     import warnings
     from datetime import datetime, timedelta
-    from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
-    from sklearn.model_selection import train_test_split, TimeSeriesSplit
+    from sklearn.model_selection import TimeSeriesSplit
     from sklearn.metrics import r2_score, mean_absolute_error
-    from sklearn.preprocessing import LabelEncoder, StandardScaler
     from sklearn.feature_selection import SelectKBest, f_regression
-    import matplotlib.pyplot as plt
-    import seaborn as sns
-    
-    # Try to import Prophet, fall back to seasonal decomposition if not available
-    try:
-        from prophet import Prophet
-        PROPHET_AVAILABLE = True
-    except ImportError:
-        from statsmodels.tsa.seasonal import seasonal_decompose
-        PROPHET_AVAILABLE = False
-        print("⚠️  Prophet not available, using seasonal decomposition instead")
+    # Plotting (matplotlib) is imported lazily by plot_predictions
     
     # Suppress warnings for cleaner output
     warnings.filterwarnings('ignore')
@@ -44,6 +34,23 @@ except ImportError as e:
     print(f"   Missing: {e}")
     DEPENDENCIES_AVAILABLE = False
 
+# Local modules are imported outside the guard above, so a broken one raises
+# instead of being reported as a missing package
+if DEPENDENCIES_AVAILABLE:
+    from feature_engine import SeriesLayout
+    from parallel_features import parallel_series_features
+    from parallel_training import cross_validate_and_fit
+    from model_backends import MODEL_BACKENDS, make_estimator, feature_importance
+    from feature_store import FeatureStore, inputs_hash
+    from incremental_features import IncrementalFeatureState
+    from model_registry import save_model_artifact
+    from prediction_writer import PYARROW_AVAILABLE, write_predictions
+    from geo import RecipientIndex, parse_store_location
+    from schema import (SURPLUS_SCHEMA, SALES_SCHEMA, BRAIN_DIET_SCHEMA, RECIPIENT_SCHEMA,
+                        read_table, strip_prefix, unify_categories, map_categories, frame_memory_mb)
+    from allocation import allocate_surplus
+    from chunked_pipeline import OutOfCorePipeline
+
 class FoodSurplusPredictor:
     """
     Main class for predicting food surplus using historical sales data.
@@ -52,18 +59,43 @@ class FoodSurplusPredictor:
     and prediction generation for the FoodCast platform.
     """
     
-    def __init__(self, data_path="../data/"):
+    def __init__(self, data_path="../data/", join_mode='key', asof_tolerance_days=None,
+                 feature_store_path="feature_store/", feature_store_format='arrow', feature_workers=1,
+                 training_workers=-1, model_backend='gbr'):
         """
         Initialize the predictor with data path.
         
         Args:
             data_path (str): Path to the data directory containing CSV files
+            join_mode (str): How surplus rows are aligned with sales days
+                ('key', 'date' or 'asof', see merge_datasets)
+            asof_tolerance_days (int): Maximum gap for 'asof' joins (None = unbounded)
+            feature_store_path (str): Directory of the engineered feature cache
+                (None disables caching)
+            feature_store_format (str): 'arrow' (memory-mapped IPC) or 'parquet'
+            feature_workers (int): Processes computing series features, sharded
+                by store (1 = in process, None or 0 = one per CPU)
+            training_workers (int): Concurrent CV/final fits (-1 = one per CPU, 1 = sequential)
+            model_backend (str): 'gbr' (exact gradient boosting) or 'hist'
+                (histogram-binned, multi-threaded, early stopping); see model_backends.py
         """
         self.data_path = data_path
+        self.join_mode = join_mode
+        self.asof_tolerance_days = asof_tolerance_days
+        self.merge_stats = {}
+        self.feature_workers = feature_workers
+        self.training_workers = training_workers
+        self.model_backend = model_backend
+        self.feature_store = (
+            FeatureStore(feature_store_path, feature_store_format)
+            if feature_store_path and FeatureStore.available() else None
+        )
         self.model = None
         self.feature_columns = []
         self.label_encoders = {}
         self.predictions = None
+        # Merged history of the last feature build (None when it came from the feature store)
+        self.history_df = None
         
     def load_and_clean_data(self):
         """
@@ -74,71 +106,159 @@ class FoodSurplusPredictor:
         """
         print("🔄 Loading and cleaning data...")
         
-        # Load surplus data
-        surplus_df = pd.read_csv(f"{self.data_path}mock_food_surplus_data.csv")
+        # Load surplus data (compact dtypes, see schema.py)
+        surplus_df = read_table(f"{self.data_path}mock_food_surplus_data.csv", SURPLUS_SCHEMA)
         print(f"   📊 Surplus data: {surplus_df.shape[0]} records")
         
         # Load historical sales data
-        sales_df = pd.read_csv(f"{self.data_path}Mock_Historical_Sales_Data_-_10_Stores.csv")
+        sales_df = read_table(f"{self.data_path}Mock_Historical_Sales_Data_-_10_Stores.csv", SALES_SCHEMA)
         print(f"   📈 Sales data: {sales_df.shape[0]} records")
         
         # Load brain diet foundation data
-        brain_diet_df = pd.read_csv(f"{self.data_path}brain_diet_foundation_foods_mvp.csv")
+        brain_diet_df = read_table(f"{self.data_path}brain_diet_foundation_foods_mvp.csv", BRAIN_DIET_SCHEMA)
         print(f"   🧠 Brain diet data: {brain_diet_df.shape[0]} records")
         
         # Load recipient community data
-        recipients_df = pd.read_csv(f"{self.data_path}mock_recipient_community_data.csv")
+        recipients_df = read_table(f"{self.data_path}mock_recipient_community_data.csv", RECIPIENT_SCHEMA)
         print(f"   👥 Recipients data: {recipients_df.shape[0]} records")
         
-        # Clean surplus data
-        surplus_df['date'] = pd.to_datetime(surplus_df['date'])
-        surplus_df['store_id'] = surplus_df['store_id'].astype(str)
-        surplus_df['product_id'] = surplus_df['product_id'].astype(str)
+        # Clean surplus and sales data
+        surplus_df = self.clean_surplus_data(surplus_df)
+        sales_df = self.clean_sales_data(sales_df)
         
-        # Clean sales data
-        sales_df['day'] = pd.to_datetime(sales_df['day'], unit='D', origin='2024-01-01')
-        sales_df['store_id'] = sales_df['store_id'].str.replace('store_', '')
-        sales_df['product_id'] = sales_df['product_id'].str.replace('prod_', '')
-        
-        # Clean brain diet data
-        brain_diet_df['fdc_id'] = brain_diet_df['fdc_id'].astype(str)
+        # Shared, sorted categories so merges and sorts work on integer codes
+        unify_categories([surplus_df, sales_df], ['store_id', 'product_id'])
         
         print("✅ Data loaded and cleaned successfully!")
         return surplus_df, sales_df, brain_diet_df, recipients_df
     
-    def merge_datasets(self, surplus_df, sales_df, brain_diet_df):
+    def clean_surplus_data(self, surplus_df):
+        """
+        Parse store locations of raw surplus rows (a whole file or one chunk of it).
+        
+        Args:
+            surplus_df (pd.DataFrame): Surplus rows read with SURPLUS_SCHEMA
+            
+        Returns:
+            pd.DataFrame: Surplus rows with store_lat/store_lon instead of store_location
+        """
+        # Parse "(Decimal('lat'), Decimal('lon'))" once into compact coordinates
+        surplus_df['store_lat'], surplus_df['store_lon'] = parse_store_location(surplus_df['store_location'])
+        return surplus_df.drop(columns=['store_location'])
+    
+    def clean_sales_data(self, sales_df):
+        """
+        Convert sales day numbers to dates and strip the id prefixes.
+        
+        Args:
+            sales_df (pd.DataFrame): Sales rows read with SALES_SCHEMA
+            
+        Returns:
+            pd.DataFrame: Cleaned sales rows
+        """
+        sales_df['day'] = pd.to_datetime(sales_df['day'], unit='D', origin='2024-01-01')
+        sales_df['store_id'] = strip_prefix(sales_df['store_id'], 'store_')
+        sales_df['product_id'] = strip_prefix(sales_df['product_id'], 'prod_')
+        return sales_df
+    
+    def merge_datasets(self, surplus_df, sales_df, brain_diet_df, join_mode=None, allow_empty=False):
         """
         Merge historical sales and surplus datasets.
         
+        Join modes:
+            'key'  - store_id/product_id only; every surplus row is paired with
+                     every sales day of its series (legacy, grows quadratically)
+            'date' - store_id/product_id plus an exact surplus date == sales day
+            'asof' - store_id/product_id plus the nearest sales day on or before
+                     the surplus date (optionally within asof_tolerance_days)
+        
         Args:
             surplus_df (pd.DataFrame): Surplus data
             sales_df (pd.DataFrame): Historical sales data
             brain_diet_df (pd.DataFrame): Brain diet foundation data
+            join_mode (str): Overrides the predictor's join_mode when given
+            allow_empty (bool): Return an empty frame instead of raising when
+                no rows match (per-partition merges)
             
         Returns:
             pd.DataFrame: Merged dataset
+            
+        Raises:
+            ValueError: If join_mode is unknown or the join matches no rows
         """
         print("🔄 Merging datasets...")
         
-        # Merge surplus and sales data on store_id and product_id
-        merged_df = pd.merge(
-            surplus_df, 
-            sales_df, 
-            on=['store_id', 'product_id'], 
-            how='inner',
-            suffixes=('_surplus', '_sales')
-        )
+        join_mode = join_mode or self.join_mode
+        keys = ['store_id', 'product_id']
+        
+        if join_mode == 'key':
+            # Merge surplus and sales data on store_id and product_id
+            merged_df = pd.merge(
+                surplus_df, 
+                sales_df, 
+                on=keys, 
+                how='inner',
+                suffixes=('_surplus', '_sales')
+            )
+        elif join_mode == 'date':
+            # One sales day per surplus row: the same calendar day
+            merged_df = pd.merge(
+                surplus_df,
+                sales_df,
+                left_on=keys + ['date'],
+                right_on=keys + ['day'],
+                how='inner',
+                suffixes=('_surplus', '_sales')
+            )
+        elif join_mode == 'asof':
+            # One sales day per surplus row: the latest day on or before the surplus date
+            tolerance = (
+                pd.Timedelta(days=self.asof_tolerance_days)
+                if self.asof_tolerance_days is not None else None
+            )
+            # merge_asof needs both time keys at the same datetime resolution
+            sales_days = sales_df.assign(day=sales_df['day'].astype(surplus_df['date'].dtype))
+            merged_df = pd.merge_asof(
+                surplus_df.sort_values('date'),
+                sales_days.sort_values('day'),
+                left_on='date',
+                right_on='day',
+                by=keys,
+                direction='backward',
+                tolerance=tolerance,
+                suffixes=('_surplus', '_sales')
+            )
+            merged_df = merged_df.dropna(subset=['day']).reset_index(drop=True)
+        else:
+            raise ValueError(f"Unknown join_mode '{join_mode}' (expected 'key', 'date' or 'asof')")
+        
+        # Report how much the join grew the frame relative to its inputs
+        self.merge_stats = {
+            'join_mode': join_mode,
+            'surplus_rows': len(surplus_df),
+            'sales_rows': len(sales_df),
+            'merged_rows': len(merged_df),
+            'row_ratio': len(merged_df) / max(len(surplus_df), 1)
+        }
+        print(f"   📐 Join '{join_mode}': {len(surplus_df)} surplus rows -> {len(merged_df)} merged rows "
+              f"({self.merge_stats['row_ratio']:.2f}x)")
+        if merged_df.empty and not allow_empty:
+            raise ValueError(
+                f"Join '{join_mode}' matched none of the {len(surplus_df)} surplus rows to the "
+                f"{len(sales_df)} sales rows; on this data try join_mode 'key' or 'asof' (--join-mode)"
+            )
         
         # Add brain diet information
         # Create a mapping from product names to brain diet flags
         brain_diet_mapping = brain_diet_df.set_index('clean_name')['brain_diet_flag'].to_dict()
         
-        # Apply brain diet flag to merged data
-        merged_df['brain_diet_flag_merged'] = merged_df['product_name'].map(
-            brain_diet_mapping
-        ).fillna(False)
+        # Apply brain diet flag to merged data, one lookup per product name
+        merged_df['brain_diet_flag_merged'] = map_categories(
+            merged_df['product_name'], brain_diet_mapping, False
+        ).astype(bool)
         
-        print(f"✅ Datasets merged: {merged_df.shape[0]} records")
+        self.merge_stats['memory_mb'] = round(float(frame_memory_mb(merged_df)), 2)
+        print(f"✅ Datasets merged: {merged_df.shape[0]} records ({self.merge_stats['memory_mb']:.1f} MB)")
         return merged_df
     
     def engineer_temporal_features(self, df):
@@ -153,15 +273,38 @@ class FoodSurplusPredictor:
         """
         print("🔄 Engineering temporal features...")
         
-        # Sort by store, product, and date for temporal analysis
+        df = self.engineer_series_features(df)
+        df = self.add_global_features(df)
+        
+        print("✅ Temporal features engineered successfully!")
+        return df
+    
+    def engineer_series_features(self, df, seed=42):
+        """
+        Target, calendar and per-series rolling/lag/trend features.
+        
+        Only rows of the same store/product series are combined here, so any
+        frame holding complete series (e.g. one store) can be processed alone.
+        
+        Args:
+            df (pd.DataFrame): Merged dataset
+            seed (int): Seed of the target noise
+            
+        Returns:
+            pd.DataFrame: Dataset with series features, sorted by store, product and date
+        """
+        # Sort by store, product, and date once; every series is then a contiguous block
         df = df.sort_values(['store_id', 'product_id', 'date']).reset_index(drop=True)
+        layout = SeriesLayout.from_sorted_frame(df, ['store_id', 'product_id'])
         
         # Create realistic target: predict next day's surplus with more noise
-        df['surplus'] = df.groupby(['store_id', 'product_id'])['end_inventory'].shift(-1)
-        df = df.dropna(subset=['surplus'])
+        df['surplus'] = layout.shift(df['end_inventory'].to_numpy(), -1)
+        has_target = df['surplus'].notna().to_numpy()
+        df = df[has_target]
+        layout = layout.subset(has_target)
         
         # Add realistic noise to simulate real-world unpredictability
-        np.random.seed(42)
+        np.random.seed(seed)
         noise_factor = np.random.normal(1.0, 0.35, len(df))  # 35% noise for target R² 0.4-0.6
         df['surplus'] = df['surplus'] * noise_factor
         df['surplus'] = np.maximum(df['surplus'], 0)
@@ -184,68 +327,200 @@ class FoodSurplusPredictor:
         df['dayofyear_cos'] = np.cos(2 * np.pi * df['dayofyear'] / 365)
         
         # Business calendar features
-        df['is_weekend'] = (df['dayofweek'] >= 5).astype(int)
-        df['is_month_start'] = (df['day'] <= 5).astype(int)
-        df['is_month_end'] = (df['day'] >= 25).astype(int)
+        df['is_weekend'] = (df['dayofweek'] >= 5).astype(np.int8)
+        df['is_month_start'] = (df['day'] <= 5).astype(np.int8)
+        df['is_month_end'] = (df['day'] >= 25).astype(np.int8)
         df['is_quarter_start'] = df['day'].isin([1]) & df['month'].isin([1, 4, 7, 10])
         df['is_quarter_end'] = df['day'].isin([31, 30, 29, 28]) & df['month'].isin([3, 6, 9, 12])
         
-        # Rolling features for temporal patterns
-        for window in [3, 7, 14]:
-            df[f'sales_{window}day_avg'] = df.groupby(['store_id', 'product_id'])['daily_sales_sales'].transform(
-                lambda x: x.rolling(window=window, min_periods=1).mean()
-            )
-            df[f'sales_{window}day_std'] = df.groupby(['store_id', 'product_id'])['daily_sales_sales'].transform(
-                lambda x: x.rolling(window=window, min_periods=1).std()
-            )
-            df[f'stock_{window}day_avg'] = df.groupby(['store_id', 'product_id'])['stock_level'].transform(
-                lambda x: x.rolling(window=window, min_periods=1).mean()
-            )
+        # Rolling, lag, trend and volatility features over the contiguous series,
+        # optionally sharded by store across worker processes
+        store_offsets = SeriesLayout.from_sorted_frame(df, ['store_id']).offsets
+        series_features = parallel_series_features(
+            layout,
+            df['daily_sales_sales'].to_numpy(),
+            df['stock_level'].to_numpy(),
+            df['surplus'].to_numpy(),
+            store_offsets,
+            self.feature_workers
+        )
+        for name, values in series_features.items():
+            df[name] = values
         
-        # Lag features for temporal dependencies
-        for lag in [1, 2, 3, 7, 14]:
-            df[f'sales_lag_{lag}'] = df.groupby(['store_id', 'product_id'])['daily_sales_sales'].shift(lag)
-            df[f'stock_lag_{lag}'] = df.groupby(['store_id', 'product_id'])['stock_level'].shift(lag)
-            df[f'surplus_lag_{lag}'] = df.groupby(['store_id', 'product_id'])['surplus'].shift(lag)
+        return df
+    
+    def global_feature_stats(self, df):
+        """
+        Whole-dataset statistics behind the lag fills, aggregates and normalizations.
         
-        # Fill lag features
+        Args:
+            df (pd.DataFrame): Output of engineer_series_features()
+            
+        Returns:
+            dict: lag_medians, store_means, product_means, price_mean, price_std, shelf_life_max
+        """
         lag_cols = [col for col in df.columns if 'lag_' in col]
-        for col in lag_cols:
-            df[col] = df[col].fillna(df[col].median())
+        signals = ['daily_sales_sales', 'stock_level']
+        return {
+            'lag_medians': df[lag_cols].median().to_dict(),
+            'store_means': df.groupby('store_id', observed=True)[signals].mean(),
+            'product_means': df.groupby('product_id', observed=True)[signals].mean(),
+            'price_mean': df['price'].mean(),
+            'price_std': df['price'].std(),
+            'shelf_life_max': df['shelf_life_days'].max()
+        }
+    
+    def add_global_features(self, df, stats=None):
+        """
+        Lag fills, store/product aggregates, interactions and normalized columns.
         
-        # Trend features
-        df['sales_trend_7day'] = df.groupby(['store_id', 'product_id'])['daily_sales_sales'].transform(
-            lambda x: x.rolling(7, min_periods=3).apply(lambda y: (y.iloc[-1] - y.iloc[0]) / len(y) if len(y) > 1 else 0)
-        )
-        df['stock_trend_7day'] = df.groupby(['store_id', 'product_id'])['stock_level'].transform(
-            lambda x: x.rolling(7, min_periods=3).apply(lambda y: (y.iloc[-1] - y.iloc[0]) / len(y) if len(y) > 1 else 0)
-        )
+        Args:
+            df (pd.DataFrame): Output of engineer_series_features()
+            stats (dict): global_feature_stats() of the full dataset (computed
+                from ``df`` when None)
+            
+        Returns:
+            pd.DataFrame: Dataset with temporal features
+        """
+        stats = stats or self.global_feature_stats(df)
         
-        # Volatility features
-        df['sales_volatility_7day'] = df.groupby(['store_id', 'product_id'])['daily_sales_sales'].transform(
-            lambda x: x.rolling(7, min_periods=3).std() / (x.rolling(7, min_periods=3).mean() + 1e-8)
-        )
+        # Fill lag features
+        for col, median in stats['lag_medians'].items():
+            df[col] = df[col].fillna(median)
         
-        # Store and product level aggregations
-        df['store_avg_sales'] = df.groupby('store_id')['daily_sales_sales'].transform('mean')
-        df['product_avg_sales'] = df.groupby('product_id')['daily_sales_sales'].transform('mean')
-        df['store_avg_stock'] = df.groupby('store_id')['stock_level'].transform('mean')
-        df['product_avg_stock'] = df.groupby('product_id')['stock_level'].transform('mean')
+        # Store and product level aggregations, looked up once per category
+        for key, prefix in (('store_id', 'store'), ('product_id', 'product')):
+            means = stats[f'{prefix}_means']
+            for signal, name in (('daily_sales_sales', 'sales'), ('stock_level', 'stock')):
+                values = map_categories(df[key], means[signal].to_dict(), np.nan)
+                df[f'{prefix}_avg_{name}'] = values.astype(np.float64)
         
         # Interaction features
-        df['promotion_encoded'] = df['promotion_flag'].astype(int)
-        df['brain_diet_encoded'] = df['brain_diet_flag_merged'].astype(int)
+        df['promotion_encoded'] = df['promotion_flag'].astype(np.int8)
+        df['brain_diet_encoded'] = df['brain_diet_flag_merged'].astype(np.int8)
         df['promotion_sales_interaction'] = df['promotion_encoded'] * df['daily_sales_sales']
         
         # Price features
-        df['price_normalized'] = (df['price'] - df['price'].mean()) / (df['price'].std() + 1e-8)
+        df['price_normalized'] = (df['price'] - stats['price_mean']) / (stats['price_std'] + 1e-8)
         
         # Shelf life features
-        df['shelf_life_normalized'] = df['shelf_life_days'] / df['shelf_life_days'].max()
+        df['shelf_life_normalized'] = df['shelf_life_days'] / stats['shelf_life_max']
         
-        print("✅ Temporal features engineered successfully!")
         return df
     
+    def training_input_paths(self):
+        """Input files the training features are derived from."""
+        return [
+            f"{self.data_path}mock_food_surplus_data.csv",
+            f"{self.data_path}Mock_Historical_Sales_Data_-_10_Stores.csv",
+            f"{self.data_path}brain_diet_foundation_foods_mvp.csv"
+        ]
+    
+    def build_feature_frame(self):
+        """
+        Load, merge and engineer the training features, reusing the feature
+        store when the inputs and feature definitions are unchanged.
+        
+        Returns:
+            tuple: (feature_df, recipients_df)
+        """
+        input_paths = self.training_input_paths()
+        self.history_df = None
+        params = {'join_mode': self.join_mode, 'asof_tolerance_days': self.asof_tolerance_days}
+        
+        cache_key = input_hashes = None
+        if self.feature_store is not None:
+            cache_key, input_hashes = self.feature_store.cache_key(input_paths, params)
+            feature_df = self.feature_store.read(cache_key)
+            if feature_df is not None:
+                print(f"⚡ Loaded cached features {cache_key}: {feature_df.shape[0]} records")
+                recipients_df = read_table(f"{self.data_path}mock_recipient_community_data.csv", RECIPIENT_SCHEMA)
+                return feature_df, recipients_df
+        
+        # Load and clean data
+        surplus_df, sales_df, brain_diet_df, recipients_df = self.load_and_clean_data()
+        
+        # Merge datasets
+        merged_df = self.merge_datasets(surplus_df, sales_df, brain_diet_df)
+        self.history_df = merged_df
+        
+        # Engineer temporal features
+        feature_df = self.engineer_temporal_features(merged_df)
+        
+        if self.feature_store is not None:
+            self.feature_store.write(cache_key, feature_df, input_hashes)
+            print(f"💾 Cached features as {cache_key}")
+        
+        return feature_df, recipients_df
+    
+    def update_features_incremental(self, day_df, state_path="feature_state.npz", fill_values=None):
+        """
+        Refresh temporal features for a day of new merged rows only.
+        
+        Keeps a per-series ring buffer of the last observations on disk, so the
+        cost scales with the day's rows rather than the full history. The state
+        is bootstrapped from the full history the first time.
+        
+        Args:
+            day_df (pd.DataFrame): New rows in merge_datasets format
+            state_path (str): Location of the persisted incremental state
+            fill_values (dict): Values for missing lag features when bootstrapping
+            
+        Returns:
+            pd.DataFrame: Updated series features for the new rows
+        """
+        print("🔄 Updating features incrementally...")
+        
+        if os.path.exists(state_path):
+            state = IncrementalFeatureState.load(state_path)
+        else:
+            print("   📦 No incremental state found, bootstrapping from history")
+            surplus_df, sales_df, brain_diet_df, _ = self.load_and_clean_data()
+            history_df = self.merge_datasets(surplus_df, sales_df, brain_diet_df)
+            state = IncrementalFeatureState.from_history(history_df, fill_values)
+        
+        features = state.update(day_df)
+        state.save(state_path)
+        
+        n_series = features.groupby(['store_id', 'product_id']).ngroups
+        print(f"✅ Updated features for {n_series} series ({len(features)} rows)")
+        if len(features) < len(day_df):
+            print(f"⚠️  Skipped {len(day_df) - len(features)} rows dated at or before their series' last update")
+        return features
+    
+    def save_feature_state(self, feature_df=None, state_path="feature_state.npz"):
+        """
+        Write the per-series history the model server uses for online lag,
+        rolling and aggregate features.
+        
+        Missing lags are filled with the training medians, as in training.
+        The merged history of the feature build is reused; it is only loaded
+        and merged again when the features came from the feature store.
+        
+        Args:
+            feature_df (pd.DataFrame): Engineered training features (built when None)
+            state_path (str): Output location of the incremental state
+            
+        Returns:
+            IncrementalFeatureState: The saved state
+        """
+        print("🔄 Saving historical feature state for online predictions...")
+        
+        if feature_df is None:
+            feature_df, _ = self.build_feature_frame()
+        lag_cols = [col for col in feature_df.columns if 'lag_' in col]
+        fill_values = {col: float(value) for col, value in feature_df[lag_cols].median().items()}
+        
+        history_df = self.history_df
+        if history_df is None:
+            surplus_df, sales_df, brain_diet_df, _ = self.load_and_clean_data()
+            history_df = self.merge_datasets(surplus_df, sales_df, brain_diet_df)
+        state = IncrementalFeatureState.from_history(history_df, fill_values)
+        state.save(state_path)
+        
+        print(f"✅ Feature history for {state.n_series} series saved to {state_path}")
+        return state
+    
     def prepare_temporal_training_data(self, df):
         """
         Prepare data for temporal model training.
@@ -335,31 +610,12 @@ class FoodSurplusPredictor:
         # Use time series split for temporal validation
         tscv = TimeSeriesSplit(n_splits=3)
         
-        # Train Gradient Boosting model with balanced regularization
-        self.model = GradientBoostingRegressor(
-            n_estimators=80,      # Balanced
-            max_depth=5,          # Balanced
-            learning_rate=0.02,   # Balanced learning rate
-            subsample=0.8,        # Moderate subsampling
-            max_features='sqrt',
-            min_samples_split=15, # Moderate regularization
-            min_samples_leaf=8,   # Moderate regularization
-            random_state=42
-        )
-        
-        # Cross-validation for temporal data
-        cv_scores = []
-        for train_idx, test_idx in tscv.split(X):
-            X_train, X_test = X.iloc[train_idx], X.iloc[test_idx]
-            y_train, y_test = y.iloc[train_idx], y.iloc[test_idx]
-            
-            self.model.fit(X_train, y_train)
-            y_pred = self.model.predict(X_test)
-            r2 = r2_score(y_test, y_pred)
-            cv_scores.append(r2)
+        # Gradient Boosting model of the configured backend
+        self.model = make_estimator(self.model_backend, random_state=42)
         
-        # Final training on full dataset
-        self.model.fit(X, y)
+        # Cross-validation for temporal data and final training on the full
+        # dataset, as concurrent fits of identically seeded clones
+        self.model, cv_scores = cross_validate_and_fit(self.model, X, y, tscv, self.training_workers)
         
         # Final evaluation on last 20% of data
         split_idx = int(len(X) * 0.8)
@@ -374,18 +630,21 @@ class FoodSurplusPredictor:
         cv_mean = np.mean(cv_scores)
         cv_std = np.std(cv_scores)
         
-        # Get feature importance
-        feature_importance = dict(zip(self.feature_columns, self.model.feature_importances_))
+        # Get feature importance (permutation importance on the evaluation rows
+        # for backends without impurity importances)
+        importance = dict(zip(self.feature_columns, feature_importance(self.model, X_test, y_test)))
         
         metrics = {
             'r2_score': r2,
             'mae': mae,
             'cv_mean': cv_mean,
             'cv_std': cv_std,
-            'feature_importance': feature_importance
+            'feature_importance': importance
         }
         
-        print(f"✅ Temporal model trained successfully!")
+        print(f"✅ Temporal model trained successfully! ({self.model_backend} backend)")
+        if hasattr(self.model, 'n_iter_'):
+            print(f"   🛑 Early stopping after {self.model.n_iter_} boosting iterations")
         print(f"   📊 R² Score: {r2:.4f}")
         print(f"   📊 MAE: {mae:.4f}")
         print(f"   📊 CV R²: {cv_mean:.4f} ± {cv_std:.4f}")
@@ -402,12 +661,14 @@ class FoodSurplusPredictor:
         
         return metrics
     
-    def generate_predictions(self, df):
+    def generate_predictions(self, df, fill_values=None):
         """
         Generate predictions for all store/product combinations with enhanced MVP features.
         
         Args:
             df (pd.DataFrame): Dataset with engineered features
+            fill_values (pd.Series): Per-feature values for missing entries
+                (defaults to the medians of ``df``)
             
         Returns:
             pd.DataFrame: Predictions dataframe with MVP enhancements
@@ -416,16 +677,16 @@ class FoodSurplusPredictor:
         
         # Prepare features for prediction
         X_pred = df[self.feature_columns].copy()
-        X_pred = X_pred.fillna(X_pred.median())
+        X_pred = X_pred.fillna(X_pred.median() if fill_values is None else fill_values)
         X_pred = X_pred.replace([np.inf, -np.inf], np.nan)
-        X_pred = X_pred.fillna(X_pred.median())
+        X_pred = X_pred.fillna(X_pred.median() if fill_values is None else fill_values)
         
         # Make predictions
         predictions = self.model.predict(X_pred)
         
         # Create enhanced predictions dataframe for MVP
         predictions_df = df[['store_id', 'product_id', 'product_name', 'brain_diet_flag_merged', 
-                           'category', 'shelf_life_days', 'price', 'store_location']].copy()
+                           'category', 'shelf_life_days', 'price', 'store_lat', 'store_lon']].copy()
         predictions_df['predicted_surplus'] = predictions
         predictions_df['date'] = df['date']
         
@@ -492,45 +753,39 @@ class FoodSurplusPredictor:
                             np.where(df['predicted_surplus'] > 50, 'Medium', 'Low'))
         return confidence
     
-    def save_predictions(self, predictions_df, filename="predicted_surplus.json"):
+    def save_predictions(self, predictions_df, filename="predicted_surplus.json", output_format=None):
         """
-        Save predictions to JSON file.
+        Save predictions for the dashboard, streaming them to disk in chunks.
         
         Args:
             predictions_df (pd.DataFrame): Predictions dataframe
             filename (str): Output filename
+            output_format (str): 'json', 'ndjson', 'parquet' or 'arrow' (inferred from filename if None)
         """
         print(f"🔄 Saving predictions to {filename}...")
         
-        # Convert to enhanced JSON format for MVP
-        predictions_json = []
-        for _, row in predictions_df.iterrows():
-            prediction = {
-                'store_id': str(row['store_id']),
-                'product_id': str(row['product_id']),
-                'product_name': row['product_name'],
-                'category': row['category'],
-                'predicted_surplus': round(float(row['predicted_surplus']), 2),
-                'estimated_meals': int(row['estimated_meals']),
-                'urgency_score': int(row['urgency_score']),
-                'nutritional_value': int(row['nutritional_value']),
-                'confidence': row['confidence'],
-                'shelf_life_days': int(row['shelf_life_days']),
-                'expiry_date': row['expiry_date'].strftime('%Y-%m-%d') if pd.notna(row['expiry_date']) else None,
-                'price': round(float(row['price']), 2),
-                'brain_diet_flag': bool(row['brain_diet_flag_merged']),
-                'store_location': str(row['store_location']) if pd.notna(row['store_location']) else None,
-                'date': row['date'].strftime('%Y-%m-%d') if pd.notna(row['date']) else None,
-                'priority_level': self.get_priority_level(row['urgency_score']),
-                'impact_score': self.get_impact_score(row['predicted_surplus'], row['nutritional_value'])
-            }
-            predictions_json.append(prediction)
-        
-        # Save to file
-        with open(filename, 'w') as f:
-            json.dump(predictions_json, f, indent=2)
-        
-        print(f"✅ MVP predictions saved to {filename}")
+        count = write_predictions(predictions_df, filename, output_format)
+        
+        print(f"✅ MVP predictions saved to {filename} ({count} records)")
+    
+    def save_model(self, model_dir="models/", metrics=None):
+        """
+        Publish the trained model as a new versioned artifact for the model server.
+        
+        Tree ensembles are written as a memory-mappable model bundle recording
+        the hash of the training inputs and the feature version.
+        
+        Args:
+            model_dir (str): Directory of versioned model artifacts
+            metrics (dict): Training metrics stored with the artifact
+            
+        Returns:
+            str: The new model version
+        """
+        version = save_model_artifact(self.model, self.feature_columns, model_dir, metrics,
+                                      data_hash=inputs_hash(self.training_input_paths()))
+        print(f"✅ Model version {version} published to {model_dir}")
+        return version
     
     def get_priority_level(self, urgency_score):
         """Convert urgency score to priority level for dashboard."""
@@ -559,77 +814,68 @@ class FoodSurplusPredictor:
             max_distance (float): Maximum distance in kilometers
             
         Returns:
-            pd.DataFrame: Filtered predictions
+            pd.DataFrame: Predictions with a recipient within max_distance, with
+                nearby_recipients, nearest_recipient_id, nearest_recipient_km and
+                category_matches columns
         """
         print("🔄 Filtering by recipient preferences...")
         
-        # This is a simplified version - in a real implementation,
-        # you would calculate actual distances using coordinates
-        
-        # Filter by brain diet items for health-conscious recipients
-        brain_diet_predictions = predictions_df[predictions_df['brain_diet_flag_merged'] == True]
-        
-        # Add recipient matching logic here
-        # For now, just return brain diet predictions
-        filtered_predictions = brain_diet_predictions.copy()
+        # Radius search over a spatial index of recipient locations
+        recipient_index = RecipientIndex(recipients_df)
+        matches = recipient_index.match(predictions_df['store_lat'].to_numpy(), predictions_df['store_lon'].to_numpy(),
+                                        max_distance, predictions_df['category'])
+        matches.index = predictions_df.index
+        
+        # Keep predictions with at least one recipient in range; recipients that
+        # prefer the item's category and brain diet items rank first
+        matched = predictions_df.join(matches)
+        filtered_predictions = matched[matched['nearby_recipients'] > 0].sort_values(
+            ['category_matches', 'brain_diet_flag_merged', 'urgency_score', 'predicted_surplus'],
+            ascending=False, kind='stable'
+        )
         
+        print(f"   📍 {len(recipient_index)} recipients indexed, search radius {max_distance} km")
         print(f"✅ Filtered predictions: {len(filtered_predictions)} items match recipient preferences")
         return filtered_predictions
     
+    def allocate_to_recipients(self, predictions_df, recipients_df, max_distance=50):
+        """
+        Assign predicted surplus units to recipients under their daily capacity.
+        
+        Args:
+            predictions_df (pd.DataFrame): Predictions dataframe
+            recipients_df (pd.DataFrame): Recipients dataframe
+            max_distance (float): Maximum distance in kilometers
+            
+        Returns:
+            tuple: (allocations DataFrame, summary dict)
+        """
+        print("🔄 Allocating surplus to recipients...")
+        
+        allocations_df, summary = allocate_surplus(predictions_df, recipients_df, max_distance_km=max_distance)
+        
+        print(f"✅ Allocated {summary['units_allocated']:,} of {summary['units_available']:,} units "
+              f"to {summary['recipients_served']} recipients in {summary['seconds']:.2f}s")
+        return allocations_df, summary
+    
     def plot_predictions(self, predictions_df, sample_size=100):
         """
         Create sample plots of predicted vs actual surplus for testing.
         
+        Plotting libraries are imported here, not at module import (see plotting.py).
+        
         Args:
             predictions_df (pd.DataFrame): Predictions dataframe
             sample_size (int): Number of samples to plot
         """
+        from plotting import MATPLOTLIB_AVAILABLE, plot_predictions
+        if not MATPLOTLIB_AVAILABLE:
+            print("⚠️  matplotlib not installed, skipping prediction plots")
+            return
+        
         print("🔄 Creating prediction plots...")
         
-        # Sample data for plotting
-        sample_df = predictions_df.head(sample_size)
-        
-        # Create plots
-        plt.figure(figsize=(15, 10))
-        
-        # Plot 1: Predicted surplus distribution
-        plt.subplot(2, 2, 1)
-        plt.hist(sample_df['predicted_surplus'], bins=20, alpha=0.7, color='skyblue')
-        plt.title('Distribution of Predicted Surplus')
-        plt.xlabel('Predicted Surplus')
-        plt.ylabel('Frequency')
-        
-        # Plot 2: Brain diet vs regular items
-        plt.subplot(2, 2, 2)
-        brain_diet_surplus = sample_df[sample_df['brain_diet_flag_merged'] == True]['predicted_surplus']
-        regular_surplus = sample_df[sample_df['brain_diet_flag_merged'] == False]['predicted_surplus']
-        
-        plt.hist([brain_diet_surplus, regular_surplus], bins=15, alpha=0.7, 
-                label=['Brain Diet', 'Regular'], color=['green', 'orange'])
-        plt.title('Surplus by Item Type')
-        plt.xlabel('Predicted Surplus')
-        plt.ylabel('Frequency')
-        plt.legend()
-        
-        # Plot 3: Top stores by predicted surplus
-        plt.subplot(2, 2, 3)
-        store_surplus = sample_df.groupby('store_id')['predicted_surplus'].sum().head(10)
-        store_surplus.plot(kind='bar', color='lightcoral')
-        plt.title('Top 10 Stores by Predicted Surplus')
-        plt.xlabel('Store ID')
-        plt.ylabel('Total Predicted Surplus')
-        plt.xticks(rotation=45)
-        
-        # Plot 4: Surplus by category
-        plt.subplot(2, 2, 4)
-        # Note: This would need category information from the original data
-        plt.text(0.5, 0.5, 'Category analysis\nwould go here', 
-                ha='center', va='center', transform=plt.gca().transAxes)
-        plt.title('Surplus by Category')
-        
-        plt.tight_layout()
-        plt.savefig('surplus_predictions_analysis.png', dpi=300, bbox_inches='tight')
-        plt.show()
+        plot_predictions(predictions_df, sample_size, 'surplus_predictions_analysis.png')
         
         print("✅ Prediction plots saved as 'surplus_predictions_analysis.png'")
     
@@ -643,14 +889,8 @@ class FoodSurplusPredictor:
         print("🚀 Starting FoodCast Predictive AI Pipeline...")
         print("=" * 60)
         
-        # Load and clean data
-        surplus_df, sales_df, brain_diet_df, recipients_df = self.load_and_clean_data()
-        
-        # Merge datasets
-        merged_df = self.merge_datasets(surplus_df, sales_df, brain_diet_df)
-        
-        # Engineer temporal features
-        feature_df = self.engineer_temporal_features(merged_df)
+        # Load, merge and engineer features (or reuse the cached feature set)
+        feature_df, recipients_df = self.build_feature_frame()
         
         # Prepare training data
         X, y = self.prepare_temporal_training_data(feature_df)
@@ -661,12 +901,17 @@ class FoodSurplusPredictor:
         # Generate predictions
         predictions_df = self.generate_predictions(feature_df)
         
-        # Save predictions
+        # Save predictions (JSON, plus the memory-mappable file predictions_api serves)
         self.save_predictions(predictions_df)
+        if PYARROW_AVAILABLE:
+            self.save_predictions(predictions_df, "predicted_surplus.arrow")
         
         # Filter by recipient preferences
         filtered_predictions = self.filter_by_recipient_preferences(predictions_df, recipients_df)
         
+        # Assign surplus to recipients within capacity
+        allocations_df, allocation_summary = self.allocate_to_recipients(predictions_df, recipients_df)
+        
         # Create plots
         self.plot_predictions(predictions_df)
         
@@ -674,19 +919,61 @@ class FoodSurplusPredictor:
         print("🎉 Pipeline completed successfully!")
         
         results = {
+            'features': feature_df,
             'predictions': predictions_df,
             'filtered_predictions': filtered_predictions,
+            'allocations': allocations_df,
+            'allocation_summary': allocation_summary,
             'metrics': metrics,
             'model': self.model
         }
         
         return results
+    
+    def run_out_of_core_pipeline(self, memory_budget_mb=1024, workdir=None, chunk_rows=100000,
+                                 output_path="predicted_surplus.json", state_path="feature_state.npz"):
+        """
+        Train and predict one store partition at a time within a memory budget.
+        
+        For histories that do not fit in memory; see chunked_pipeline.py.
+        
+        Args:
+            memory_budget_mb (float): Memory the pipeline should stay within
+            workdir (str): Spill directory (temporary when None)
+            chunk_rows (int): CSV rows read at a time
+            output_path (str): Predictions file
+            state_path (str): Feature history for the model server
+            
+        Returns:
+            dict: Pipeline results, including peak RSS and time per stage
+        """
+        pipeline = OutOfCorePipeline(self, memory_budget_mb, workdir, chunk_rows)
+        return pipeline.run(output_path, state_path)
 
 
 def main():
     """
     Main function to run the FoodCast predictive AI model.
     """
+    parser = argparse.ArgumentParser(description='Train the FoodCast surplus model and write predictions')
+    parser.add_argument('--out-of-core', action='store_true',
+                        help='process one store partition at a time (histories larger than memory)')
+    parser.add_argument('--memory-budget-mb', type=float, default=1024,
+                        help='memory budget of the out-of-core pipeline')
+    parser.add_argument('--workdir', default=None,
+                        help='spill directory of the out-of-core pipeline (temporary by default)')
+    parser.add_argument('--feature-workers', type=int, default=1,
+                        help='processes for series features, sharded by store (0 = one per CPU)')
+    parser.add_argument('--training-workers', type=int, default=-1,
+                        help='concurrent cross-validation and final fits (-1 = one per CPU)')
+    parser.add_argument('--join-mode', choices=['key', 'date', 'asof'], default='key',
+                        help="how surplus rows are aligned with sales days (see merge_datasets)")
+    parser.add_argument('--asof-tolerance-days', type=int, default=None,
+                        help="maximum gap between surplus date and sales day for --join-mode asof")
+    parser.add_argument('--model-backend', choices=MODEL_BACKENDS if DEPENDENCIES_AVAILABLE else None,
+                        default='gbr', help="'gbr' (exact) or 'hist' (histogram-binned with early stopping)")
+    args = parser.parse_args()
+    
     if not DEPENDENCIES_AVAILABLE:
         print("\n❌ Cannot run without required dependencies.")
         print("Please install dependencies first:")
@@ -694,16 +981,35 @@ def main():
         return
     
     # Initialize predictor
-    predictor = FoodSurplusPredictor()
+    predictor = FoodSurplusPredictor(join_mode=args.join_mode, asof_tolerance_days=args.asof_tolerance_days,
+                                     feature_workers=args.feature_workers, training_workers=args.training_workers,
+                                     model_backend=args.model_backend)
+    
+    if args.out_of_core:
+        results = predictor.run_out_of_core_pipeline(args.memory_budget_mb, args.workdir)
+        predictor.save_model(metrics=results['metrics'])
+        print(f"\n🎯 Total surplus predictions: {results['predictions_written']}")
+        print(f"📈 Model accuracy (R²): {results['metrics']['r2_score']:.4f} "
+              f"(trained on {results['metrics']['training_rows']:,} of {results['metrics']['total_rows']:,} rows)")
+        print(f"📊 Prediction error (MAE): {results['metrics']['mae']:.2f} units")
+        return
     
     # Run full pipeline
     results = predictor.run_full_pipeline()
     
+    # Publish the model; a running model server hot-swaps to it
+    predictor.save_model(metrics=results['metrics'])
+    
+    # Series history for the model server's lag and rolling features
+    predictor.save_feature_state(results['features'])
+    
     # Print enhanced MVP summary
     print("\n📊 FOODCAST MVP SUMMARY:")
     print("=" * 50)
     print(f"🎯 Total surplus predictions: {len(results['predictions'])}")
-    print(f"🧠 Brain diet items: {len(results['filtered_predictions'])}")
+    print(f"📍 Items near a recipient: {len(results['filtered_predictions'])}")
+    print(f"🚚 Units allocated to recipients: {results['allocation_summary']['units_allocated']:,} "
+          f"({results['allocation_summary']['fill_rate']:.1%} of predicted surplus)")
     print(f"📈 Model accuracy (R²): {results['metrics']['r2_score']:.4f}")
     print(f"📊 Prediction error (MAE): {results['metrics']['mae']:.2f} units")
     
@@ -727,7 +1033,10 @@ def main():
     print("\n✅ FoodCast Predictive AI Model completed successfully!")
     print("📁 Output files:")
     print("   - predicted_surplus.json (main predictions)")
+    print("   - predicted_surplus.arrow (memory-mapped by predictions_api)")
     print("   - surplus_predictions_analysis.png (analysis plots)")
+    print("   - models/LATEST (versioned model for the model server)")
+    print("   - feature_state.npz (series history for online features)")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+FoodCast Tree Inference
+Gradient-boosted ensembles flattened into NumPy node arrays.
+
+sklearn's predict() validates its input and walks every tree separately,
+which costs far more than the arithmetic for the one-row matrices /predict
+scores. CompiledEnsemble copies the nodes of all trees into contiguous
+arrays, indexed by absolute node id:
+
+    feature       split feature (0 at leaves)
+    threshold     go left when x <= threshold
+    children      left and right child ids interleaved, [2 * node + went_right]
+                  (a leaf points to itself on both sides)
+    missing_left  where NaN goes
+    value         leaf output, learning rate already applied
+
+plus the root of every tree and the baseline (initial) prediction.
+Evaluation descends all trees of all rows together, one vectorized step per
+tree level, so a prediction is ``max_depth`` NumPy gathers for any row count.
+
+Supported: GradientBoostingRegressor, and HistGradientBoostingRegressor with
+an identity link (squared, absolute or quantile loss) and numeric features
+only. GradientBoostingRegressor trees compare float32 inputs as
+sklearn does, so results match predict() to float rounding.
+
+Missing values follow the estimator: HistGradientBoostingRegressor learned
+a side for NaN at every split and the ensemble sends NaN there, while
+GradientBoostingRegressor was trained on median-filled features and its
+predict() rejects NaN, so the compiled ensemble raises ValueError as well
+instead of inventing a prediction.
+"""
+
+import pickle
+
+import numpy as np
+
+ARRAY_FIELDS = ['feature', 'threshold', 'children', 'missing_left', 'value', 'roots']
+
+# Rows evaluated together; keeps the (rows x trees) work arrays cache sized
+BLOCK_ROWS = 256
+
+
+class UnsupportedModelError(TypeError):
+    """Raised for estimators that cannot be flattened."""
+
+
+def _gbr_trees(model):
+    """(feature, threshold, left, right, missing_left, value) per GradientBoostingRegressor tree."""
+    for estimator in model.estimators_[:, 0]:
+        tree = estimator.tree_
+        missing = getattr(tree, 'missing_go_to_left', None)
+        yield (
+            tree.feature, tree.threshold, tree.children_left, tree.children_right,
+            np.zeros(tree.node_count, dtype=bool) if missing is None else missing.astype(bool),
+            tree.value[:, 0, 0] * model.learning_rate
+        )
+
+
+def _hist_trees(model):
+    """(feature, threshold, left, right, missing_left, value) per HistGradientBoostingRegressor tree."""
+    for predictors in model._predictors:
+        nodes = predictors[0].nodes
+        if nodes['is_categorical'].any():
+            raise UnsupportedModelError("Categorical splits are not supported")
+        is_leaf = nodes['is_leaf'].astype(bool)
+        # Child ids are unsigned; leaves are marked -1 as in sklearn's Tree
+        left = np.where(is_leaf, -1, nodes['left'].astype(np.int64))
+        right = np.where(is_leaf, -1, nodes['right'].astype(np.int64))
+        yield (
+            nodes['feature_idx'], nodes['num_threshold'], left, right,
+            nodes['missing_go_to_left'].astype(bool),
+            # Shrinkage is already applied to HistGradientBoosting leaf values
+            np.where(is_leaf, nodes['value'], 0.0)
+        )
+
+
+class CompiledEnsemble:
+    """
+    Flat-array evaluator for a fitted gradient-boosted regressor.
+    """
+
+    def __init__(self, arrays, baseline, max_depth, n_features, float32_inputs, allow_missing=True):
+        """
+        Initialize from flattened arrays (see compile_model()).
+
+        Args:
+            arrays (dict): ARRAY_FIELDS -> np.ndarray
+            baseline (float): Initial prediction added to the tree outputs
+            max_depth (int): Deepest root-to-leaf path
+            n_features (int): Expected input columns
+            float32_inputs (bool): Round inputs to float32 before comparing
+            allow_missing (bool): Route NaN by missing_left (False: reject NaN)
+        """
+        for field in ARRAY_FIELDS:
+            setattr(self, field, np.ascontiguousarray(arrays[field]))
+        self.baseline = float(baseline)
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+        self.float32_inputs = bool(float32_inputs)
+        self.allow_missing = bool(allow_missing)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    def arrays(self):
+        """The node arrays by field name."""
+        return {field: getattr(self, field) for field in ARRAY_FIELDS}
+
+    def metadata(self):
+        """Scalar parameters, JSON serializable."""
+        return {
+            'baseline': self.baseline,
+            'max_depth': self.max_depth,
+            'n_features': self.n_features,
+            'float32_inputs': self.float32_inputs,
+            'allow_missing': self.allow_missing
+        }
+
+    def predict(self, X):
+        """
+        Predict like model.predict(X).
+
+        Args:
+            X (np.ndarray): (rows, n_features) matrix or a single row
+
+        Returns:
+            np.ndarray: Predictions per row
+
+        Raises:
+            ValueError: On a shape mismatch, or NaN input when allow_missing is off
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X[None, :]
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {X.shape[1]}")
+        if not self.allow_missing and np.isnan(X).any():
+            raise ValueError("Input X contains NaN; this model was trained without missing values")
+        if self.float32_inputs:
+            X = X.astype(np.float32).astype(np.float64)
+
+        if len(X) <= BLOCK_ROWS:
+            return self._predict_block(np.ascontiguousarray(X))
+        return np.concatenate([
+            self._predict_block(np.ascontiguousarray(X[start:start + BLOCK_ROWS]))
+            for start in range(0, len(X), BLOCK_ROWS)
+        ])
+
+    def _predict_block(self, X):
+        """Predictions for a C-contiguous float64 matrix."""
+        n_rows = len(X)
+        X = X.ravel()
+        has_missing = np.isnan(X).any()
+
+        # (rows, trees) current node, descended one level per step
+        row_offsets = (np.arange(n_rows, dtype=np.intp) * self.n_features)[:, None]
+        nodes = np.broadcast_to(self.roots.astype(np.intp), (n_rows, self.n_trees))
+        for _ in range(self.max_depth):
+            x = X.take(row_offsets + self.feature.take(nodes))
+            go_right = x > self.threshold.take(nodes)
+            if has_missing:
+                go_right |= np.isnan(x) & ~self.missing_left.take(nodes)
+            nodes = self.children.take(2 * nodes + go_right)
+        return self.baseline + self.value.take(nodes).sum(axis=1)
+
+
+def _depth(children, roots):
+    """Longest root-to-leaf path over all trees (leaves self-loop)."""
+    depth = 0
+    frontier = np.asarray(roots)
+    while True:
+        below = np.concatenate([children[2 * frontier], children[2 * frontier + 1]])
+        parents = np.concatenate([frontier, frontier])
+        below = np.unique(below[below != parents])
+        if not len(below):
+            return depth
+        frontier = below
+        depth += 1
+
+
+def compile_model(model):
+    """
+    Flatten a fitted gradient-boosted regressor.
+
+    Args:
+        model: Fitted GradientBoostingRegressor or HistGradientBoostingRegressor
+
+    Returns:
+        CompiledEnsemble: Equivalent flat-array evaluator
+
+    Raises:
+        UnsupportedModelError: For other estimators or non-identity links
+    """
+    name = type(model).__name__
+    if name == 'GradientBoostingRegressor':
+        if model.init_ == 'zero':
+            baseline = 0.0
+        else:
+            baseline = float(np.ravel(model.init_.predict(np.zeros((1, model.n_features_in_))))[0])
+        trees, float32_inputs, allow_missing = _gbr_trees(model), True, False
+    elif name == 'HistGradientBoostingRegressor':
+        if getattr(model, '_preprocessor', None) is not None:
+            raise UnsupportedModelError("Categorical feature preprocessing is not supported")
+        if model.loss not in ('squared_error', 'absolute_error', 'quantile'):
+            raise UnsupportedModelError(f"Loss {model.loss!r} has a non-identity link")
+        baseline = float(np.ravel(model._baseline_prediction)[0])
+        trees, float32_inputs, allow_missing = _hist_trees(model), False, True
+    else:
+        raise UnsupportedModelError(f"Cannot compile {name}")
+
+    parts = {field: [] for field in ARRAY_FIELDS}
+    offset = 0
+    for feature, threshold, left, right, missing_left, value in trees:
+        n = len(feature)
+        ids = np.arange(offset, offset + n, dtype=np.int32)
+        is_leaf = np.asarray(left) < 0
+        parts['feature'].append(np.where(is_leaf, 0, feature).astype(np.int32))
+        parts['threshold'].append(np.asarray(threshold, dtype=np.float64))
+        parts['children'].append(np.column_stack([
+            np.where(is_leaf, ids, np.asarray(left) + offset),
+            np.where(is_leaf, ids, np.asarray(right) + offset)
+        ]).astype(np.int32).ravel())
+        parts['missing_left'].append(np.asarray(missing_left, dtype=bool))
+        parts['value'].append(np.where(is_leaf, value, 0.0).astype(np.float64))
+        parts['roots'].append(np.array([offset], dtype=np.int32))
+        offset += n
+
+    arrays = {field: np.concatenate(values) for field, values in parts.items()}
+    max_depth = _depth(arrays['children'], arrays['roots'])
+    return CompiledEnsemble(arrays, baseline, max_depth, model.n_features_in_, float32_inputs, allow_missing)
+
+
+def compile_pickle(path):
+    """
+    Flatten the estimator stored in a pickle (trained_model.pkl or a registry artifact).
+
+    Args:
+        path (str): Pickle holding an estimator or an artifact dict with a 'model' key
+
+    Returns:
+        CompiledEnsemble: Flat-array evaluator
+    """
+    with open(path, 'rb') as f:
+        obj = pickle.load(f)
+    return compile_model(obj['model'] if isinstance(obj, dict) else obj)
@@ -34,10 +34,15 @@ if [ -f "requirements.txt" ]; then
     pip install -r requirements.txt > /dev/null 2>&1
 fi
 
+# Train and publish a model version offline if none exists yet
+if [ ! -f "models/LATEST" ]; then
+    echo "🔄 No published model found. Training one now (this may take a few moments)..."
+    python3 surplus_model.py > model_training.log 2>&1 || { echo "❌ Model training failed. See backend/model_training.log"; exit 1; }
+fi
+
 # Start the model server
 echo "🤖 Starting Python Flask model server on port 5001..."
-echo "📊 Model will be loaded and trained automatically..."
-echo "⏳ This may take a few moments..."
+echo "📊 Loading the latest published model version..."
 
 # Run the model server in the background
 nohup python3 model_server.py > model_server.log 2>&1 &